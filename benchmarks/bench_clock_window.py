@@ -0,0 +1,75 @@
+"""
+Clock-bias model: one bias per epoch (`least_squares_with_clock`) against the sliding-window
+joint solver (`least_squares_with_clock_window`) for several window lengths, on random tracks
+whose TDOA carry a reference clock bias with drift. Prints CPU time, p50/p95 error and NaN rate.
+
+    python benchmarks/bench_clock_window.py --epochs 5000 --windows 1 5 10 20 50
+    python benchmarks/bench_clock_window.py --anchors 5 --bias 0.5 --drift 0.001 --noise 0.1
+
+least_squares (no clock term) is printed as the bias-blind reference.
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Scenario
+from datagenerator import compute_distances, generate_trajectories_batch
+from model.least_squares import estimate_positions_least_squares
+from model.least_squares_with_clock import (estimate_positions_clock_window,
+                                            estimate_positions_least_squares_with_clock)
+
+LAYOUTS = {
+    4: [[0, 0], [0, 20], [20, 0], [20, 20]],
+    5: [[0, 0], [0, 20], [20, 0], [20, 20], [10, 25]],
+    6: [[0, 0], [0, 20], [20, 0], [20, 20], [10, 0], [10, 20]],
+}
+
+
+def run(name, estimate_positions, true_positions):
+    np.random.seed(0)
+    start = time.process_time()
+    fixes = estimate_positions()
+    seconds = time.process_time() - start
+    errors = np.linalg.norm(fixes - true_positions, axis=1)
+    p50, p95 = np.nanpercentile(errors, [50, 95])
+    print(f"{name:<24}{seconds:>8.3f}{1e6 * seconds / len(fixes):>10.1f}{p50:>9.3f}{p95:>10.3f}"
+          f"{100 * np.mean(np.isnan(errors)):>7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sliding-window clock-bias solver")
+    parser.add_argument('--epochs', type=int, default=5000)
+    parser.add_argument('--anchors', type=int, choices=sorted(LAYOUTS), default=4)
+    parser.add_argument('--windows', type=int, nargs='+', default=[1, 5, 10, 20, 50])
+    parser.add_argument('--dt', type=float, default=0.1, help='Seconds between epochs')
+    parser.add_argument('--bias', type=float, default=0.5, help='Reference clock bias at t = 0 (metres)')
+    parser.add_argument('--drift', type=float, default=0.01, help='Clock drift (metres per second)')
+    parser.add_argument('--noise', type=float, default=0.05, help='TDOA noise σ (metres)')
+    parser.add_argument('--blockage', type=float, default=0.05, help='Share of missing measurements')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    scenario = Scenario(np.array(LAYOUTS[args.anchors]), tdoa_noise_std=args.noise)
+    true_positions = generate_trajectories_batch(1, args.epochs, 'random', rng=rng, scenario=scenario)[0]
+    distances = compute_distances(true_positions, scenario.anchors)
+    t = np.arange(args.epochs) * args.dt
+    tdoa = (distances[:, 1:] - distances[:, [0]] + (args.bias + args.drift * t)[:, np.newaxis]
+            + rng.normal(0, args.noise, size=(args.epochs, args.anchors - 1)))
+    tdoa[rng.random(tdoa.shape) < args.blockage] = np.nan
+
+    print(f"{'model':<24}{'cpu s':>8}{'µs/epoch':>10}{'p50 m':>9}{'p95 m':>10}{'NaN %':>7}")
+    run('least_squares', lambda: estimate_positions_least_squares(tdoa, scenario=scenario), true_positions)
+    run('clock, per epoch', lambda: estimate_positions_least_squares_with_clock(tdoa, scenario=scenario),
+        true_positions)
+    for window in args.windows:
+        run(f'clock, window {window}',
+            lambda: estimate_positions_clock_window(tdoa, window=window, dt=args.dt, scenario=scenario),
+            true_positions)
+
+
+if __name__ == "__main__":
+    main()
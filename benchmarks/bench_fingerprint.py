@@ -0,0 +1,75 @@
+"""
+Build cost, memory and accuracy of the grid fingerprint solver per site, grid resolution and
+refinement depth, next to least_squares on the same epochs.
+
+    python benchmarks/bench_fingerprint.py --sites lab warehouse office_3d --resolutions 1.0 0.5 0.25
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import load_yaml_config
+from datagenerator import compute_distances
+from model.fingerprint import FingerprintIndex, estimate_positions_fingerprint
+from model.least_squares import estimate_positions_least_squares
+from sites import load_site_registry
+
+
+def errors(estimated, true_positions):
+    return np.linalg.norm(estimated - true_positions, axis=1)
+
+
+def row(label, seconds, err, num_epochs):
+    print(f"{label:<34}{num_epochs / seconds:>12.0f}{np.nanmedian(err):>9.3f}{np.nanpercentile(err, 95):>9.3f}"
+          f"{100 * np.mean(np.isnan(err)):>8.2f}")
+
+
+def main():
+    root = os.path.join(os.path.dirname(__file__), '..')
+    parser = argparse.ArgumentParser(description="Benchmark the grid fingerprint solver")
+    parser.add_argument('--cfg', default=os.path.join(root, 'configs', 'model.yaml'))
+    parser.add_argument('--sites_file', default=os.path.join(root, 'configs', 'sites.yaml'))
+    parser.add_argument('--sites', nargs='+', default=['lab', 'warehouse', 'office_3d'])
+    parser.add_argument('--resolutions', type=float, nargs='+', default=[1.0, 0.5, 0.25])
+    parser.add_argument('--levels', type=int, nargs='+', default=[0, 2, 4])
+    parser.add_argument('--points', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    registry = load_site_registry(args.sites_file, load_yaml_config(args.cfg)['defaults'])
+    for site in args.sites:
+        scenario = registry.scenario(site)
+        rng = np.random.default_rng(args.seed)
+        true_positions = rng.uniform(0, 1, size=(args.points, scenario.dim)) * scenario.upper_bounds
+        distances = compute_distances(true_positions, scenario.anchors)
+        tdoa = distances[:, 1:] - distances[:, [0]]
+        tdoa += rng.normal(0, scenario.tdoa_noise_std, size=tdoa.shape)
+
+        print(f"\n==> {site}: {scenario.anchors.shape[0]} anchors, dim {scenario.dim}, σ = {scenario.tdoa_noise_std}")
+        for resolution in args.resolutions:
+            index = FingerprintIndex(scenario.anchors, scenario.upper_bounds, resolution)
+            print(f"resolution {resolution:g} m: {index.points.shape[0]} grid points, "
+                  f"built in {1e3 * index.build_time:.1f} ms, {index.nbytes / 1e6:.2f} MB")
+        print(f"{'solver':<34}{'epochs/s':>12}{'median':>9}{'p95':>9}{'fail %':>8}")
+        for resolution in args.resolutions:
+            for levels in args.levels:
+                estimate_positions_fingerprint(tdoa[:1], resolution=resolution, scenario=scenario)  # build once
+                start = time.perf_counter()
+                estimated = estimate_positions_fingerprint(tdoa, resolution=resolution, refine_levels=levels,
+                                                           scenario=scenario)
+                row(f"fingerprint res={resolution:g} levels={levels}", time.perf_counter() - start,
+                    errors(estimated, true_positions), args.points)
+        for init in ("mean", "fingerprint"):
+            np.random.seed(args.seed)
+            start = time.perf_counter()
+            estimated = estimate_positions_least_squares(tdoa, init=init, scenario=scenario)
+            row(f"least_squares init={init}", time.perf_counter() - start,
+                errors(estimated, true_positions), args.points)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Iteration count, failure rate and accuracy of the iterative solvers per initialisation mode.
+
+    python benchmarks/bench_init.py --points 1000 --trajectories line circle sinusoid random
+
+Iterations are read from the profiling counters, so they include every Gauss-Newton/Taylor
+step of every epoch; "fail %" is the share of epochs without a fix (NaN).
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import time
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import profiling
+from config import load_yaml_config, scenario_from_defaults
+from datagenerator import generate_trajectory, compute_distances, simulate_tdoa_measurements
+from dataprocess import preprocess_tdoa
+from evaluation import evaluate
+from model.least_squares import estimate_positions_least_squares
+from model.taylor import estimate_positions_taylor
+from model.warm_start import INIT_MODES
+
+SOLVERS = {
+    "least_squares": estimate_positions_least_squares,
+    "taylor": estimate_positions_taylor,
+}
+
+
+def bench_init(name, tdoa, true_positions, init, scenario, seed):
+    profiler = profiling.enable_profiling()
+    np.random.seed(seed)
+    start = time.perf_counter()
+    estimated = SOLVERS[name](tdoa, init=init, scenario=scenario)
+    elapsed = time.perf_counter() - start
+    profiling.disable_profiling()
+
+    metrics, _, _ = evaluate(estimated, true_positions)
+    solved = profiler.counters[f"{name}.epochs"] - profiler.counters.get(f"{name}.unsolvable", 0)
+    return {
+        "iterations_per_epoch": profiler.counters[f"{name}.iterations"] / max(solved, 1),
+        "fail_rate": float(np.mean(np.isnan(estimated).any(axis=1))),
+        "rmse": float(metrics["RMSE"]),
+        "seconds": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare initialisation modes of the iterative solvers")
+    parser.add_argument('--cfg', default=os.path.join(os.path.dirname(__file__), '..', 'configs', 'model.yaml'))
+    parser.add_argument('--solvers', nargs='+', default=list(SOLVERS), choices=list(SOLVERS))
+    parser.add_argument('--inits', nargs='+', default=list(INIT_MODES), choices=list(INIT_MODES))
+    parser.add_argument('--trajectories', nargs='+', default=['line', 'circle', 'sinusoid', 'random'])
+    parser.add_argument('--points', type=int, default=1000)
+    parser.add_argument('--nlos', type=lambda x: x.lower() == 'true', default=False)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    config = load_yaml_config(args.cfg)
+    anchors = np.array([[0, 0], [0, 20], [20, 0], [20, 20]], dtype=float)
+    scenario = scenario_from_defaults(config['defaults'], anchors)
+
+    print(f"{'solver':<15}{'trajectory':<11}{'init':<10}{'iter/epoch':>11}{'fail %':>8}{'RMSE':>9}{'ms':>9}")
+    for trajectory, name in itertools.product(args.trajectories, args.solvers):
+        np.random.seed(args.seed)
+        true_positions = generate_trajectory(args.points, trajectory, dimension=2, scenario=scenario)
+        tdoa, problem_mask = simulate_tdoa_measurements(compute_distances(true_positions, scenario.anchors),
+                                                        args.nlos, False, False, scenario=scenario)
+        tdoa = preprocess_tdoa(tdoa, problem_mask, strategy="adaptive")
+        for init in args.inits:
+            row = bench_init(name, tdoa, true_positions, init, scenario, args.seed)
+            print(f"{name:<15}{trajectory:<11}{init:<10}{row['iterations_per_epoch']:>11.2f}"
+                  f"{100 * row['fail_rate']:>8.2f}{row['rmse']:>9.3f}{1e3 * row['seconds']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Estimator time with and without `model.memo.MemoizedEstimator` on a static-heavy workload: a
+share of the tags is parked and reports near-identical TDOA vectors (jitter well below the
+quantisation resolution), the rest move and report with the scenario's noise.
+
+    python benchmarks/bench_memo.py --tags 200 --reports 200 --static 0.0 0.5 0.9 1.0 --batch 2000
+    python benchmarks/bench_memo.py --models particle_filter --static 0.9
+
+Vectorised solvers pay a fixed cost per call, so the gain follows the share of calls that are
+all hits; estimators whose cost is per row (particle_filter) gain about 1 / miss rate.
+"""
+
+import argparse
+import os
+import sys
+import time
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import load_yaml_config, scenario_from_defaults
+from datagenerator import compute_distances
+from model import load_model
+from model.memo import MemoizedEstimator
+
+
+def make_workload(num_tags, num_reports, static_share, jitter, scenario, rng):
+    """(reports in arrival order (num_tags * num_reports, M-1), true positions) of parked and moving tags."""
+    num_static = int(round(static_share * num_tags))
+    start = rng.uniform(0, 1, size=(num_tags, scenario.dim)) * scenario.upper_bounds
+    velocity = rng.normal(0, 0.5, size=(num_tags, scenario.dim))
+    velocity[:num_static] = 0.0
+    t = np.arange(num_reports) * 0.1
+    positions = np.clip(start[np.newaxis] + t[:, np.newaxis, np.newaxis] * velocity[np.newaxis],
+                        0, scenario.upper_bounds).reshape(-1, scenario.dim)
+    distances = compute_distances(positions, scenario.anchors)
+    tdoa = distances[:, 1:] - distances[:, [0]]
+
+    noise = rng.normal(0, scenario.tdoa_noise_std, size=tdoa.shape).reshape(num_reports, num_tags, -1)
+    noise[:, :num_static] = noise[0, :num_static] + rng.normal(0, jitter, size=noise[:, :num_static].shape)
+    return tdoa + noise.reshape(tdoa.shape), positions
+
+
+def run(estimate_positions, tdoa, batch, scenario):
+    np.random.seed(0)
+    start = time.process_time()
+    fixes = np.concatenate([estimate_positions(tdoa[i:i + batch], scenario=scenario)
+                            for i in range(0, tdoa.shape[0], batch)])
+    return fixes, time.process_time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark memoised estimation on parked tags")
+    parser.add_argument('--cfg', default=os.path.join(os.path.dirname(__file__), '..', 'configs', 'model.yaml'))
+    parser.add_argument('--models', nargs='+', default=['least_squares', 'taylor', 'levenberg_marquardt'])
+    parser.add_argument('--tags', type=int, default=200)
+    parser.add_argument('--reports', type=int, default=200, help='Reports per tag')
+    parser.add_argument('--static', type=float, nargs='+', default=[0.0, 0.5, 0.9, 1.0], help='Share of parked tags')
+    parser.add_argument('--jitter', type=float, default=0.002, help='TDOA jitter of parked tags (metres)')
+    parser.add_argument('--resolution', type=float, default=0.01)
+    parser.add_argument('--batch', type=int, default=2000, help='Reports per estimator call')
+    args = parser.parse_args()
+
+    config = load_yaml_config(args.cfg)
+    scenario = scenario_from_defaults(config['defaults'], np.array([[0, 0], [0, 20], [20, 0], [20, 20]]))
+
+    print(f"{'model':<21}{'static':>7}{'plain s':>9}{'memo s':>9}{'speedup':>9}{'hit %':>7}{'RMSE':>8}{'memo RMSE':>11}")
+    for static_share in args.static:
+        tdoa, positions = make_workload(args.tags, args.reports, static_share, args.jitter, scenario,
+                                        np.random.default_rng(0))
+        for name in args.models:
+            plain, plain_seconds = run(load_model(name, config), tdoa, args.batch, scenario)
+            memo = MemoizedEstimator(load_model(name, config), args.resolution)
+            cached, memo_seconds = run(memo, tdoa, args.batch, scenario)
+            rmse = lambda fixes: np.sqrt(np.nanmean(np.sum((fixes - positions) ** 2, axis=1)))
+            print(f"{name:<21}{static_share:>7.2f}{plain_seconds:>9.3f}{memo_seconds:>9.3f}"
+                  f"{plain_seconds / memo_seconds:>9.1f}{100 * memo.hit_rate:>7.1f}{rmse(plain):>8.3f}{rmse(cached):>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
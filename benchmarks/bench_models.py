@@ -0,0 +1,175 @@
+"""
+Throughput / latency / memory / accuracy sweep over every model registered in configs/model.yaml.
+
+    python benchmarks/bench_models.py --sizes 100 1000 --anchors 4 6 --dims 2 3 --out bench.json
+
+Each result row records epochs/sec of one batch call, p50/p99 latency of single-epoch calls,
+peak traced memory of the batch call, RMSE and the NaN (failed fix) rate.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import load_yaml_config, scenario_from_defaults
+from datagenerator import generate_trajectory, compute_distances, simulate_tdoa_measurements
+from dataprocess import preprocess_tdoa
+from evaluation import evaluate
+from model import load_model
+from model.kernels import warmup
+
+INTERFERENCE_MIXES = {
+    "clean": (False, False, False),
+    "nlos": (True, False, False),
+    "multipath": (False, True, False),
+    "blockage": (False, False, True),
+    "all": (True, True, True),
+}
+
+
+def anchor_layout(num_anchors, dim, space):
+    """`num_anchors` anchors spread along the room perimeter, heights alternating in 3D."""
+    space_x, space_y, space_z = space
+    s = np.linspace(0, 4, num_anchors, endpoint=False)
+    side, frac = np.floor(s).astype(int), s - np.floor(s)
+    x = np.choose(side, [frac * space_x, np.full_like(frac, space_x), (1 - frac) * space_x, np.zeros_like(frac)])
+    y = np.choose(side, [np.zeros_like(frac), frac * space_y, np.full_like(frac, space_y), (1 - frac) * space_y])
+    if dim == 2:
+        return np.stack([x, y], axis=1)
+    z = np.where(np.arange(num_anchors) % 2 == 0, 0.2 * space_z, 0.8 * space_z)
+    return np.stack([x, y, z], axis=1)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def case_key(case):
+    return (case["model"], case["n"], case["anchors"], case["dim"], case["mix"])
+
+
+def compare_reports(baseline, results):
+    """Print epochs/sec and RMSE of `results` relative to a previously written report."""
+    previous = {case_key(case): case for case in baseline["results"] if case.get("status") == "ok"}
+    print(f"Compared with {baseline['meta'].get('git_revision')}:", file=sys.stderr)
+    for case in results:
+        old = previous.get(case_key(case))
+        if old is None or case["status"] != "ok":
+            continue
+        speedup = case["epochs_per_sec"] / old["epochs_per_sec"]
+        print(f"{case['model']:>26} n={case['n']:<7} M={case['anchors']:<2} {case['dim']}D {case['mix']:<9} "
+              f"throughput x{speedup:.2f}  rmse {old['rmse']:.3f} -> {case['rmse']:.3f}", file=sys.stderr)
+
+
+def bench_case(estimate_positions, tdoa, true_positions, latency_samples, scenario):
+    start = time.perf_counter()
+    estimated = estimate_positions(tdoa, scenario=scenario)
+    elapsed = time.perf_counter() - start
+
+    latencies = []
+    for row in tdoa[:latency_samples]:
+        t0 = time.perf_counter()
+        estimate_positions(row[np.newaxis, :], scenario=scenario)
+        latencies.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    estimate_positions(tdoa, scenario=scenario)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    metrics, _, _ = evaluate(estimated, true_positions)
+    return {
+        "epochs_per_sec": tdoa.shape[0] / elapsed,
+        "latency_p50_ms": float(np.percentile(latencies, 50) * 1e3),
+        "latency_p99_ms": float(np.percentile(latencies, 99) * 1e3),
+        "peak_mem_mb": peak / 2 ** 20,
+        "rmse": float(metrics["RMSE"]),
+        "nan_rate": float(np.mean(np.isnan(estimated).any(axis=1))),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every registered TDOA model")
+    parser.add_argument('--cfg', default=os.path.join(os.path.dirname(__file__), '..', 'configs', 'model.yaml'))
+    parser.add_argument('--models', nargs='+', default=None, help='Subset of models (default: all registered)')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--anchors', type=int, nargs='+', default=[4, 6])
+    parser.add_argument('--dims', type=int, nargs='+', default=[2, 3])
+    parser.add_argument('--mixes', nargs='+', default=list(INTERFERENCE_MIXES), choices=list(INTERFERENCE_MIXES))
+    parser.add_argument('--process', type=lambda x: x.lower() == 'true', default=True)
+    parser.add_argument('--latency_samples', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--out', default=None, help='Write the JSON report here (default: stdout)')
+    parser.add_argument('--compare', default=None, help='Earlier JSON report to compare against')
+    args = parser.parse_args()
+
+    config = load_yaml_config(args.cfg)
+    defaults = config['defaults']
+    space = (defaults['space_x'], defaults['space_y'], defaults['space_z'])
+    models = args.models or list(config['models'])
+    results = []
+    warmup()  # keep JIT compilation out of the timings
+
+    for dim, num_anchors, n, mix in itertools.product(args.dims, args.anchors, args.sizes, args.mixes):
+        scenario = scenario_from_defaults(defaults, anchor_layout(num_anchors, dim, space))
+        np.random.seed(args.seed)
+        true_positions = generate_trajectory(n, 'random', dimension=dim, scenario=scenario)
+        nlos, multipath, blockage = INTERFERENCE_MIXES[mix]
+        tdoa, problem_mask = simulate_tdoa_measurements(compute_distances(true_positions, scenario.anchors),
+                                                        nlos, multipath, blockage, scenario=scenario)
+        if args.process:
+            tdoa = preprocess_tdoa(tdoa, problem_mask, strategy="adaptive")
+
+        for model_name in models:
+            case = {"model": model_name, "n": n, "anchors": num_anchors, "dim": dim, "mix": mix,
+                    "nlos": nlos, "multipath": multipath, "blockage": blockage}
+            try:
+                estimate_positions = load_model(model_name, config)
+                np.random.seed(args.seed)
+                case.update(bench_case(estimate_positions, tdoa, true_positions, args.latency_samples, scenario))
+                case["status"] = "ok"
+            except Exception as e:
+                case["status"] = f"error: {e}"
+            results.append(case)
+            print(f"{model_name:>26} n={n:<7} M={num_anchors:<2} {dim}D {mix:<9} "
+                  + (f"{case['epochs_per_sec']:>12.0f} ep/s  rmse={case['rmse']:.3f}"
+                     if case["status"] == "ok" else case["status"]), file=sys.stderr)
+
+    report = {
+        "meta": {
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "process": args.process,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            compare_reports(json.load(f), results)
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
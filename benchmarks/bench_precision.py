@@ -0,0 +1,103 @@
+"""
+float64 vs float32 execution (`Scenario(precision=...)`, `--precision`) for every model on the
+same Monte Carlo batch: median and p95 error of each precision, the p99 shift between the two
+fixes of an epoch, the best-of-`--repeat` estimator time, the estimator's peak allocation
+(tracemalloc) and the bytes of the pipeline arrays (measurements, masks, fixes).
+
+    python benchmarks/bench_precision.py --runs 200 --points 100
+    python benchmarks/bench_precision.py --models least_squares taylor --dimension 3 --repeat 5
+
+The solvers evaluate residuals and Jacobians in the scenario's precision and keep the normal
+equations in float64; the closed forms, the clock model and the filters compute in float64
+and only store their output in float32, so they gain memory but not time.
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import load_yaml_config, scenario_from_defaults
+from datagenerator import generate_monte_carlo
+from dataprocess import preprocess_tdoa
+from model import load_model
+
+DEFAULT_MODELS = ['least_squares', 'levenberg_marquardt', 'taylor', 'irls', 'ransac', 'chan', 'fang',
+                  'least_squares_with_clock', 'fingerprint', 'particle_filter']
+
+
+def run(estimate_positions, tdoa, scenario, repeat):
+    """(fixes, best process time over `repeat` calls); the global RNG is reseeded for every call."""
+    best = np.inf
+    for _ in range(repeat):
+        np.random.seed(0)
+        start = time.process_time()
+        fixes = estimate_positions(tdoa, scenario=scenario)
+        best = min(best, time.process_time() - start)
+    return fixes, best
+
+
+def peak_bytes(estimate_positions, tdoa, scenario):
+    """Peak memory allocated during one call (numpy reports its buffers to tracemalloc)."""
+    np.random.seed(0)
+    tracemalloc.start()
+    estimate_positions(tdoa, scenario=scenario)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark float32 against float64 execution")
+    parser.add_argument('--cfg', default=os.path.join(os.path.dirname(__file__), '..', 'configs', 'model.yaml'))
+    parser.add_argument('--models', nargs='+', default=DEFAULT_MODELS)
+    parser.add_argument('--dimension', type=int, choices=[2, 3], default=2)
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--points', type=int, default=100, help='Epochs per run')
+    parser.add_argument('--noise', type=float, default=0.1, help='TDOA noise σ (metres)')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    config = load_yaml_config(args.cfg)
+    defaults = dict(config['defaults'], tdoa_noise_std=args.noise)
+    if args.dimension == 2:
+        anchors = np.array([[0, 0], [0, 20], [20, 0], [20, 20]])
+    else:
+        anchors = np.array([[0, 0, 4.5], [0, 20, 0.5], [20, 0, 0.5], [20, 20, 4.5], [10, 0, 4.5], [10, 20, 0.5]])
+
+    data = {}
+    for precision in ('float64', 'float32'):
+        scenario = scenario_from_defaults(dict(defaults, precision=precision), anchors)
+        true_positions, tdoa, problem_mask = generate_monte_carlo(
+            args.runs, args.points, trajectory_types='random', nlos_rates=0.1, blockage_rates=0.1, seed=0,
+            scenario=scenario
+        )
+        tdoa = preprocess_tdoa(tdoa.reshape(-1, tdoa.shape[-1]), problem_mask.reshape(-1, tdoa.shape[-1]))
+        data[precision] = scenario, true_positions.reshape(-1, scenario.dim), tdoa, problem_mask
+
+    print(f"{tdoa.shape[0]} epochs, {args.dimension}D")
+    for precision, (scenario, true_positions, tdoa, problem_mask) in data.items():
+        print(f"  {precision}: tdoa {tdoa.nbytes / 1e6:.2f} MB, positions {true_positions.nbytes / 1e6:.2f} MB, "
+              f"problem_mask ({problem_mask.dtype}) {problem_mask.nbytes / 1e6:.2f} MB")
+
+    print(f"{'model':<26}{'p50/p95 f64':>14}{'p50/p95 f32':>14}{'|Δfix| p99':>11}"
+          f"{'f64 s':>8}{'f32 s':>8}{'speedup':>8}{'f64 MB':>8}{'f32 MB':>8}")
+    for name in args.models:
+        fixes, seconds, peak, errors = {}, {}, {}, {}
+        for precision, (scenario, true_positions, tdoa, _) in data.items():
+            estimate_positions = load_model(name, config)
+            fixes[precision], seconds[precision] = run(estimate_positions, tdoa, scenario, args.repeat)
+            peak[precision] = peak_bytes(estimate_positions, tdoa, scenario) / 1e6
+            errors[precision] = np.nanpercentile(np.linalg.norm(fixes[precision] - true_positions, axis=1), [50, 95])
+        shift = np.linalg.norm(fixes['float32'].astype(float) - fixes['float64'], axis=1)
+        shift_p99 = np.nanpercentile(shift, 99) if np.any(np.isfinite(shift)) else np.nan
+        print(f"{name:<26}{'%.3f/%.3f' % tuple(errors['float64']):>14}{'%.3f/%.3f' % tuple(errors['float32']):>14}"
+              f"{shift_p99:>11.1e}{seconds['float64']:>8.3f}{seconds['float32']:>8.3f}"
+              f"{seconds['float64'] / seconds['float32']:>8.2f}{peak['float64']:>8.1f}{peak['float32']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
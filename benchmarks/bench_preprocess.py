@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dataprocess import preprocess_tdoa
+
+
+def legacy_preprocess_adaptive(tdoa_measurements, problem_mask):
+    """The former per-row implementation of strategy="adaptive", kept as the baseline."""
+    tdoa = tdoa_measurements.copy()
+    tdoa[problem_mask == 1] = np.nan
+    for i in range(tdoa.shape[0]):
+        multipath_idx = (problem_mask[i] == 2)
+        valid = tdoa[i][(problem_mask[i] == 0) & ~np.isnan(tdoa[i])]
+        tdoa[i][multipath_idx] = np.median(valid) if valid.size > 0 else np.nan
+    for i in range(tdoa.shape[0]):
+        blockage_idx = (problem_mask[i] == 3)
+        valid = tdoa[i][(problem_mask[i] == 0) & ~np.isnan(tdoa[i])]
+        tdoa[i][blockage_idx] = np.mean(valid) if valid.size >= tdoa.shape[1] // 2 else np.nan
+    return tdoa
+
+
+def make_inputs(num_rows, num_columns, seed=0):
+    rng = np.random.default_rng(seed)
+    tdoa = rng.normal(0, 5, size=(num_rows, num_columns))
+    problem_mask = rng.choice(4, size=tdoa.shape, p=[0.7, 0.1, 0.1, 0.1]).astype(np.int8)
+    tdoa[problem_mask == 3] = np.nan
+    return tdoa, problem_mask
+
+
+def best_of(func, repeat):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark preprocess_tdoa(strategy='adaptive')")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10**4, 10**5, 10**6])
+    parser.add_argument('--anchors', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--skip_legacy_above', type=int, default=10**5,
+                        help='Only time the per-row baseline up to this many rows')
+    args = parser.parse_args()
+
+    print(f"{'rows':>10} {'legacy (s)':>12} {'vectorised (s)':>15} {'in-place (s)':>13} {'speedup':>9}")
+    for n in args.sizes:
+        tdoa, problem_mask = make_inputs(n, args.anchors - 1)
+        vectorised = best_of(lambda: preprocess_tdoa(tdoa, problem_mask), args.repeat)
+        scratch = tdoa.copy()
+        inplace = best_of(lambda: preprocess_tdoa(np.copyto(scratch, tdoa) or scratch, problem_mask, inplace=True),
+                          args.repeat)
+        if n <= args.skip_legacy_above:
+            legacy = best_of(lambda: legacy_preprocess_adaptive(tdoa, problem_mask), 1)
+            print(f"{n:>10} {legacy:>12.4f} {vectorised:>15.4f} {inplace:>13.4f} {legacy / vectorised:>8.1f}x")
+        else:
+            print(f"{n:>10} {'-':>12} {vectorised:>15.4f} {inplace:>13.4f} {'-':>9}")
+
+
+if __name__ == "__main__":
+    main()
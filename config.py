@@ -4,6 +4,9 @@ import yaml
 
 args = None
 config = None
+scenario = None
+
+PRECISIONS = ('float64', 'float32')
 
 def load_yaml_config(yaml_file):
     """Load configuration from a YAML file."""
@@ -30,6 +33,18 @@ def parse_args():
     parser.add_argument('--blockage', type=lambda x: x.lower() == 'true', default=False, help='Enable blockage (true/false)')
     parser.add_argument('--process', type=lambda x: x.lower() == 'true', default=True, help='Enable preprocessing (true/false)')
     parser.add_argument('--trajectory', default='line', choices=['line', 'circle', 'sinusoid', 'random'], help='Trajectory type for target movement')
+    parser.add_argument('--sites', default='configs/sites.yaml', help='Path to the site anchor-layout YAML file')
+    parser.add_argument('--site', default=None, help='Site ID from --sites to use instead of the default corner anchors')
+    parser.add_argument('--per_point', type=lambda x: x.lower() == 'true', default=False, help='Print every per-point error (true/false)')
+    parser.add_argument('--dataset', default=None, help='Replay a stored dataset directory instead of generating data')
+    parser.add_argument('--save_dataset', default=None, help='Write the generated data to this dataset directory')
+    parser.add_argument('--workers', type=int, default=1, help='Number of processes used by the estimator')
+    parser.add_argument('--seed', type=int, default=None, help='Seed of the simulation and the stochastic models, also with --workers (default: unseeded)')
+    parser.add_argument('--chunk_size', type=int, default=0, help='Stream the pipeline in chunks of this many epochs (0 = batch mode)')
+    parser.add_argument('--profile', default=None, help='Write per-stage timings and estimator counters to this JSON file')
+    parser.add_argument('--memo_resolution', type=float, default=0.0, help='Memoise fixes of TDOA rows quantised to this resolution (0 = off)')
+    parser.add_argument('--memo_size', type=int, default=100000, help='Number of memoised fixes kept (LRU)')
+    parser.add_argument('--precision', choices=PRECISIONS, default=None, help='Floating-point width of measurements and positions (default: model.yaml)')
 
     # If running in pytest, instead of parsing the command line, use the default parameter
     if "pytest" in sys.modules:
@@ -99,3 +114,84 @@ def get_multipath_params():
 def get_blockage_prob():
     _, config = get_config()
     return config['defaults']['blockage_drop_prob']
+
+def get_precision():
+    args, config = get_config()
+    return args.precision if args.precision is not None else config['defaults'].get('precision', 'float64')
+
+
+class Scenario:
+    """
+    Anchor geometry and simulation parameters of one deployment.
+    It is passed explicitly to the data generator, the estimators and the plots, so one process
+    can work with several anchor layouts and nothing is read from the CLI or YAML on import.
+
+    `precision` ("float64" or "float32") is the dtype of the measurements and positions the
+    generator and the estimators produce; the anchors themselves are always kept in float64.
+    """
+
+    def __init__(self, anchors, space=(20, 20, 5), num_targets=10, tdoa_noise_std=1.0,
+                 nlos_params=(1.0, 0.5), multipath_params=(0.5, 0.2), blockage_prob=0.2, precision='float64'):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision '{precision}', expected one of {PRECISIONS}")
+        # Private read-only copy: cached solver artifacts stay valid for the life of the scenario
+        self.anchors = np.array(anchors, dtype=float)
+        self.anchors.flags.writeable = False
+        self.space = tuple(space)
+        self.num_targets = num_targets
+        self.tdoa_noise_std = tdoa_noise_std
+        self.nlos_params = tuple(nlos_params)
+        self.multipath_params = tuple(multipath_params)
+        self.blockage_prob = blockage_prob
+        self.dtype = np.dtype(precision)
+        # Solver artifacts derived from the geometry (filled lazily by the models)
+        self.cache = {}
+
+    @property
+    def dim(self):
+        return self.anchors.shape[1]
+
+    @property
+    def upper_bounds(self):
+        """Room size along each spatial axis, shape=(dim,)."""
+        return np.array(self.space[:self.dim], dtype=float)
+
+    @property
+    def precision(self):
+        return self.dtype.name
+
+    def __repr__(self):
+        return f"Scenario(anchors={self.anchors.shape[0]}, dim={self.dim}, space={self.space})"
+
+def get_scenario():
+    """Scenario described by the command line and model.yaml, built once on first use."""
+    global scenario
+    if scenario is None:
+        scenario = Scenario(
+            get_anchors(),
+            space=get_space(),
+            num_targets=get_num_targets(),
+            tdoa_noise_std=get_tdoa_noise_std(),
+            nlos_params=get_nlos_params(),
+            multipath_params=get_multipath_params(),
+            blockage_prob=get_blockage_prob(),
+            precision=get_precision(),
+        )
+    return scenario
+
+def scenario_from_defaults(defaults, anchors):
+    """Scenario for `anchors` using the simulation parameters of a model.yaml `defaults` block."""
+    return Scenario(
+        anchors,
+        space=(defaults['space_x'], defaults['space_y'], defaults['space_z']),
+        num_targets=defaults['num_targets'],
+        tdoa_noise_std=defaults['tdoa_noise_std'],
+        nlos_params=(defaults['nlos_bias_mean'], defaults['nlos_bias_std']),
+        multipath_params=(defaults['multipath_delay_mean'], defaults['multipath_delay_std']),
+        blockage_prob=defaults['blockage_drop_prob'],
+        precision=defaults.get('precision', 'float64'),
+    )
+
+def resolve_scenario(scenario=None):
+    """`scenario` itself, or the default one from the command line when it is None."""
+    return get_scenario() if scenario is None else scenario
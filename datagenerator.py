@@ -1,10 +1,7 @@
 import numpy as np
-from scipy.interpolate import CubicSpline
-from config import (
-    get_space, get_num_targets, get_anchors,
-    get_tdoa_noise_std, get_nlos_params,
-    get_multipath_params, get_blockage_prob
-)
+from scipy.interpolate import CubicHermiteSpline, CubicSpline
+from config import resolve_scenario
+from dataset import create_dataset
 # from config import (
 #     SPACE_X, SPACE_Y, SPACE_Z, NUM_TARGETS, ANCHORS, TDOA_NOISE_STD,
 #     NLOS_BIAS_MEAN, NLOS_BIAS_STD,
@@ -18,46 +15,49 @@ from config import (
 #     else:
 #         return np.random.uniform([0, 0, 0], [SPACE_X, SPACE_Y, SPACE_Z], size=(num_targets, 3))
 
-SPACE_X, SPACE_Y, SPACE_Z = get_space()
-NUM_TARGETS = get_num_targets()
-ANCHORS = get_anchors()
-TDOA_NOISE_STD = get_tdoa_noise_std()
-NLOS_BIAS_MEAN, NLOS_BIAS_STD = get_nlos_params()
-MULTIPATH_DELAY_MEAN, MULTIPATH_DELAY_STD = get_multipath_params()
-BLOCKAGE_DROP_PROB = get_blockage_prob()
-
-def generate_trajectory(num_points=NUM_TARGETS, trajectory_type='line', dimension=2, speed=1.0):
+def generate_trajectory(num_points=None, trajectory_type='line', dimension=2, speed=1.0, scenario=None, t=None):
     """
     Generates a continuous motion trajectory.
     Parameters:
-        num_points: number of trajectory points
+        num_points: number of trajectory points (default: scenario.num_targets)
         trajectory_type: type of trajectory ('line', 'circle', 'sinusoid', 'random')
         dimension: 2D or 3D
         speed: movement speed (m/s)
+        scenario: config.Scenario giving the room size (default: from the command line)
+        t: times (s) of the points (default: num_points spread over 0-10 s); 'random' always
+           draws its control points over 0-10 s
     Returns:
         ndarray, shape=(num_points, dimension): coordinates of track points
     """
-    t = np.linspace(0, 10, num_points)  # timeline, 10 secs
+    scenario = resolve_scenario(scenario)
+    space_x, space_y, space_z = scenario.space
+    if t is not None:
+        t = np.asarray(t, dtype=float)
+        num_points = t.size
+    if num_points is None:
+        num_points = scenario.num_targets
+    if t is None:
+        t = np.linspace(0, 10, num_points)  # timeline, 10 secs
     if dimension == 2:
         if trajectory_type == 'line':
             x = speed * t
-            y = np.full_like(x, SPACE_Y / 2)
+            y = np.full_like(x, space_y / 2)
             return np.vstack((x, y)).T
         elif trajectory_type == 'circle':
-            radius = min(SPACE_X, SPACE_Y) / 4
-            x = SPACE_X / 2 + radius * np.cos(t)
-            y = SPACE_Y / 2 + radius * np.sin(t)
+            radius = min(space_x, space_y) / 4
+            x = space_x / 2 + radius * np.cos(t)
+            y = space_y / 2 + radius * np.sin(t)
             return np.vstack((x, y)).T
         elif trajectory_type == 'sinusoid':
             x = speed * t
-            y = SPACE_Y / 2 + (SPACE_Y / 4) * np.sin(t)
+            y = space_y / 2 + (space_y / 4) * np.sin(t)
             return np.vstack((x, y)).T
         elif trajectory_type == 'random':
             # Generate random control points and use spline interpolation
             num_control = min(5, num_points)
             control_t = np.linspace(0, 10, num_control)
-            control_x = np.random.uniform(0, SPACE_X, num_control)
-            control_y = np.random.uniform(0, SPACE_Y, num_control)
+            control_x = np.random.uniform(0, space_x, num_control)
+            control_y = np.random.uniform(0, space_y, num_control)
             spline_x = CubicSpline(control_t, control_x, bc_type='natural')
             spline_y = CubicSpline(control_t, control_y, bc_type='natural')
             x = spline_x(t)
@@ -66,26 +66,26 @@ def generate_trajectory(num_points=NUM_TARGETS, trajectory_type='line', dimensio
     else:  # 3D
         if trajectory_type == 'line':
             x = speed * t
-            y = np.full_like(x, SPACE_Y / 2)
-            z = np.full_like(x, SPACE_Z / 2)
+            y = np.full_like(x, space_y / 2)
+            z = np.full_like(x, space_z / 2)
             return np.vstack((x, y, z)).T
         elif trajectory_type == 'circle':
-            radius = min(SPACE_X, SPACE_Y) / 4
-            x = SPACE_X / 2 + radius * np.cos(t)
-            y = SPACE_Y / 2 + radius * np.sin(t)
-            z = np.full_like(x, SPACE_Z / 2)
+            radius = min(space_x, space_y) / 4
+            x = space_x / 2 + radius * np.cos(t)
+            y = space_y / 2 + radius * np.sin(t)
+            z = np.full_like(x, space_z / 2)
             return np.vstack((x, y, z)).T
         elif trajectory_type == 'sinusoid':
             x = speed * t
-            y = SPACE_Y / 2 + (SPACE_Y / 4) * np.sin(t)
-            z = np.full_like(x, SPACE_Z / 2)
+            y = space_y / 2 + (space_y / 4) * np.sin(t)
+            z = np.full_like(x, space_z / 2)
             return np.vstack((x, y, z)).T
         elif trajectory_type == 'random':
             num_control = min(5, num_points)
             control_t = np.linspace(0, 10, num_control)
-            control_x = np.random.uniform(0, SPACE_X, num_control)
-            control_y = np.random.uniform(0, SPACE_Y, num_control)
-            control_z = np.random.uniform(0, SPACE_Z, num_control)
+            control_x = np.random.uniform(0, space_x, num_control)
+            control_y = np.random.uniform(0, space_y, num_control)
+            control_z = np.random.uniform(0, space_z, num_control)
             spline_x = CubicSpline(control_t, control_x, bc_type='natural')
             spline_y = CubicSpline(control_t, control_y, bc_type='natural')
             spline_z = CubicSpline(control_t, control_z, bc_type='natural')
@@ -95,36 +95,90 @@ def generate_trajectory(num_points=NUM_TARGETS, trajectory_type='line', dimensio
             return np.vstack((x, y, z)).T
     return np.zeros((num_points, dimension))
 
+class TrajectoryStream:
+    """
+    One continuous trajectory handed out piece by piece: `next(num_points)` returns the next
+    `num_points` points, `dt` s apart, starting where the previous call stopped.
+    dt defaults to the spacing of `generate_trajectory` (scenario.num_targets points over 10 s),
+    so the first num_targets points follow the same path. Past 10 s 'line' and 'sinusoid' bounce
+    off the x walls instead of leaving the room, and 'random' passes through a new random control
+    point every 2.5 s (a Catmull-Rom spline, so only the four controls around `t` are kept).
+    """
+
+    CONTROL_SPACING = 2.5  # s, the control spacing of generate_trajectory's 'random' type
+
+    def __init__(self, trajectory_type='line', dt=None, dimension=2, speed=1.0, scenario=None):
+        self.scenario = resolve_scenario(scenario)
+        self.trajectory_type = trajectory_type
+        self.dimension = dimension
+        self.speed = speed
+        self.dt = 10.0 / max(self.scenario.num_targets - 1, 1) if dt is None else dt
+        self.epoch = 0
+        self.first_control = -1   # index k of the oldest kept control point, at time k * CONTROL_SPACING
+        self.controls = np.empty((0, dimension))
+
+    def _random(self, t):
+        """Catmull-Rom spline through random control points, drawn as time advances."""
+        h = self.CONTROL_SPACING
+        first, last = int(np.floor(t[0] / h)) - 1, int(np.floor(t[-1] / h)) + 2
+        self.controls = self.controls[max(first - self.first_control, 0):]
+        self.first_control = max(first, self.first_control)
+        missing = last - self.first_control + 1 - len(self.controls)
+        if missing > 0:
+            upper = np.asarray(self.scenario.space[:self.dimension], dtype=float)
+            self.controls = np.vstack([self.controls, np.random.uniform(0, upper, size=(missing, self.dimension))])
+        knots = (self.first_control + np.arange(len(self.controls))) * h
+        slopes = (self.controls[2:] - self.controls[:-2]) / (2 * h)
+        return CubicHermiteSpline(knots[1:-1], self.controls[1:-1], slopes)(t)
+
+    def next(self, num_points):
+        t = (self.epoch + np.arange(num_points)) * self.dt
+        self.epoch += num_points
+        if self.trajectory_type == 'random':
+            return self._random(t)
+        points = generate_trajectory(trajectory_type=self.trajectory_type, dimension=self.dimension,
+                                     speed=self.speed, scenario=self.scenario, t=t)
+        if self.trajectory_type in ('line', 'sinusoid'):
+            space_x = self.scenario.space[0]
+            points[:, 0] = space_x - np.abs(space_x - points[:, 0] % (2 * space_x))
+        return points
+
 def compute_distances(points, anchors):
     return np.linalg.norm(points[:, np.newaxis, :] - anchors[np.newaxis, :, :], axis=2)
 
-def simulate_tdoa_measurements(distances, enable_nlos, enable_multipath, enable_blockage, reference_index=0):
+def simulate_tdoa_measurements(distances, enable_nlos, enable_multipath, enable_blockage, reference_index=0,
+                               scenario=None):
+    scenario = resolve_scenario(scenario)
+    noise_std = scenario.tdoa_noise_std
+    nlos_bias_mean, nlos_bias_std = scenario.nlos_params
+    multipath_delay_mean, multipath_delay_std = scenario.multipath_params
+    blockage_drop_prob = scenario.blockage_prob
     N, M = distances.shape
     ref_dist = distances[:, reference_index][:, np.newaxis]
     tdoa = distances - ref_dist
 
-    noise = np.random.normal(0, TDOA_NOISE_STD, size=tdoa.shape)
+    noise = np.random.normal(0, noise_std, size=tdoa.shape)
     tdoa_noisy = tdoa + noise
-    problem_mask = np.zeros_like(tdoa_noisy, dtype=int)
+    problem_mask = np.zeros_like(tdoa_noisy, dtype=np.int8)
 
     if enable_nlos:
         nlos_mask = np.random.rand(*tdoa.shape) < 0.2
-        bias = np.random.normal(NLOS_BIAS_MEAN, NLOS_BIAS_STD, size=tdoa.shape)
+        bias = np.random.normal(nlos_bias_mean, nlos_bias_std, size=tdoa.shape)
         tdoa_noisy += nlos_mask * bias
         problem_mask[nlos_mask] = 1
 
     if enable_multipath:
         multipath_mask = np.random.rand(*tdoa.shape) < 0.2
-        delay = np.abs(np.random.normal(MULTIPATH_DELAY_MEAN, MULTIPATH_DELAY_STD, size=tdoa.shape))
+        delay = np.abs(np.random.normal(multipath_delay_mean, multipath_delay_std, size=tdoa.shape))
         tdoa_noisy += multipath_mask * delay
         problem_mask[multipath_mask] = 2
 
     if enable_blockage:
-        blockage_mask = np.random.rand(*tdoa.shape) < BLOCKAGE_DROP_PROB
+        blockage_mask = np.random.rand(*tdoa.shape) < blockage_drop_prob
         tdoa_noisy[blockage_mask] = np.nan
         problem_mask[blockage_mask] = 3
 
-    tdoa_noisy = np.delete(tdoa_noisy, reference_index, axis=1)
+    tdoa_noisy = np.delete(tdoa_noisy, reference_index, axis=1).astype(scenario.dtype, copy=False)
     problem_mask = np.delete(problem_mask, reference_index, axis=1)
 
     return tdoa_noisy, problem_mask
@@ -138,10 +192,145 @@ def simulate_tdoa_measurements(distances, enable_nlos, enable_multipath, enable_
 #     return targets, tdoa_measurements, problem_mask
 
 def generate_simulated_data(enable_nlos=False, enable_multipath=False, enable_blockage=False, 
-                            trajectory_type='line'):
-    targets = generate_trajectory(NUM_TARGETS, trajectory_type, dimension=ANCHORS.shape[1])
-    distances = compute_distances(targets, ANCHORS)
+                            trajectory_type='line', scenario=None):
+    scenario = resolve_scenario(scenario)
+    targets = generate_trajectory(scenario.num_targets, trajectory_type, dimension=scenario.dim, scenario=scenario)
+    distances = compute_distances(targets, scenario.anchors)
     tdoa_measurements, problem_mask = simulate_tdoa_measurements(
-        distances, enable_nlos, enable_multipath, enable_blockage
+        distances, enable_nlos, enable_multipath, enable_blockage, scenario=scenario
     )
-    return targets, tdoa_measurements, problem_mask
\ No newline at end of file
+    return targets.astype(scenario.dtype, copy=False), tdoa_measurements, problem_mask
+
+#   batched Monte Carlo generation
+
+TRAJECTORY_TYPES = ('line', 'circle', 'sinusoid', 'random')
+
+def _per_run(value, num_runs, dtype=float):
+    """Broadcast a scalar or per-run sequence to shape (num_runs,)."""
+    return np.broadcast_to(np.asarray(value, dtype=dtype), (num_runs,))
+
+def generate_trajectories_batch(num_runs, num_points, trajectory_types='line', speeds=1.0, rng=None,
+                                scenario=None):
+    """
+    Vectorised `generate_trajectory` for many independent runs.
+    Parameters:
+        trajectory_types: one type for all runs, or a sequence with one type per run
+        speeds: scalar or (num_runs,) speeds (m/s) used by 'line' and 'sinusoid'
+        rng: numpy.random.Generator (default: fresh unseeded generator)
+    Returns:
+        ndarray, shape=(num_runs, num_points, dim)
+    """
+    scenario = resolve_scenario(scenario)
+    rng = np.random.default_rng() if rng is None else rng
+    space_x, space_y, space_z = scenario.space
+    dim = scenario.dim
+    types = _per_run(trajectory_types, num_runs, dtype=object)
+    speeds = _per_run(speeds, num_runs)
+
+    t = np.linspace(0, 10, num_points)  # timeline, 10 secs
+    centre = np.array([space_x / 2, space_y / 2, space_z / 2])[:dim]
+    positions = np.zeros((num_runs, num_points, dim))
+    positions[:] = centre  # y (and z) held at the room centre unless the type moves them
+
+    runs = np.flatnonzero((types == 'line') | (types == 'sinusoid'))
+    positions[runs, :, 0] = speeds[runs, np.newaxis] * t
+    runs = np.flatnonzero(types == 'sinusoid')
+    positions[runs, :, 1] = space_y / 2 + (space_y / 4) * np.sin(t)
+
+    runs = np.flatnonzero(types == 'circle')
+    radius = min(space_x, space_y) / 4
+    positions[runs, :, 0] = space_x / 2 + radius * np.cos(t)
+    positions[runs, :, 1] = space_y / 2 + radius * np.sin(t)
+
+    runs = np.flatnonzero(types == 'random')
+    if runs.size > 0:
+        # One natural spline through random control points per run, all fitted in a single call
+        num_control = min(5, num_points)
+        control_t = np.linspace(0, 10, num_control)
+        control = rng.uniform(0, np.array([space_x, space_y, space_z])[:dim], size=(num_control, runs.size, dim))
+        positions[runs] = np.moveaxis(CubicSpline(control_t, control, bc_type='natural')(t), 0, 1)
+
+    unknown = ~np.isin(types, TRAJECTORY_TYPES)
+    positions[unknown] = 0.0
+    return positions
+
+def simulate_tdoa_batch(distances, nlos_rates=0.0, multipath_rates=0.0, blockage_rates=0.0, reference_index=0,
+                        rng=None, scenario=None):
+    """
+    Vectorised `simulate_tdoa_measurements` for distances of shape (runs, points, M), with an
+    NLOS / multipath / blockage rate per run (0 disables that interference for the run).
+    Returns tdoa (runs, points, M-1) in scenario.dtype and problem_mask (runs, points, M-1) as int8.
+    The noise is drawn in float64, so a seed gives the same draws at either precision.
+    """
+    scenario = resolve_scenario(scenario)
+    rng = np.random.default_rng() if rng is None else rng
+    num_runs = distances.shape[0]
+    nlos_bias_mean, nlos_bias_std = scenario.nlos_params
+    multipath_delay_mean, multipath_delay_std = scenario.multipath_params
+
+    tdoa = distances - distances[:, :, [reference_index]]
+    tdoa += rng.normal(0, scenario.tdoa_noise_std, size=tdoa.shape)
+    problem_mask = np.zeros(tdoa.shape, dtype=np.int8)
+
+    nlos_mask = rng.random(tdoa.shape) < _per_run(nlos_rates, num_runs)[:, np.newaxis, np.newaxis]
+    tdoa += nlos_mask * rng.normal(nlos_bias_mean, nlos_bias_std, size=tdoa.shape)
+    problem_mask[nlos_mask] = 1
+
+    multipath_mask = rng.random(tdoa.shape) < _per_run(multipath_rates, num_runs)[:, np.newaxis, np.newaxis]
+    tdoa += multipath_mask * np.abs(rng.normal(multipath_delay_mean, multipath_delay_std, size=tdoa.shape))
+    problem_mask[multipath_mask] = 2
+
+    blockage_mask = rng.random(tdoa.shape) < _per_run(blockage_rates, num_runs)[:, np.newaxis, np.newaxis]
+    tdoa[blockage_mask] = np.nan
+    problem_mask[blockage_mask] = 3
+
+    tdoa = np.delete(tdoa, reference_index, axis=2).astype(scenario.dtype, copy=False)
+    problem_mask = np.delete(problem_mask, reference_index, axis=2)
+    return tdoa, problem_mask
+
+def generate_monte_carlo(num_runs, num_points=None, trajectory_types='line', speeds=1.0, nlos_rates=0.0,
+                         multipath_rates=0.0, blockage_rates=0.0, seed=None, scenario=None):
+    """
+    Many independent simulated runs at once.
+    Returns true_positions (runs, points, dim), tdoa (runs, points, M-1), both in scenario.dtype,
+    and problem_mask (int8).
+    """
+    scenario = resolve_scenario(scenario)
+    num_points = scenario.num_targets if num_points is None else num_points
+    rng = seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
+
+    targets = generate_trajectories_batch(num_runs, num_points, trajectory_types, speeds, rng, scenario)
+    distances = np.linalg.norm(targets[:, :, np.newaxis, :] - scenario.anchors, axis=3)
+    tdoa, problem_mask = simulate_tdoa_batch(distances, nlos_rates, multipath_rates, blockage_rates,
+                                             rng=rng, scenario=scenario)
+    return targets.astype(scenario.dtype, copy=False), tdoa, problem_mask
+
+def write_monte_carlo(out_dir, num_runs, num_points=None, chunk_runs=1000, trajectory_types='line', speeds=1.0,
+                      nlos_rates=0.0, multipath_rates=0.0, blockage_rates=0.0, seed=None, scenario=None):
+    """
+    Generate `num_runs` runs in chunks of `chunk_runs` and write them straight into
+    true_positions.npy, tdoa.npy and problem_mask.npy under `out_dir`, so the corpus never has to
+    fit in memory. Per-run arguments may be sequences of length `num_runs`. Chunk k draws from
+    the k-th stream spawned from `seed`, so the output is reproducible for a given seed and chunk size.
+    The result is a `dataset` directory; open it with `dataset.open_dataset`.
+    """
+    scenario = resolve_scenario(scenario)
+    num_points = scenario.num_targets if num_points is None else num_points
+    columns = create_dataset(out_dir, (num_runs, num_points), scenario,
+                             extra_meta={'generator': 'monte_carlo', 'seed': seed, 'chunk_runs': chunk_runs})
+    positions_out, tdoa_out, mask_out = columns['true_positions'], columns['tdoa'], columns['problem_mask']
+
+    per_run = dict(trajectory_types=_per_run(trajectory_types, num_runs, dtype=object),
+                   speeds=_per_run(speeds, num_runs), nlos_rates=_per_run(nlos_rates, num_runs),
+                   multipath_rates=_per_run(multipath_rates, num_runs),
+                   blockage_rates=_per_run(blockage_rates, num_runs))
+    starts = range(0, num_runs, chunk_runs)
+    for start, seed_seq in zip(starts, np.random.SeedSequence(seed).spawn(len(starts))):
+        stop = min(start + chunk_runs, num_runs)
+        chunk = generate_monte_carlo(stop - start, num_points, seed=np.random.default_rng(seed_seq),
+                                     scenario=scenario, **{k: v[start:stop] for k, v in per_run.items()})
+        positions_out[start:stop], tdoa_out[start:stop], mask_out[start:stop] = chunk
+
+    for array in (positions_out, tdoa_out, mask_out):
+        array.flush()
+    return out_dir
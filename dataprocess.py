@@ -1,21 +1,23 @@
 import numpy as np
-# from config import NLOS_BIAS_MEAN, NLOS_BIAS_STD, MULTIPATH_DELAY_MEAN, MULTIPATH_DELAY_STD
-from config import (
-    get_space, get_num_targets, get_anchors,
-    get_tdoa_noise_std, get_nlos_params,
-    get_multipath_params, get_blockage_prob
-)
-
-SPACE_X, SPACE_Y, SPACE_Z = get_space()
-NUM_TARGETS = get_num_targets()
-ANCHORS = get_anchors()
-TDOA_NOISE_STD = get_tdoa_noise_std()
-NLOS_BIAS_MEAN, NLOS_BIAS_STD = get_nlos_params()
-MULTIPATH_DELAY_MEAN, MULTIPATH_DELAY_STD = get_multipath_params()
-BLOCKAGE_DROP_PROB = get_blockage_prob()
-
-def preprocess_tdoa(tdoa_measurements, problem_mask, strategy="adaptive"):
-    tdoa = tdoa_measurements.copy()
+
+def _row_median(values, counts):
+    """Median of the non-NaN entries of every row; `counts` is the number of such entries."""
+    ordered = np.sort(values, axis=1)  # NaN sorts to the end of each row
+    rows = np.arange(values.shape[0])
+    lo = np.maximum((counts - 1) // 2, 0)
+    hi = counts // 2
+    median = 0.5 * (ordered[rows, lo] + ordered[rows, hi])
+    median[counts == 0] = np.nan
+    return median
+
+def preprocess_tdoa(tdoa_measurements, problem_mask, strategy="adaptive", inplace=False):
+    """
+    Interference-aware cleaning of a (N, M-1) TDOA matrix using `problem_mask`
+    (1 = NLOS, 2 = multipath, 3 = blockage). All strategies are vectorised over rows.
+    With `inplace=True` the input array is modified and returned instead of copied.
+    The result keeps the dtype of `tdoa_measurements` (float32 stays float32).
+    """
+    tdoa = tdoa_measurements if inplace else tdoa_measurements.copy()
 
     if strategy == "mask":
         tdoa[problem_mask > 0] = np.nan
@@ -25,23 +27,21 @@ def preprocess_tdoa(tdoa_measurements, problem_mask, strategy="adaptive"):
         nlos_mask = (problem_mask == 1)
         tdoa[nlos_mask] = np.nan
 
+        # Clean measurements of every row: the reference for both fills below
+        valid = (problem_mask == 0) & ~np.isnan(tdoa)
+        counts = valid.sum(axis=1)
+        clean = np.where(valid, tdoa, np.nan)
+
         # 2. Multipath processing: filling with medians
-        for i in range(tdoa.shape[0]):
-            multipath_idx = (problem_mask[i] == 2)
-            valid = tdoa[i][(problem_mask[i] == 0) & ~np.isnan(tdoa[i])]
-            if valid.size > 0:
-                replacement = np.median(valid)
-                tdoa[i][multipath_idx] = replacement
-            else:
-                tdoa[i][multipath_idx] = np.nan
+        multipath_mask = (problem_mask == 2)
+        median = _row_median(clean, counts)
+        tdoa[multipath_mask] = np.broadcast_to(median[:, np.newaxis], tdoa.shape)[multipath_mask]
 
         # 3. Shading: mean fill if RMS is sufficient
-        for i in range(tdoa.shape[0]):
-            blockage_idx = (problem_mask[i] == 3)
-            valid = tdoa[i][(problem_mask[i] == 0) & ~np.isnan(tdoa[i])]
-            if valid.size >= tdoa.shape[1] // 2:
-                tdoa[i][blockage_idx] = np.mean(valid)
-            else:
-                tdoa[i][blockage_idx] = np.nan
+        blockage_mask = (problem_mask == 3)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(valid, tdoa, 0.0).sum(axis=1) / counts
+        mean[(counts < tdoa.shape[1] // 2) | (counts == 0)] = np.nan
+        tdoa[blockage_mask] = np.broadcast_to(mean[:, np.newaxis], tdoa.shape)[blockage_mask]
 
     return tdoa
@@ -0,0 +1,133 @@
+"""
+On-disk TDOA datasets.
+
+A dataset is a directory holding one uncompressed .npy file per column plus a JSON header:
+
+    metadata.json        format version, anchors, room size, noise parameters, shapes and dtypes
+    true_positions.npy   float64 or float32 (the scenario's precision), (..., dim)
+    tdoa.npy             float64 or float32 (the scenario's precision), (..., M-1)
+    problem_mask.npy     int8,    (..., M-1)
+
+The leading axes are free, e.g. (epochs,) or (runs, points). Columns are opened with
+`np.load(mmap_mode='r')`, so reading costs no copy and datasets larger than RAM can be
+streamed chunk by chunk through the estimators and `evaluate`.
+"""
+
+import json
+import os
+import time
+import numpy as np
+from config import Scenario
+
+FORMAT_VERSION = 1
+COLUMNS = {
+    'true_positions': np.float64,
+    'tdoa': np.float64,
+    'problem_mask': np.int8,
+}
+
+
+def column_dtypes(scenario):
+    """dtype of every column; the float columns follow `scenario.dtype`."""
+    return {name: scenario.dtype if dtype == np.float64 else np.dtype(dtype) for name, dtype in COLUMNS.items()}
+
+
+def scenario_metadata(scenario):
+    return {
+        'anchors': scenario.anchors.tolist(),
+        'dim': scenario.dim,
+        'space': list(scenario.space),
+        'num_targets': scenario.num_targets,
+        'tdoa_noise_std': scenario.tdoa_noise_std,
+        'nlos_params': list(scenario.nlos_params),
+        'multipath_params': list(scenario.multipath_params),
+        'blockage_prob': scenario.blockage_prob,
+        'precision': scenario.precision,
+    }
+
+
+def create_dataset(path, leading_shape, scenario, reference_index=0, extra_meta=None):
+    """
+    Allocate an empty dataset on disk and return its columns as writable memmaps,
+    so callers can fill it chunk by chunk. `leading_shape` is e.g. (N,) or (runs, points).
+    """
+    leading_shape = tuple(int(n) for n in np.atleast_1d(leading_shape))
+    num_meas = scenario.anchors.shape[0] - 1
+    shapes = {
+        'true_positions': leading_shape + (scenario.dim,),
+        'tdoa': leading_shape + (num_meas,),
+        'problem_mask': leading_shape + (num_meas,),
+    }
+    dtypes = column_dtypes(scenario)
+    os.makedirs(path, exist_ok=True)
+
+    meta = {
+        'format_version': FORMAT_VERSION,
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'reference_index': reference_index,
+        'scenario': scenario_metadata(scenario),
+        'columns': {name: {'dtype': dtype.name, 'shape': list(shapes[name])}
+                    for name, dtype in dtypes.items()},
+    }
+    if extra_meta:
+        meta['extra'] = extra_meta
+    with open(os.path.join(path, 'metadata.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    return {
+        name: np.lib.format.open_memmap(os.path.join(path, f'{name}.npy'), mode='w+', dtype=dtype,
+                                        shape=shapes[name])
+        for name, dtype in dtypes.items()
+    }
+
+
+def write_dataset(path, true_positions, tdoa_measurements, problem_mask, scenario, reference_index=0,
+                  extra_meta=None):
+    """Write in-memory arrays as a dataset."""
+    columns = create_dataset(path, tdoa_measurements.shape[:-1], scenario, reference_index, extra_meta)
+    columns['true_positions'][:] = true_positions
+    columns['tdoa'][:] = tdoa_measurements
+    columns['problem_mask'][:] = problem_mask
+    for column in columns.values():
+        column.flush()
+    return path
+
+
+class Dataset:
+    """Read-only, memory-mapped view of a dataset directory."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, 'metadata.json')) as f:
+            self.meta = json.load(f)
+        if self.meta.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Dataset '{path}' has unsupported format version {self.meta.get('format_version')}")
+        self.path = path
+        self.reference_index = self.meta['reference_index']
+
+        s = self.meta['scenario']
+        self.scenario = Scenario(
+            s['anchors'], space=s['space'], num_targets=s['num_targets'], tdoa_noise_std=s['tdoa_noise_std'],
+            nlos_params=s['nlos_params'], multipath_params=s['multipath_params'], blockage_prob=s['blockage_prob'],
+            precision=s.get('precision', 'float64'),
+        )
+        for name in COLUMNS:
+            setattr(self, name, np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r'))
+
+    def __len__(self):
+        """Number of epochs, over all leading axes."""
+        return int(np.prod(self.tdoa.shape[:-1]))
+
+    def epochs(self):
+        """The three columns flattened to (epochs, k); views of the memmaps, no copy."""
+        return (self.true_positions.reshape(-1, self.true_positions.shape[-1]),
+                self.tdoa.reshape(-1, self.tdoa.shape[-1]),
+                self.problem_mask.reshape(-1, self.problem_mask.shape[-1]))
+
+    def iter_chunks(self, chunk_size):
+        """Chunks in the format of `streaming`; only the chunk being processed is paged in."""
+        from streaming import array_source
+        return array_source(*self.epochs(), chunk_size)
+
+
+def open_dataset(path):
+    return Dataset(path)
@@ -43,3 +43,193 @@ def evaluate(predictions, targets):
     mae_val = np.mean(per_point_error)
 
     return {"RMSE": rmse_val, "MAE": mae_val}, per_point_error, valid_mask
+
+
+#   per-interference-class report
+
+INTERFERENCE_CLASSES = {1: "nlos", 2: "multipath", 3: "blockage"}
+PERCENTILES = (50, 90, 95, 99)
+
+def interference_classes(problem_mask):
+    """
+    Epoch membership of every interference class, from a (N, M-1) problem_mask.
+    'all' holds every epoch, 'clean' the epochs without any flagged measurement, and an
+    epoch belongs to 'nlos' / 'multipath' / 'blockage' if any of its measurements has that flag.
+    Returns dict, class name -> ndarray[bool], shape=(N,)
+    """
+    problem_mask = np.asarray(problem_mask)
+    classes = {"all": np.ones(problem_mask.shape[0], dtype=bool), "clean": ~np.any(problem_mask > 0, axis=1)}
+    for code, name in INTERFERENCE_CLASSES.items():
+        classes[name] = np.any(problem_mask == code, axis=1)
+    return classes
+
+def error_statistics(errors, num_failed=0):
+    """Summary of per-point errors (finite values only) plus the share of failed (NaN) fixes."""
+    errors = np.asarray(errors, dtype=float)
+    total = errors.size + num_failed
+    stats = {"count": int(total), "failure_rate": num_failed / total if total else np.nan}
+    if errors.size == 0:
+        stats.update({"RMSE": np.nan, "MAE": np.nan, "std": np.nan, "max": np.nan})
+        stats.update({f"P{p}": np.nan for p in PERCENTILES})
+    else:
+        stats.update({
+            "RMSE": float(np.sqrt(np.mean(errors ** 2))),
+            "MAE": float(np.mean(errors)),
+            "std": float(np.std(errors)),
+            "max": float(np.max(errors)),
+        })
+        stats.update({f"P{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(errors, PERCENTILES))})
+    stats["CEP50"], stats["CEP95"] = stats["P50"], stats["P95"]
+    return stats
+
+def point_errors(predictions, targets):
+    """Euclidean error per epoch, NaN where the prediction failed. Works for (..., N, dim) stacks."""
+    return np.linalg.norm(np.asarray(predictions) - np.asarray(targets), axis=-1)
+
+def evaluate_report(predictions_by_model, targets, problem_mask):
+    """
+    Metrics of several models, broken down by interference class, in one pass.
+
+    Parameters:
+        predictions_by_model: dict, model name -> ndarray, shape=(N, dim)
+        targets: ndarray, shape=(N, dim)
+        problem_mask: ndarray, shape=(N, M-1)
+    Returns:
+        dict, model name -> class name -> `error_statistics` dict
+    """
+    names = list(predictions_by_model)
+    errors = point_errors(np.stack([predictions_by_model[name] for name in names]), targets)  # (models, N)
+    failed = np.isnan(errors)
+    classes = interference_classes(problem_mask)
+
+    report = {}
+    for i, name in enumerate(names):
+        report[name] = {}
+        for class_name, members in classes.items():
+            ok = members & ~failed[i]
+            report[name][class_name] = error_statistics(errors[i, ok], int(np.sum(members & failed[i])))
+    return report
+
+def format_report(report):
+    """Plain-text table of an `evaluate_report` / `StreamingEvaluator.result` report."""
+    width = max([24] + [len(name) for name in report]) + 2
+    header = f"{'model':<{width}}{'class':<11}{'count':>9}{'fail %':>8}{'RMSE':>8}{'MAE':>8}{'CEP50':>8}{'CEP95':>8}{'P99':>8}"
+    lines = [header]
+    for name, classes in report.items():
+        for class_name, s in classes.items():
+            if s["count"] == 0:
+                continue
+            lines.append(f"{name:<{width}}{class_name:<11}{s['count']:>9}{100 * s['failure_rate']:>8.2f}"
+                         f"{s['RMSE']:>8.3f}{s['MAE']:>8.3f}{s['CEP50']:>8.3f}{s['CEP95']:>8.3f}{s['P99']:>8.3f}")
+    return "\n".join(lines)
+
+
+#   streaming accumulation
+
+class QuantileSketch:
+    """
+    Log-binned quantile sketch (DDSketch-style): constant memory, quantiles with bounded
+    relative error `relative_accuracy` for values in [min_value, max_value]; smaller values
+    fall into one underflow bin and larger ones are clipped to the top bin.
+    """
+
+    def __init__(self, relative_accuracy=0.01, min_value=1e-4, max_value=1e5):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = np.log(self.gamma)
+        self.min_value = min_value
+        self.offset = int(np.floor(np.log(min_value) / self.log_gamma))
+        self.num_bins = int(np.ceil(np.log(max_value) / self.log_gamma)) - self.offset + 1
+        self.counts = np.zeros(self.num_bins + 1, dtype=np.int64)  # bin 0 is the underflow bin
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        bins = np.zeros(values.shape, dtype=np.int64)
+        big = values > self.min_value
+        bins[big] = np.ceil(np.log(values[big]) / self.log_gamma).astype(np.int64) - self.offset
+        self.counts += np.bincount(np.clip(bins, 0, self.num_bins), minlength=self.num_bins + 1)
+
+    def merge(self, other):
+        self.counts += other.counts
+
+    def quantile(self, q):
+        total = self.counts.sum()
+        if total == 0:
+            return np.nan
+        # Nearest rank: the ceil(q·total)-th smallest value, so small streams keep their tail
+        rank = max(int(np.ceil(q * total)), 1)
+        b = int(np.searchsorted(np.cumsum(self.counts), rank, side='left'))
+        if b == 0:
+            return 0.0
+        # Midpoint (in relative terms) of the bin (gamma^(i-1), gamma^i]
+        return 2 * self.gamma ** (b + self.offset) / (self.gamma + 1)
+
+class ErrorAccumulator:
+    """Welford mean/variance, sum of squares, max, failures and a quantile sketch of one error stream."""
+
+    def __init__(self, relative_accuracy=0.01):
+        self.count = 0
+        self.num_failed = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.sum_sq = 0.0
+        self.max = -np.inf
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def update(self, errors, num_failed=0):
+        """Merge a batch of finite errors (Chan et al. parallel form of Welford's update)."""
+        errors = np.asarray(errors, dtype=float)
+        self.num_failed += num_failed
+        n = errors.size
+        if n == 0:
+            return
+        batch_mean = errors.mean()
+        batch_m2 = np.sum((errors - batch_mean) ** 2)
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += batch_m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        self.sum_sq += float(np.sum(errors ** 2))
+        self.max = max(self.max, float(errors.max()))
+        self.sketch.update(errors)
+
+    def result(self):
+        total = self.count + self.num_failed
+        stats = {"count": int(total), "failure_rate": self.num_failed / total if total else np.nan}
+        if self.count == 0:
+            stats.update({"RMSE": np.nan, "MAE": np.nan, "std": np.nan, "max": np.nan})
+            stats.update({f"P{p}": np.nan for p in PERCENTILES})
+        else:
+            stats.update({
+                "RMSE": float(np.sqrt(self.sum_sq / self.count)),
+                "MAE": float(self.mean),
+                "std": float(np.sqrt(self.m2 / self.count)),
+                "max": self.max,
+            })
+            stats.update({f"P{p}": self.sketch.quantile(p / 100) for p in PERCENTILES})
+        stats["CEP50"], stats["CEP95"] = stats["P50"], stats["P95"]
+        return stats
+
+class StreamingEvaluator:
+    """
+    Chunk-by-chunk version of `evaluate_report`: memory does not grow with the number of
+    epochs, and percentiles come from a `QuantileSketch` (1% relative error by default).
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.accumulators = {}
+
+    def update(self, predictions_by_model, targets, problem_mask):
+        classes = interference_classes(problem_mask)
+        for name, predictions in predictions_by_model.items():
+            errors = point_errors(predictions, targets)
+            failed = np.isnan(errors)
+            per_class = self.accumulators.setdefault(name, {})
+            for class_name, members in classes.items():
+                acc = per_class.setdefault(class_name, ErrorAccumulator(self.relative_accuracy))
+                acc.update(errors[members & ~failed], int(np.sum(members & failed)))
+
+    def result(self):
+        return {name: {class_name: acc.result() for class_name, acc in per_class.items()}
+                for name, per_class in self.accumulators.items()}
@@ -0,0 +1,173 @@
+"""
+Expected accuracy of a TDOA fix anywhere in the room, per anchor layout.
+
+For a tag at p, the TDOA Jacobian H (M-1, dim) has rows u_i(p) - u_ref(p), where u_i is the unit
+vector from anchor i to p. With independent TDOA noise of std σ the Fisher information is HᵀH/σ², so
+
+    GDOP(p) = sqrt(trace((HᵀH)⁻¹))         (geometry only)
+    CRLB(p) = σ · GDOP(p)                   (lower bound on the RMSE of any unbiased fix, metres)
+
+`coverage_map` evaluates GDOP on a regular grid over the room in one vectorised pass, caches it on
+the scenario and on disk under a hash of the geometry, and answers queries by multilinear
+interpolation: a constant number of array lookups per point, no linear algebra.
+
+    python gdop.py --site warehouse --resolution 0.25 --plot
+"""
+
+import argparse
+import hashlib
+import itertools
+import os
+import numpy as np
+
+from config import resolve_scenario
+from model.least_squares import compute_jacobian_batch
+
+CACHE_DIR = os.environ.get("TDOA_COVERAGE_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "uwb_tdoa"))
+
+
+def compute_gdop(points, anchors, reference_index=0, chunk_size=65536):
+    """GDOP at every point (N, dim); inf where the geometry does not determine the position."""
+    points = np.atleast_2d(np.asarray(points, dtype=float))
+    gdop = np.empty(points.shape[0])
+    for start in range(0, points.shape[0], chunk_size):
+        H = compute_jacobian_batch(points[start:start + chunk_size], anchors, reference_index)
+        eigenvalues = np.linalg.eigvalsh(np.einsum('nki,nkj->nij', H, H))
+        singular = eigenvalues[:, 0] <= 1e-12 * np.maximum(eigenvalues[:, -1], 1e-300)
+        with np.errstate(divide='ignore'):
+            gdop[start:start + chunk_size] = np.where(singular, np.inf, np.sqrt(np.sum(1.0 / eigenvalues, axis=1)))
+    return gdop
+
+
+def geometry_hash(anchors, space, resolution, reference_index=0):
+    """Key of a coverage grid: anchors, room size, grid resolution and reference anchor."""
+    anchors = np.ascontiguousarray(anchors, dtype=np.float64)
+    digest = hashlib.sha1(anchors.tobytes())
+    digest.update(np.asarray(space[:anchors.shape[1]], dtype=np.float64).tobytes())
+    digest.update(np.asarray([resolution, reference_index], dtype=np.float64).tobytes())
+    return digest.hexdigest()[:16]
+
+
+class CoverageMap:
+    """
+    GDOP on a regular grid with interpolated lookup.
+
+    Parameters:
+        axes: list of dim 1-D arrays, the grid coordinates along each axis (evenly spaced from 0)
+        gdop: ndarray of shape (len(axes[0]), ..., len(axes[dim-1]))
+        tdoa_noise_std: σ, converts GDOP into the CRLB in metres
+    """
+
+    def __init__(self, axes, gdop, tdoa_noise_std):
+        self.axes = [np.asarray(axis, dtype=float) for axis in axes]
+        self.gdop = np.asarray(gdop, dtype=float)
+        self.tdoa_noise_std = tdoa_noise_std
+        self.dim = len(self.axes)
+        self.shape = np.array(self.gdop.shape)
+        self.step = np.array([axis[1] - axis[0] for axis in self.axes])
+        self.strides = np.array([int(np.prod(self.gdop.shape[i + 1:])) for i in range(self.dim)])
+        self.corners = np.array(list(itertools.product((0, 1), repeat=self.dim)))  # (2^dim, dim)
+
+    def gdop_at(self, points):
+        """GDOP interpolated at every point (N, dim); points outside the grid are clamped to its edge."""
+        points = np.atleast_2d(np.asarray(points, dtype=float))
+        missing = np.any(np.isnan(points), axis=1)
+        frac = np.clip(np.where(missing[:, np.newaxis], 0.0, points) / self.step, 0, self.shape - 1)
+        lower = np.minimum(frac.astype(np.int64), self.shape - 2)
+        t = frac - lower
+
+        flat = self.gdop.ravel()
+        result = np.zeros(points.shape[0])
+        for corner in self.corners:
+            weight = np.prod(np.where(corner, t, 1.0 - t), axis=1)
+            value = flat[(lower + corner) @ self.strides]
+            result += np.where(weight > 0, weight * value, 0.0)  # an unused inf corner adds nothing
+        result[missing] = np.nan
+        return result
+
+    def expected_accuracy(self, points):
+        """CRLB RMSE (metres) of a fix at every point: σ · GDOP."""
+        return self.tdoa_noise_std * self.gdop_at(points)
+
+    def summary(self, thresholds=(0.5, 1.0, 2.0)):
+        """GDOP percentiles over the room and the share of the room whose CRLB is within each threshold."""
+        accuracy = self.tdoa_noise_std * self.gdop.ravel()
+        return {
+            "gdop_p50": float(np.percentile(self.gdop, 50)),
+            "gdop_p95": float(np.percentile(self.gdop, 95)),
+            "gdop_max": float(self.gdop.max()),
+            "coverage": {float(t): float(np.mean(accuracy <= t)) for t in thresholds},
+        }
+
+
+def build_coverage(scenario, resolution=0.25, reference_index=0):
+    """Evaluate GDOP over the room of `scenario` on a grid with about `resolution` spacing."""
+    axes = [np.linspace(0.0, size, max(int(round(size / resolution)), 1) + 1)
+            for size in scenario.upper_bounds]
+    grid = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, scenario.dim)
+    gdop = compute_gdop(grid, scenario.anchors, reference_index).reshape([len(axis) for axis in axes])
+    return CoverageMap(axes, gdop, scenario.tdoa_noise_std)
+
+
+def coverage_map(scenario=None, resolution=0.25, reference_index=0, cache_dir=CACHE_DIR):
+    """
+    The coverage map of a scenario, built once: kept in `scenario.cache`, and stored in
+    `cache_dir` as coverage_<geometry hash>.npz so other processes and later runs only load it
+    (`cache_dir=None` disables the disk cache). The grid holds GDOP only, so layouts differing
+    only in σ share one file.
+    """
+    scenario = resolve_scenario(scenario)
+    key = ("coverage", resolution, reference_index)
+    if key in scenario.cache:
+        return scenario.cache[key]
+
+    path = None
+    if cache_dir is not None:
+        path = os.path.join(cache_dir, f"coverage_{geometry_hash(scenario.anchors, scenario.space, resolution, reference_index)}.npz")
+    if path is not None and os.path.exists(path):
+        with np.load(path) as data:
+            result = CoverageMap([data[f"axis{i}"] for i in range(scenario.dim)], data["gdop"],
+                                 scenario.tdoa_noise_std)
+    else:
+        result = build_coverage(scenario, resolution, reference_index)
+        if path is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp.npz"
+            np.savez(tmp, gdop=result.gdop, **{f"axis{i}": axis for i, axis in enumerate(result.axes)})
+            os.replace(tmp, path)  # atomic, so a concurrent reader never sees half a file
+
+    scenario.cache[key] = result
+    return result
+
+
+def main():
+    import time
+    from config import load_yaml_config
+    from sites import load_site_registry
+
+    parser = argparse.ArgumentParser(description="GDOP / CRLB coverage of an anchor layout")
+    parser.add_argument('--cfg', default=os.path.join(os.path.dirname(__file__), 'configs', 'model.yaml'))
+    parser.add_argument('--sites', default=os.path.join(os.path.dirname(__file__), 'configs', 'sites.yaml'))
+    parser.add_argument('--site', nargs='+', default=['lab'])
+    parser.add_argument('--resolution', type=float, default=0.25, help='Grid spacing (metres)')
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.5, 1.0, 2.0], help='CRLB levels (metres)')
+    parser.add_argument('--plot', action='store_true')
+    args = parser.parse_args()
+
+    registry = load_site_registry(args.sites, load_yaml_config(args.cfg)['defaults'])
+    for site in args.site:
+        scenario = registry.scenario(site)
+        start = time.perf_counter()
+        result = coverage_map(scenario, args.resolution)
+        elapsed = time.perf_counter() - start
+        s = result.summary(args.thresholds)
+        covered = ", ".join(f"<= {t:g} m: {share:.1%}" for t, share in s["coverage"].items())
+        print(f"==> {site}: {result.gdop.size} grid points in {elapsed * 1e3:.1f} ms | GDOP p50 {s['gdop_p50']:.2f}, "
+              f"p95 {s['gdop_p95']:.2f}, max {s['gdop_max']:.2f} | CRLB {covered}")
+        if args.plot:
+            from visualization import plot_coverage
+            plot_coverage(result, title=f"CRLB coverage: {site}", scenario=scenario)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,144 @@
 import argparse
 import yaml
+import numpy as np
 from datagenerator import generate_simulated_data
 from dataprocess import preprocess_tdoa
-from evaluation import evaluate
+from evaluation import evaluate, evaluate_report, format_report
 from visualization import plot_results
 from model import load_model
-from config import parse_args, load_yaml_config, get_config
+from model.memo import MemoizedEstimator
+from model.parallel import load_parallel_model
+from streaming import simulated_source, run_stream
+from sites import load_site_registry
+from dataset import open_dataset, write_dataset
+from config import parse_args, load_yaml_config, get_config, get_scenario
+from profiling import enable_profiling, enabled, stage, count
 
 
+def get_estimator(args, config, scenario):
+    """The configured model, sharded over a process pool when --workers > 1 and memoised with --memo_resolution."""
+    if args.workers > 1:
+        estimate_positions = load_parallel_model(args.model, config, scenario=scenario, workers=args.workers,
+                                                 seed=args.seed)
+    else:
+        estimate_positions = load_model(args.model, config)
+    if args.memo_resolution > 0:
+        estimate_positions = MemoizedEstimator(estimate_positions, args.memo_resolution, args.memo_size)
+    return estimate_positions
+
 def main():
     args = parse_args()
+    profiler = enable_profiling() if args.profile else None
+    if args.seed is not None:
+        np.random.seed(args.seed)
     config = load_yaml_config(args.cfg)
+    if args.precision is not None:
+        config['defaults']['precision'] = args.precision
+    dataset = open_dataset(args.dataset) if args.dataset else None
+    if dataset is not None:
+        scenario = dataset.scenario
+    elif args.site is not None:
+        scenario = load_site_registry(args.sites, config['defaults']).scenario(args.site)
+    else:
+        scenario = get_scenario()
+
+    if args.chunk_size > 0:
+        with stage("stream"):
+            main_stream(args, config, scenario, dataset)
+    else:
+        main_batch(args, config, scenario, dataset)
+
+    if profiler is not None:
+        print("Profile:")
+        print(profiler.summary())
+        print(f"==> Profile written to {profiler.write(args.profile)}")
 
-    print("==> Generating data...")
-    true_positions, tdoa_measurements, problem_mask = generate_simulated_data(
-        enable_nlos=args.nlos,
-        enable_multipath=args.multipath,
-        enable_blockage=args.blockage,
-        trajectory_type=args.trajectory     # add the trajectory args
-)
+def main_batch(args, config, scenario, dataset=None):
+    """Whole-array pipeline: generate (or load) -> preprocess -> estimate -> evaluate -> plot."""
+    if dataset is not None:
+        print(f"==> Loading dataset {args.dataset}...")
+        with stage("load"):
+            true_positions, tdoa_measurements, problem_mask = dataset.epochs()
+    else:
+        print("==> Generating data...")
+        with stage("generate"):
+            true_positions, tdoa_measurements, problem_mask = generate_simulated_data(
+                enable_nlos=args.nlos,
+                enable_multipath=args.multipath,
+                enable_blockage=args.blockage,
+                trajectory_type=args.trajectory,    # add the trajectory args
+                scenario=scenario
+            )
+        if args.save_dataset:
+            with stage("save_dataset"):
+                write_dataset(args.save_dataset, true_positions, tdoa_measurements, problem_mask, scenario)
 
     print("==> Preprocessing TDOA data...")
     if args.process:
-        processed_tdoa = preprocess_tdoa(tdoa_measurements, problem_mask, strategy="adaptive")
+        with stage("preprocess"):
+            processed_tdoa = preprocess_tdoa(tdoa_measurements, problem_mask, strategy="adaptive")
     else:
         processed_tdoa = tdoa_measurements
 
     print(f"==> Estimating positions using {args.model}...")
-    estimate_positions = load_model(args.model, config)
-    estimated_positions = estimate_positions(processed_tdoa)
+    estimate_positions = get_estimator(args, config, scenario)
+    with stage(f"estimate:{args.model}"):
+        estimated_positions = estimate_positions(processed_tdoa, scenario=scenario)
+    if enabled():
+        count(f"{args.model}.nan_outputs", int(np.isnan(estimated_positions).any(axis=-1).sum()))
+    if isinstance(estimate_positions, MemoizedEstimator):
+        print(f"==> Memoised fixes: {estimate_positions.hits} hits, {estimate_positions.misses} misses "
+              f"({100 * estimate_positions.hit_rate:.1f}% hit rate)")
 
     print("==> Evaluating results...")
-    metrics, per_point_error, valid_mask = evaluate(estimated_positions, true_positions)
+    with stage("evaluate"):
+        metrics, per_point_error, valid_mask = evaluate(estimated_positions, true_positions)
 
     print("Overall Metrics:")
     for k, v in metrics.items():
         print(f"{k}: {v:.3f} meters")
 
-    print("Per-point Errors:")
-    for i, err in enumerate(per_point_error):
-        print(f"Point {i}: error = {err:.3f} meters")
+    print("Metrics by Interference Class:")
+    with stage("evaluate_report"):
+        report = evaluate_report({args.model: estimated_positions}, true_positions, problem_mask)
+    print(format_report(report))
+
+    if args.per_point:
+        print("Per-point Errors:")
+        print("\n".join(f"Point {i}: error = {err:.3f} meters" for i, err in enumerate(per_point_error)))
 
     print("==> Visualizing...")
-    plot_results(true_positions, estimated_positions, title=f"TDOA Positioning Results ({args.model})")
+    with stage("visualize"):
+        plot_results(true_positions, estimated_positions, title=f"TDOA Positioning Results ({args.model})",
+                     scenario=scenario)
+
+def main_stream(args, config, scenario, dataset=None):
+    """Chunked pipeline: generate -> preprocess -> estimate -> streaming evaluation, one chunk at a time."""
+    if dataset is not None:
+        print(f"==> Streaming {args.dataset} in chunks of {args.chunk_size} epochs using {args.model}...")
+        source = dataset.iter_chunks(args.chunk_size)
+    else:
+        num_chunks = -(-scenario.num_targets // args.chunk_size)
+        print(f"==> Streaming {scenario.num_targets} epochs in {num_chunks} chunks of {args.chunk_size} "
+              f"using {args.model}...")
+        source = simulated_source(
+            args.chunk_size, scenario.num_targets,
+            enable_nlos=args.nlos,
+            enable_multipath=args.multipath,
+            enable_blockage=args.blockage,
+            trajectory_type=args.trajectory,
+            scenario=scenario
+        )
+    estimate_positions = get_estimator(args, config, scenario)
+    report, num_epochs = run_stream(source, estimate_positions, process=args.process, name=args.model,
+                                    scenario=scenario)
+
+    print(f"Overall Metrics ({num_epochs} epochs):")
+    for k in ("RMSE", "MAE"):
+        print(f"{k}: {report[args.model]['all'][k]:.3f} meters")
+
+    print("Metrics by Interference Class:")
+    print(format_report(report))
 
 if __name__ == "__main__":
     main()
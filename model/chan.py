@@ -1,34 +1,20 @@
 import numpy as np
-from config import ANCHORS
+from config import resolve_scenario
+from model.closed_form import closed_form_geometry
 
-def estimate_positions_chan(tdoa_measurements, reference_index=0):
+def estimate_positions_chan(tdoa_measurements, reference_index=0, scenario=None):
     """
     Chan algorithm is used for closed-form solution of TDOA localisation with good robustness. 
-    It is suitable for 2D scenarios where the number of base stations is greater than 3.
+    It is suitable for 2D/3D scenarios where the number of base stations is greater than the dimension.
+    A depends only on the anchor geometry, so its pseudo-inverse is computed once per subset of
+    valid anchors and every epoch is solved by a single matrix multiply; epochs with missing
+    TDOA values are solved on the anchors they still observe.
+    The squared ranges cancel badly in float32, so it always solves in float64 and only the
+    result is cast to scenario.dtype.
     """
-    estimated_positions = []
-    anchors = ANCHORS
-    ref_anchor = anchors[reference_index]
-    other_anchors = np.delete(anchors, reference_index, axis=0)
+    scenario = resolve_scenario(scenario)
+    tdoa_measurements = np.atleast_2d(np.asarray(tdoa_measurements, dtype=float))
+    geometry = closed_form_geometry(scenario, reference_index)
 
-    for tdoa in tdoa_measurements:
-        if np.any(np.isnan(tdoa)):
-            estimated_positions.append(np.array([np.nan, np.nan]))
-            continue
-
-        M = len(tdoa)
-        A = np.zeros((M, 2))
-        b = np.zeros(M)
-        for i in range(M):
-            xi, yi = other_anchors[i]
-            x0, y0 = ref_anchor
-            ri = tdoa[i]
-            A[i] = [xi - x0, yi - y0]
-            b[i] = 0.5 * (xi**2 + yi**2 - x0**2 - y0**2 - ri**2)
-
-        try:
-            x = np.linalg.lstsq(A, b, rcond=None)[0]
-            estimated_positions.append(x)
-        except:
-            estimated_positions.append(np.array([np.nan, np.nan]))
-    return np.array(estimated_positions)
+    b = 0.5 * (geometry.sq_norms - geometry.ref_sq_norm - tdoa_measurements ** 2)
+    return geometry.solve(b).astype(scenario.dtype, copy=False)
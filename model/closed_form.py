@@ -0,0 +1,116 @@
+import numpy as np
+from functools import lru_cache
+
+
+def anchor_difference_matrix(anchors, reference_index=0):
+    """
+    Geometry-only design matrix shared by the closed-form solvers: row i is a_i - a_ref.
+    Returns A with shape (M-1, dim).
+    """
+    anchors = np.asarray(anchors, dtype=float)
+    other_anchors = np.delete(anchors, reference_index, axis=0)
+    return other_anchors - anchors[reference_index]
+
+
+@lru_cache(maxsize=256)
+def _subset_pinv(A_bytes, shape, pattern_bytes):
+    A = np.frombuffer(A_bytes, dtype=float).reshape(shape)
+    pattern = np.frombuffer(pattern_bytes, dtype=bool)
+    A_sub = A[pattern]
+    if A_sub.shape[0] == 0 or np.linalg.matrix_rank(A_sub) < shape[1]:
+        return None
+    pinv = np.linalg.pinv(A_sub)
+    pinv.flags.writeable = False
+    return pinv
+
+
+def subset_pinv(A, pattern):
+    """
+    Pseudo-inverse of the rows of A selected by `pattern`, cached per (geometry, pattern).
+    Returns None if the selected rows cannot fix every coordinate.
+    """
+    A = np.ascontiguousarray(A, dtype=float)
+    pattern = np.ascontiguousarray(pattern, dtype=bool)
+    return _subset_pinv(A.tobytes(), A.shape, pattern.tobytes())
+
+
+class ClosedFormGeometry:
+    """
+    Everything the closed-form solvers need that depends only on the anchor layout:
+    the anchor-difference matrix, squared anchor norms, baselines and one pseudo-inverse
+    per subset of valid anchors, computed on first use and kept for the lifetime of the object.
+    """
+
+    def __init__(self, anchors, reference_index=0):
+        anchors = np.asarray(anchors, dtype=float)
+        self.reference_index = reference_index
+        self.ref_anchor = anchors[reference_index]
+        self.other_anchors = np.delete(anchors, reference_index, axis=0)
+        self.A = anchor_difference_matrix(anchors, reference_index)
+        self.sq_norms = np.sum(self.other_anchors ** 2, axis=1)
+        self.ref_sq_norm = float(np.dot(self.ref_anchor, self.ref_anchor))
+        self.baseline = np.linalg.norm(self.A, axis=1)
+        self.pinv_cache = {}
+
+    def solve(self, b, valid_mask=None):
+        return solve_linear_batch(self.A, b, valid_mask, pinv_cache=self.pinv_cache)
+
+
+def closed_form_geometry(scenario, reference_index=0):
+    """The `ClosedFormGeometry` of a scenario, built once and stored in `scenario.cache`."""
+    key = ("closed_form", reference_index)
+    if key not in scenario.cache:
+        scenario.cache[key] = ClosedFormGeometry(scenario.anchors, reference_index)
+    return scenario.cache[key]
+
+
+def solve_linear_batch(A, b, valid_mask=None, pinv_cache=None):
+    """
+    Solve A x = b_n in the least-squares sense for every row b_n of b at once.
+    Rows are grouped by their pattern of valid entries so that each distinct anchor
+    subset costs one cached pseudo-inverse and one matrix multiply.
+
+    Parameters:
+        A: ndarray, shape=(K, dim)
+        b: ndarray, shape=(N, K), NaN entries are ignored
+        valid_mask: optional ndarray[bool], shape=(N, K); defaults to ~isnan(b)
+        pinv_cache: optional dict {pattern bytes: pinv} owned by the caller; the
+                    module-wide LRU cache is used when it is None
+    Returns:
+        ndarray, shape=(N, dim), NaN where the valid subset is rank deficient
+    """
+    A = np.asarray(A, dtype=float)
+    b = np.atleast_2d(np.asarray(b, dtype=float))
+    N, K = b.shape
+    dim = A.shape[1]
+    if valid_mask is None:
+        valid_mask = ~np.isnan(b)
+
+    def lookup(pattern):
+        if pinv_cache is None:
+            return subset_pinv(A, pattern)
+        key = pattern.tobytes()
+        if key not in pinv_cache:
+            pinv_cache[key] = subset_pinv(A, pattern)
+        return pinv_cache[key]
+
+    x = np.full((N, dim), np.nan)
+    if N == 0:
+        return x
+
+    codes = valid_mask.astype(np.int64) @ (np.int64(1) << np.arange(K, dtype=np.int64))
+    patterns, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+    if patterns.size == 1:
+        pinv = lookup(valid_mask[0])
+        if pinv is not None:
+            x[:] = b[:, valid_mask[0]] @ pinv.T
+        return x
+
+    for k, row in enumerate(first):
+        pattern = valid_mask[row]
+        pinv = lookup(pattern)
+        if pinv is None:
+            continue
+        rows = np.flatnonzero(inverse == k)
+        x[rows] = b[np.ix_(rows, pattern)] @ pinv.T
+    return x
@@ -1,34 +1,18 @@
 import numpy as np
-from config import ANCHORS
+from config import resolve_scenario
+from model.closed_form import closed_form_geometry
 
-def estimate_positions_fang(tdoa_measurements, reference_index=0):
+def estimate_positions_fang(tdoa_measurements, reference_index=0, scenario=None):
     """
-    Fang algorithm is an analytical TDOA localisation method for the 2D plane. 
-    It converts the TDOA into a set of linear equations to be solved analytically.
+    Fang algorithm is an analytical TDOA localisation method for the 2D plane (extended here to 3D).
+    It converts the TDOA into a set of linear equations to be solved analytically; the equations
+    share one geometry matrix, whose pseudo-inverse is cached per subset of valid anchors.
+    Solved in float64 like `estimate_positions_chan`; the result is cast to scenario.dtype.
     """
-    estimated_positions = []
-    anchors = ANCHORS
-    ref_anchor = anchors[reference_index]
-    other_anchors = np.delete(anchors, reference_index, axis=0)
+    scenario = resolve_scenario(scenario)
+    tdoa_measurements = np.atleast_2d(np.asarray(tdoa_measurements, dtype=float))
+    geometry = closed_form_geometry(scenario, reference_index)
 
-    for tdoa in tdoa_measurements:
-        if np.any(np.isnan(tdoa)):
-            estimated_positions.append(np.array([np.nan, np.nan]))
-            continue
-
-        A = []
-        b = []
-        for i in range(len(tdoa)):
-            ai = other_anchors[i] - ref_anchor
-            ti = tdoa[i]
-            bi = 0.5 * (np.dot(ai, ai) - ti ** 2)
-            A.append(ai)
-            b.append(bi - ti * np.linalg.norm(ai))
-        try:
-            A = np.array(A)
-            b = np.array(b)
-            x = np.linalg.lstsq(A, b, rcond=None)[0] + ref_anchor
-            estimated_positions.append(x)
-        except:
-            estimated_positions.append(np.array([np.nan, np.nan]))
-    return np.array(estimated_positions)
+    baseline = geometry.baseline
+    b = 0.5 * (baseline ** 2 - tdoa_measurements ** 2) - tdoa_measurements * baseline
+    return (geometry.solve(b) + geometry.ref_anchor).astype(scenario.dtype, copy=False)
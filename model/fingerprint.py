@@ -0,0 +1,142 @@
+import itertools
+import time
+import numpy as np
+from scipy.spatial import cKDTree
+from config import resolve_scenario
+from datagenerator import compute_distances
+from profiling import count, enabled
+
+#   grid fingerprint solver: nearest noiseless TDOA vector, refined on finer local grids
+
+def fingerprints_at(points, anchors, reference_index=0):
+    """Noiseless TDOA vectors of grid points (G, dim) -> (G, M-1)."""
+    distances = compute_distances(points, anchors)
+    return np.delete(distances - distances[:, [reference_index]], reference_index, axis=1)
+
+
+def tdoa_at(points, anchors, reference_index=0):
+    """
+    `fingerprints_at` for points of any leading shape (..., dim) -> (..., M-1), accumulating the
+    squared distances one axis at a time instead of through an (..., M, dim) difference array.
+    """
+    sq = np.zeros(points.shape[:-1] + (anchors.shape[0],))
+    for j in range(anchors.shape[1]):
+        sq += (points[..., j, np.newaxis] - anchors[:, j]) ** 2
+    distances = np.sqrt(sq)
+    others = np.delete(np.arange(anchors.shape[0]), reference_index)
+    return distances[..., others] - distances[..., reference_index, np.newaxis]
+
+
+class FingerprintIndex:
+    """
+    Noiseless TDOA fingerprints on a grid over the room, with one KD-tree per pattern of valid
+    measurements (the full pattern is built up front, the others on first use).
+    `build_time` (s) and `nbytes` report the cost of the index.
+    """
+
+    def __init__(self, anchors, upper_bounds, resolution=0.5, reference_index=0):
+        start = time.perf_counter()
+        self.anchors = np.asarray(anchors, dtype=float)
+        self.reference_index = reference_index
+        self.resolution = resolution
+        self.dim = self.anchors.shape[1]
+        self.upper_bounds = np.asarray(upper_bounds, dtype=float)
+        axes = [np.linspace(0.0, size, max(int(round(size / resolution)), 1) + 1) for size in upper_bounds]
+        self.points = np.stack(np.meshgrid(*axes, indexing='ij'), axis=-1).reshape(-1, self.dim)
+        self.fingerprints = fingerprints_at(self.points, self.anchors, reference_index)
+        self.trees = {}
+        self.tree(np.ones(self.fingerprints.shape[1], dtype=bool))
+        self.build_time = time.perf_counter() - start
+
+    def tree(self, pattern):
+        """KD-tree over the fingerprint columns selected by `pattern`."""
+        key = pattern.tobytes()
+        if key not in self.trees:
+            self.trees[key] = cKDTree(self.fingerprints[:, pattern])
+        return self.trees[key]
+
+    @property
+    def nbytes(self):
+        trees = sum(tree.data.nbytes + tree.indices.nbytes for tree in self.trees.values())
+        return self.points.nbytes + self.fingerprints.nbytes + trees
+
+    def query(self, tdoa, valid_mask):
+        """Nearest grid point of every row, one KD-tree query per NaN pattern; NaN below dim measurements."""
+        x = np.full((tdoa.shape[0], self.dim), np.nan)
+        patterns, inverse = np.unique(valid_mask, axis=0, return_inverse=True)
+        for p, pattern in enumerate(patterns):
+            if pattern.sum() < self.dim:
+                continue
+            rows = np.flatnonzero(inverse.ravel() == p)
+            _, nearest = self.tree(pattern).query(tdoa[np.ix_(rows, pattern)])
+            x[rows] = self.points[nearest]
+        return x
+
+    def refine(self, x, tdoa, valid_mask, levels=2, span=1, max_moves=2, chunk_size=1024):
+        """
+        Coarse-to-fine pattern search: at every level (step = resolution / 2^level) each row moves
+        to the best point of the (2·span+1)^dim local grid around it, by the sum of squared TDOA
+        residuals over its valid measurements, until it stays put (at most `max_moves` times).
+        Candidates are clipped to the room, and the current point is always one of them, so the
+        residual never grows.
+        """
+        offsets = np.array(list(itertools.product(range(-span, span + 1), repeat=self.dim)), dtype=float)
+        centre = len(offsets) // 2
+        x = x.copy()
+        for level in range(levels + 1):
+            step = self.resolution / 2 ** level
+            rows = np.flatnonzero(~np.any(np.isnan(x), axis=1))
+            if rows.size == 0:
+                break
+            for _ in range(max_moves):
+                moved = []
+                for start in range(0, rows.size, chunk_size):
+                    chunk = rows[start:start + chunk_size]
+                    candidates = np.clip(x[chunk, np.newaxis, :] + step * offsets, 0.0, self.upper_bounds)
+                    residual = np.where(valid_mask[chunk, np.newaxis, :],
+                                        tdoa_at(candidates, self.anchors, self.reference_index) - tdoa[chunk, np.newaxis, :],
+                                        0.0)
+                    best = np.argmin(np.einsum('nfk,nfk->nf', residual, residual), axis=1)
+                    x[chunk] = candidates[np.arange(chunk.size), best]
+                    moved.append(chunk[best != centre])
+                rows = np.concatenate(moved) if moved else rows[:0]
+                if rows.size == 0:
+                    break
+        return x
+
+
+def fingerprint_index(scenario, resolution=0.5, reference_index=0):
+    """The `FingerprintIndex` of a scenario, built once and stored in `scenario.cache`."""
+    key = ("fingerprint", resolution, reference_index)
+    if key not in scenario.cache:
+        scenario.cache[key] = FingerprintIndex(scenario.anchors, scenario.upper_bounds, resolution, reference_index)
+        count("fingerprint.builds")
+    return scenario.cache[key]
+
+
+def estimate_positions_fingerprint(tdoa_measurements, reference_index=0, resolution=0.5, refine_levels=2,
+                                   scenario=None):
+    """
+    Grid fingerprint solver over all epochs at once: the nearest noiseless TDOA vector of a grid
+    with `resolution` spacing over the room (a KD-tree query per NaN pattern), refined by a local
+    grid search at the grid step and then `refine_levels` times more, each level halving the step
+    (`refine_levels=None` skips the refinement).
+    No start point and no Gauss-Newton steps, so it neither diverges nor stalls; the answer is the
+    least-squares fix to within resolution / 2^(refine_levels+1). Also used as a warm start
+    (init="fingerprint"). Epochs with fewer than dim valid measurements are NaN.
+    The grid and the search are float64; the fixes are cast to scenario.dtype.
+    """
+    scenario = resolve_scenario(scenario)
+    index = fingerprint_index(scenario, resolution, reference_index)
+    tdoa_measurements = np.atleast_2d(np.asarray(tdoa_measurements, dtype=float))
+    valid_mask = ~np.isnan(tdoa_measurements)
+    tdoa = np.where(valid_mask, tdoa_measurements, 0.0)
+
+    x_est = index.query(tdoa, valid_mask)
+    if refine_levels is not None:
+        x_est = index.refine(x_est, tdoa, valid_mask, refine_levels)
+
+    count("fingerprint.epochs", tdoa_measurements.shape[0])
+    if enabled():
+        count("fingerprint.unsolvable", int(np.count_nonzero(np.isnan(x_est[:, 0]))))
+    return x_est.astype(scenario.dtype, copy=False)
@@ -0,0 +1,131 @@
+import numpy as np
+from config import resolve_scenario
+from profiling import count, enabled
+from model.least_squares import compute_jacobian_batch, compute_residual_batch, estimate_positions_least_squares
+from model.warm_start import valid_seed
+
+#   constant-velocity extended Kalman filter
+
+def constant_velocity_model(dim, dt, accel_std):
+    """
+    Transition matrix F and process noise Q for the state [position, velocity]
+    driven by white acceleration noise with std `accel_std` (m/s^2).
+    `dt` may be an array of steps; F and Q then have shape dt.shape + (2·dim, 2·dim).
+    """
+    dt = np.asarray(dt, dtype=float)[..., np.newaxis, np.newaxis]
+    I, Z = np.eye(dim), np.zeros((dim, dim))
+    F = np.eye(2 * dim) + dt * np.block([[Z, I], [Z, Z]])
+    q = accel_std ** 2
+    Q = q * (dt ** 3 / 3 * np.block([[I, Z], [Z, Z]]) + dt ** 2 / 2 * np.block([[Z, I], [I, Z]])
+             + dt * np.block([[Z, Z], [Z, I]]))
+    return F, Q
+
+def ekf_init(position, position_std, velocity_std=1.0):
+    """Initial state [position, 0] and covariance around a first position fix."""
+    position = np.asarray(position, dtype=float)
+    dim = position.shape[0]
+    state = np.concatenate([position, np.zeros(dim)])
+    cov = np.diag(np.concatenate([np.full(dim, position_std ** 2), np.full(dim, velocity_std ** 2)]))
+    return state, cov
+
+def ekf_step(state, cov, tdoa, F, Q, anchors, measurement_std, reference_index=0):
+    """
+    One predict / update cycle for a batch of tags: state (tags, 2·dim), cov (tags, 2·dim, 2·dim),
+    tdoa (tags, M-1), F and Q shared (2·dim, 2·dim) or per tag (tags, 2·dim, 2·dim).
+    The measurement model is linearised once, at the predicted position; missing TDOA values
+    (NaN) get a zero Jacobian row, so they drop out of the update, and a tag with no valid
+    value only gets the prediction.
+    Returns the new states and covariances.
+    """
+    dim = anchors.shape[1]
+
+    # Predict
+    state = np.einsum('...ij,...j->...i', F, state)
+    cov = F @ cov @ np.swapaxes(F, -1, -2) + Q
+
+    # Update with a single linearisation at the predicted position
+    valid = ~np.isnan(tdoa)
+    position = state[:, :dim]
+    residual = np.where(valid, compute_residual_batch(position, anchors, tdoa, reference_index), 0.0)
+    H = np.zeros(tdoa.shape + (2 * dim,))
+    H[:, :, :dim] = compute_jacobian_batch(position, anchors, reference_index) * valid[:, :, np.newaxis]
+
+    S = H @ cov @ np.swapaxes(H, 1, 2) + measurement_std ** 2 * np.eye(tdoa.shape[1])
+    K = np.swapaxes(np.linalg.solve(S, H @ cov), 1, 2)
+    state = state + np.einsum('tij,tj->ti', K, residual)
+    # Joseph form keeps the covariance symmetric positive definite
+    I_KH = np.eye(2 * dim) - K @ H
+    cov = I_KH @ cov @ np.swapaxes(I_KH, 1, 2) + measurement_std ** 2 * K @ np.swapaxes(K, 1, 2)
+    return state, cov
+
+def estimate_positions_ekf(tdoa_measurements, reference_index=0, dt=1.0, accel_std=0.5, measurement_std=None,
+                           state=None, return_state=False, scenario=None):
+    """
+    Streaming TDOA tracker: rows are consecutive epochs of one tag. The filter is started from a
+    least-squares fix of the first epoch whose fix is finite and within a tenth of the room size
+    of the room (clipped into the room), and then runs one EKF update per epoch, so blocked
+    epochs still produce a (predicted) fix instead of NaN; epochs before the start are NaN.
+    A track whose position leaves the room by more than that is restarted the same way.
+
+    tdoa_measurements: (N, M-1) for a single tag, or (N, tags, M-1) to track many tags at once
+    (every epoch is one batched update over the tags). Returns (N, dim) or (N, tags, dim).
+    dt: time (s) from the previous epoch to each epoch: a scalar, (N,), or (N, tags) per tag.
+    Pass the `(state, cov)` returned with `return_state=True` back in as `state` to continue
+    the same track on the next block of epochs; for a tag stack `state` is a list with one such
+    state per tag (None for a new track). The filter state and covariance are float64;
+    the fixes are in scenario.dtype.
+    """
+    scenario = resolve_scenario(scenario)
+    measurement_std = scenario.tdoa_noise_std if measurement_std is None else measurement_std
+    tdoa_measurements = np.asarray(tdoa_measurements, dtype=float)
+    single_tag = tdoa_measurements.ndim <= 2
+    if single_tag:
+        tdoa_measurements = np.atleast_2d(tdoa_measurements)[:, np.newaxis, :]
+        state = [state]
+    N, T, _ = tdoa_measurements.shape
+    anchors = scenario.anchors
+    dim = anchors.shape[1]
+    dt = np.asarray(dt, dtype=float)
+    dt = np.broadcast_to(dt[:, np.newaxis] if dt.ndim == 1 else dt, (N, T))
+
+    states = [None] * T if state is None else list(state)
+    started = np.array([s is not None for s in states], dtype=bool)
+    x = np.zeros((T, 2 * dim))
+    P = np.tile(np.eye(2 * dim), (T, 1, 1))
+    for t in np.flatnonzero(started):
+        x[t], P[t] = states[t]
+    estimated_positions = np.full((N, T, dim), np.nan, dtype=scenario.dtype)
+
+    for n in range(N):
+        running = np.flatnonzero(started)
+        if running.size:
+            F, Q = constant_velocity_model(dim, dt[n, running], accel_std)
+            x[running], P[running] = ekf_step(x[running], P[running], tdoa_measurements[n, running], F, Q,
+                                              anchors, measurement_std, reference_index)
+            # A track that left the room has diverged: restart it from this epoch's fix
+            lost = running[~valid_seed(x[running, :dim], scenario.upper_bounds, margin=0.1)]
+            started[lost] = False
+            count("ekf.restarts", lost.size)
+        waiting = np.flatnonzero(~started)
+        if waiting.size:
+            fixes = estimate_positions_least_squares(tdoa_measurements[n, waiting], reference_index, scenario=scenario)
+            # A diverged fix would start the track far outside the room and never come back
+            usable = valid_seed(fixes, scenario.upper_bounds, margin=0.1)
+            if enabled():
+                count("ekf.rejected_starts", int(np.sum(~usable & ~np.any(np.isnan(fixes), axis=1))))
+            for t, fix in zip(waiting[usable], fixes[usable]):
+                x[t], P[t] = ekf_init(np.clip(fix, 0.0, scenario.upper_bounds), position_std=measurement_std)
+                started[t] = True
+                count("ekf.initialisations")
+        estimated_positions[n, started] = x[started, :dim]
+
+    count("ekf.epochs", N * T)
+    states = [(x[t].copy(), P[t].copy()) if started[t] else None for t in range(T)]
+    if single_tag:
+        estimated_positions, states = estimated_positions[:, 0, :], states[0]
+    if return_state:
+        return estimated_positions, states
+    return estimated_positions
+
+
+estimate_positions_ekf.tag_stacks = True
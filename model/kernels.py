@@ -0,0 +1,288 @@
+"""
+Batch kernels for the iterative solvers in taylor.py and least_squares_with_clock.py.
+
+Two backends implement the same iterations:
+    "numpy" - every epoch iterated at once with an active set (always available)
+    "numba" - per-epoch loops compiled with numba.njit(cache=True) (when numba is installed)
+
+`select_backend()` picks "numba" when it can be imported and "numpy" otherwise; the
+TDOA_KERNEL_BACKEND environment variable or an explicit `backend=` overrides the choice.
+Compiled kernels are cached on disk by numba, and `warmup()` compiles them up front so the
+first real batch does not pay the compilation latency.
+
+Every kernel returns `(positions, stats)` with stats = [iterations, diverged, not_converged].
+"""
+
+import os
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+BACKENDS = ("numpy", "numba")
+
+
+def available_backends():
+    return BACKENDS if numba is not None else ("numpy",)
+
+
+def select_backend(backend=None):
+    """Resolve `backend` (None/"auto", "numpy" or "numba") to the backend that will run."""
+    backend = backend or os.environ.get("TDOA_KERNEL_BACKEND", "auto")
+    if backend == "auto":
+        return "numba" if numba is not None else "numpy"
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown kernel backend '{backend}', expected one of {BACKENDS}")
+    if backend == "numba" and numba is None:
+        raise ValueError("Kernel backend 'numba' requested but numba is not installed")
+    return backend
+
+
+#   Taylor-series solver (model/taylor.py)
+
+def taylor_numpy(tdoa, anchors, reference_index, x0, max_iter, tol, bounds):
+    """
+    Taylor-series iterations for every row of `tdoa` (no NaN) from the start points `x0`.
+    An epoch is set to NaN when it reaches an anchor or leaves 10x the room (`bounds`).
+    Positions, δz and H are in the dtype of `tdoa`; the least-squares step is solved in float64.
+    """
+    ref_anchor = anchors[reference_index]
+    other_anchors = np.delete(anchors, reference_index, axis=0)
+    x = np.array(x0, dtype=tdoa.dtype)
+    active = np.arange(x.shape[0])
+    stats = np.zeros(3, dtype=np.int64)
+
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        stats[0] += active.size
+        x_act = x[active]
+        diff = x_act[:, np.newaxis, :] - other_anchors[np.newaxis, :, :]
+        dists = np.linalg.norm(diff, axis=2)
+        d0 = np.linalg.norm(x_act - ref_anchor, axis=1)
+        degenerate = (d0 < 1e-6) | np.any(dists < 1e-6, axis=1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            H = diff / dists[:, :, np.newaxis] - ((x_act - ref_anchor) / d0[:, np.newaxis])[:, np.newaxis, :]
+        delta = tdoa[active] - (dists - d0[:, np.newaxis])
+        H[degenerate] = 0.0
+        delta[degenerate] = 0.0
+
+        dx = np.einsum('nij,nj->ni', np.linalg.pinv(H.astype(np.float64)), delta)
+        x_new = x_act + dx
+
+        failed = degenerate | np.any(np.abs(x_new) > 10 * bounds, axis=1)
+        x[active[failed]] = np.nan
+        stats[1] += np.count_nonzero(failed)
+
+        moving = ~failed & (np.linalg.norm(dx, axis=1) >= tol)
+        x[active[moving]] = x_new[moving]
+        active = active[moving]
+
+    stats[2] = active.size
+    return x, stats
+
+
+def taylor_loop(tdoa, anchors, reference_index, x0, max_iter, tol, bounds):
+    """Per-epoch form of `taylor_numpy`, written for numba.njit."""
+    N, K = tdoa.shape
+    M, dim = anchors.shape
+    x_out = np.empty((N, dim))
+    stats = np.zeros(3, dtype=np.int64)
+    H = np.empty((K, dim))
+    delta = np.empty(K)
+
+    for n in range(N):
+        x = x0[n].copy()
+        failed = False
+        converged = False
+        for _ in range(max_iter):
+            stats[0] += 1
+            g0 = x - anchors[reference_index]
+            d0 = np.sqrt(np.sum(g0 ** 2))
+            degenerate = d0 < 1e-6
+            k = 0
+            for i in range(M):
+                if i == reference_index:
+                    continue
+                gi = x - anchors[i]
+                ri = np.sqrt(np.sum(gi ** 2))
+                if ri < 1e-6:
+                    degenerate = True
+                    break
+                H[k] = gi / ri - g0 / d0
+                delta[k] = tdoa[n, k] - (ri - d0)
+                k += 1
+            if degenerate:
+                failed = True
+                break
+
+            dx = np.linalg.pinv(H) @ delta
+            x_new = x + dx
+            if np.any(np.abs(x_new) > 10 * bounds):
+                failed = True
+                break
+            if np.sqrt(np.sum(dx ** 2)) < tol:
+                converged = True
+                break
+            x = x_new
+
+        if failed:
+            x_out[n] = np.nan
+            stats[1] += 1
+        else:
+            x_out[n] = x
+            if not converged:
+                stats[2] += 1
+    return x_out, stats
+
+
+#   Gauss-Newton with clock bias (model/least_squares_with_clock.py)
+
+def clock_gn_numpy(tdoa, anchors, reference_index, max_iter, tol, weight):
+    """
+    Gauss-Newton over x = [position, cΔt_R] for every row of `tdoa`; NaN entries drop their
+    anchor from the epoch. `weight` is the homoskedastic measurement weight 1/σ².
+    Epochs with fewer than dim+1 anchors left are NaN.
+    """
+    N = tdoa.shape[0]
+    dim = anchors.shape[1]
+    ref_anchor = anchors[reference_index]
+    other_anchors = np.delete(anchors, reference_index, axis=0)
+    valid_mask = ~np.isnan(tdoa)
+    tdoa = np.where(valid_mask, tdoa, 0.0)
+    num_valid = valid_mask.sum(axis=1)
+    stats = np.zeros(3, dtype=np.int64)
+
+    # Initial estimate: centre of the anchors used + zero clock deviation
+    x = np.zeros((N, dim + 1))
+    x[:, :dim] = (ref_anchor + valid_mask.astype(float) @ other_anchors) / (num_valid + 1)[:, np.newaxis]
+    solvable = num_valid + 1 >= dim + 1
+    x[~solvable] = np.nan
+    active = np.flatnonzero(solvable)
+
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        stats[0] += active.size
+        x_act = x[active]
+        pos, bias = x_act[:, :dim], x_act[:, dim:]
+        diff = pos[:, np.newaxis, :] - other_anchors[np.newaxis, :, :]
+        d_i = np.linalg.norm(diff, axis=2)
+        d_ref = np.linalg.norm(pos - ref_anchor, axis=1)[:, np.newaxis]
+
+        delta_z = tdoa[active] - ((d_i + bias) - (d_ref + bias))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            grad = diff / d_i[:, :, np.newaxis] - ((pos - ref_anchor) / d_ref)[:, np.newaxis, :]
+        H = np.concatenate([grad, np.ones(d_i.shape + (1,))], axis=2)  # ∂/∂cΔt_R = 1
+        H[(d_i == 0) | (d_ref == 0)] = 0.0
+        mask = valid_mask[active]
+        H *= mask[:, :, np.newaxis]
+        delta_z = np.where(mask, delta_z, 0.0)
+
+        HtWH = weight * np.einsum('nki,nkj->nij', H, H)
+        HtWz = weight * np.einsum('nki,nk->ni', H, delta_z)
+        delta_x = np.einsum('nij,nj->ni', np.linalg.pinv(HtWH), HtWz)
+
+        moving = np.linalg.norm(delta_x, axis=1) >= tol
+        x[active[moving]] = x_act[moving] + delta_x[moving]
+        active = active[moving]
+
+    stats[2] = active.size
+    return x[:, :dim], stats
+
+
+def clock_gn_loop(tdoa, anchors, reference_index, max_iter, tol, weight):
+    """Per-epoch form of `clock_gn_numpy`, written for numba.njit."""
+    N, K = tdoa.shape
+    M, dim = anchors.shape
+    x_out = np.empty((N, dim))
+    stats = np.zeros(3, dtype=np.int64)
+
+    for n in range(N):
+        used = np.empty(K, dtype=np.int64)
+        k_used = 0
+        for k in range(K):
+            if not np.isnan(tdoa[n, k]):
+                used[k_used] = k
+                k_used += 1
+        if k_used + 1 < dim + 1:
+            x_out[n] = np.nan
+            continue
+
+        # Anchor index of each used measurement (measurements skip the reference anchor)
+        anchor_idx = np.empty(k_used, dtype=np.int64)
+        x = np.zeros(dim + 1)
+        x[:dim] = anchors[reference_index]
+        for j in range(k_used):
+            k = used[j]
+            anchor_idx[j] = k if k < reference_index else k + 1
+            x[:dim] += anchors[anchor_idx[j]]
+        x[:dim] /= k_used + 1
+
+        H = np.empty((k_used, dim + 1))
+        delta_z = np.empty(k_used)
+        converged = False
+        for _ in range(max_iter):
+            stats[0] += 1
+            g_ref = x[:dim] - anchors[reference_index]
+            d_ref = np.sqrt(np.sum(g_ref ** 2))
+            for j in range(k_used):
+                g_i = x[:dim] - anchors[anchor_idx[j]]
+                d_i = np.sqrt(np.sum(g_i ** 2))
+                delta_z[j] = tdoa[n, used[j]] - ((d_i + x[dim]) - (d_ref + x[dim]))
+                if d_i == 0 or d_ref == 0:
+                    H[j] = 0.0
+                else:
+                    H[j, :dim] = g_i / d_i - g_ref / d_ref
+                    H[j, dim] = 1.0
+            HtW = weight * H.T
+            delta_x = np.linalg.pinv(HtW @ H) @ (HtW @ delta_z)
+            if np.sqrt(np.sum(delta_x ** 2)) < tol:
+                converged = True
+                break
+            x = x + delta_x
+
+        x_out[n] = x[:dim]
+        if not converged:
+            stats[2] += 1
+    return x_out, stats
+
+
+if numba is not None:
+    _taylor_jit = numba.njit(cache=True)(taylor_loop)
+    _clock_gn_jit = numba.njit(cache=True)(clock_gn_loop)
+
+
+def solve_taylor(tdoa, anchors, reference_index, x0, max_iter, tol, bounds, backend=None):
+    """float32 `tdoa` runs the numpy backend in float32; the numba kernel is compiled for float64 only."""
+    bounds = np.asarray(bounds, dtype=float)
+    if select_backend(backend) == "numba":
+        tdoa = np.ascontiguousarray(tdoa, dtype=float)
+        x0 = np.ascontiguousarray(x0, dtype=float)
+        return _taylor_jit(tdoa, np.asarray(anchors, dtype=float), reference_index, x0, max_iter, float(tol), bounds)
+    dtype = np.float32 if np.asarray(tdoa).dtype == np.float32 else np.float64
+    return taylor_numpy(np.asarray(tdoa, dtype=dtype), np.asarray(anchors, dtype=dtype), reference_index, x0,
+                        max_iter, tol, bounds)
+
+
+def solve_clock_gn(tdoa, anchors, reference_index, max_iter, tol, weight, backend=None):
+    tdoa = np.ascontiguousarray(tdoa, dtype=float)
+    if select_backend(backend) == "numba":
+        return _clock_gn_jit(tdoa, anchors, reference_index, max_iter, float(tol), float(weight))
+    return clock_gn_numpy(tdoa, anchors, reference_index, max_iter, tol, weight)
+
+
+def warmup(dims=(2, 3)):
+    """Compile (or load from numba's on-disk cache) the JIT kernels for 2D and 3D inputs."""
+    if numba is None:
+        return False
+    for dim in dims:
+        anchors = np.eye(dim + 1, dim) * 10.0
+        tdoa = np.zeros((1, dim))
+        x0 = np.full((1, dim), 1.0)
+        _taylor_jit(tdoa, anchors, 0, x0, 1, 1e-4, np.full(dim, 10.0))
+        _clock_gn_jit(tdoa, anchors, 0, 1, 1e-4, 1.0)
+    return True
@@ -1,7 +1,7 @@
 import numpy as np
-from config import get_anchors
-
-ANCHORS = get_anchors()
+from config import resolve_scenario
+from profiling import count, enabled
+from model.warm_start import seed_positions, solve_sequential
 
 def compute_distance(x, anchor):
     return np.linalg.norm(x - anchor)
@@ -41,48 +41,121 @@ def compute_residual(x, anchors, tdoa_measurement, reference_index):
     predicted = np.array(predicted)
     return tdoa_measurement - predicted  # the δz_a in Eq. 4.19
 
-def estimate_positions_least_squares(tdoa_measurements, reference_index=0, max_iter=100, tol=1e-4):
-    estimated_positions = []
-    dim = ANCHORS.shape[1]
-
-    for tdoa in tdoa_measurements:
-        # Preprocess observations and anchors for NaN data
-        if np.any(np.isnan(tdoa)):
-            valid_idx = ~np.isnan(tdoa)
-            reduced_tdoa = tdoa[valid_idx]
-            reduced_anchors = np.delete(ANCHORS, reference_index, axis=0)[valid_idx]
-            anchors_used = np.insert(reduced_anchors, reference_index, ANCHORS[reference_index], axis=0)
-        else:
-            reduced_tdoa = tdoa
-            anchors_used = ANCHORS
-
-        if anchors_used.shape[0] < dim + 1:
-            estimated_positions.append(np.full((dim,), np.nan))
-            continue
-
-        # Initialise estimate x_a(0): it can be averaged by anchor
-        x_est = np.mean(anchors_used, axis=0)
-
-        for _ in range(max_iter):
-            # Construct the residuals δz and the Jacobi matrix H
-            delta_z = compute_residual(x_est, anchors_used, reduced_tdoa, reference_index)
-            H = compute_jacobian(x_est, anchors_used, reference_index)
-
-            # Least squares incremental solution δx (Eq. 4.20)
-            try:
-                delta_x = np.linalg.pinv(H.T @ H) @ H.T @ delta_z
-            except np.linalg.LinAlgError:
-                delta_x = np.zeros_like(x_est)
-
-            # Update the position estimate x(k+1) = x(k) + δx (Eq. 4.21)
-            x_est_new = x_est + delta_x
-
-            # Termination condition ||x_k+1 - x_k|| < threshold (Eq. 4.22)
-            if np.linalg.norm(x_est_new - x_est) <= tol:
-                break
-
-            x_est = x_est_new
-
-        estimated_positions.append(x_est)
+def compute_residual_batch(X, anchors, tdoa_measurements, reference_index, valid_mask=None):
+    """
+    Batched δza (Eq. 4.19) for N epochs at once.
+    X: (N, dim), tdoa_measurements: (N, M-1); invalid entries are returned as 0.
+    """
+    dists = np.linalg.norm(X[:, np.newaxis, :] - anchors[np.newaxis, :, :], axis=2)  # (N, M)
+    predicted = np.delete(dists - dists[:, [reference_index]], reference_index, axis=1)
+    delta_z = tdoa_measurements - predicted
+    if valid_mask is not None:
+        delta_z = np.where(valid_mask, delta_z, 0.0)
+    return delta_z
+
+def compute_jacobian_batch(X, anchors, reference_index, valid_mask=None):
+    """
+    Batched Ha (Eq. 4.18), shape (N, M-1, dim); rows of invalid anchors are zeroed.
+    """
+    diff = X[:, np.newaxis, :] - anchors[np.newaxis, :, :]  # (N, M, dim)
+    dists = np.linalg.norm(diff, axis=2, keepdims=True)  # (N, M, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        unit = diff / dists
+    ref_unit = unit[:, [reference_index], :]
+    H = np.delete(unit - ref_unit, reference_index, axis=1)
+    degenerate = np.delete(dists[..., 0] == 0, reference_index, axis=1) | (dists[:, [reference_index], 0] == 0)
+    if valid_mask is not None:
+        degenerate |= ~valid_mask
+    H[degenerate] = 0.0
+    return H
+
+def gauss_newton_batch(x_est, tdoa, valid_mask, anchors, reference_index, max_iter=100, tol=1e-4):
+    """
+    Gauss-Newton iterations (Eq. 4.18-4.22) for every epoch at once, starting from `x_est`.
+    Missing measurements (`valid_mask` False) are masked out of H and δz instead of being
+    deleted, epochs leave the active set as soon as their step falls below `tol`, and rows
+    of `x_est` that are NaN are not iterated.
+    δz and H are evaluated in the dtype of `tdoa` (pass `anchors` in the same dtype); the
+    normal equations are accumulated and solved in float64.
+    Returns (x_est, stats) with stats = [iterations, diverged (always 0), not_converged].
+    """
+    x_est = np.array(x_est, dtype=tdoa.dtype)
+    active = np.flatnonzero(~np.any(np.isnan(x_est), axis=1))
+    stats = np.zeros(3, dtype=np.int64)
+
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        stats[0] += active.size
+        x_act = x_est[active]
+        mask_act = valid_mask[active]
+
+        # Construct the residuals δz and the Jacobi matrix H
+        delta_z = compute_residual_batch(x_act, anchors, tdoa[active], reference_index, mask_act)
+        H = compute_jacobian_batch(x_act, anchors, reference_index, mask_act)
+
+        # Least squares incremental solution δx (Eq. 4.20), one normal-equation solve per epoch
+        HtH = np.einsum('nki,nkj->nij', H, H, dtype=np.float64)
+        Htz = np.einsum('nki,nk->ni', H, delta_z, dtype=np.float64)
+        delta_x = np.einsum('nij,nj->ni', np.linalg.pinv(HtH), Htz)
+
+        # Termination condition ||x_k+1 - x_k|| < threshold (Eq. 4.22)
+        converged = np.linalg.norm(delta_x, axis=1) <= tol
+
+        # Update the position estimate x(k+1) = x(k) + δx (Eq. 4.21)
+        moving = active[~converged]
+        x_est[moving] = x_act[~converged] + delta_x[~converged]
+        active = moving
+
+    stats[2] = active.size
+    return x_est, stats
+
+def estimate_positions_least_squares(tdoa_measurements, reference_index=0, max_iter=100, tol=1e-4, init="mean",
+                                     scenario=None):
+    """
+    Gauss-Newton TDOA solver, iterated over all epochs at once (see `gauss_newton_batch`).
 
-    return np.array(estimated_positions)
\ No newline at end of file
+    init: start point of each epoch (see `model.warm_start.seed_positions`): "mean" of the
+    anchors still observed, a "chan" or "fang" closed-form fix, or the "previous" epoch's fix
+    (see `model.warm_start.solve_sequential`). Unusable seeds fall back to the anchor mean.
+    Runs and returns in scenario.dtype.
+    """
+    scenario = resolve_scenario(scenario)
+    anchors = scenario.anchors.astype(scenario.dtype)
+    tdoa_measurements = np.atleast_2d(np.asarray(tdoa_measurements, dtype=scenario.dtype))
+    N = tdoa_measurements.shape[0]
+    dim = anchors.shape[1]
+    other_anchors = np.delete(anchors, reference_index, axis=0)
+
+    valid_mask = ~np.isnan(tdoa_measurements)
+    tdoa = np.where(valid_mask, tdoa_measurements, 0.0)
+    num_valid = valid_mask.sum(axis=1)
+
+    # Initialise estimate x_a(0): mean of the reference and every anchor still observed
+    x_est = (anchors[reference_index] + valid_mask.astype(float) @ other_anchors) / (num_valid + 1)[:, np.newaxis]
+
+    # Too few anchors left to fix a position
+    solvable = num_valid + 1 >= dim + 1
+    x_est[~solvable] = np.nan
+    x_est, seeded = seed_positions(tdoa_measurements, init, x_est, scenario.upper_bounds, reference_index, scenario)
+
+    if init == "previous":
+        x_est, stats, num_seeded = solve_sequential(
+            lambda rows, x0: gauss_newton_batch(x0, tdoa[rows], valid_mask[rows], anchors, reference_index,
+                                                max_iter, tol),
+            x_est, scenario.upper_bounds,
+            lambda rows, x0: seed_positions(tdoa_measurements[rows], "chan", x0, scenario.upper_bounds,
+                                            reference_index, scenario)[0]
+        )
+        count("least_squares.seeded_previous", num_seeded)
+    else:
+        x_est, stats = gauss_newton_batch(x_est, tdoa, valid_mask, anchors, reference_index, max_iter, tol)
+        if enabled():
+            count("least_squares.seeded_closed_form", int(seeded.sum()))
+
+    count("least_squares.epochs", N)
+    count("least_squares.iterations", int(stats[0]))
+    if enabled():
+        count("least_squares.unsolvable", N - int(solvable.sum()))
+    count("least_squares.not_converged", int(stats[2]))
+    return x_est.astype(scenario.dtype, copy=False)
@@ -1,8 +1,10 @@
 import numpy as np
-from config import get_anchors, get_tdoa_noise_std
-
-ANCHORS = get_anchors()
-TDOA_NOISE_STD = get_tdoa_noise_std()
+from config import resolve_scenario
+from profiling import count
+from model.kernels import solve_clock_gn
+from model.least_squares import compute_jacobian_batch, compute_residual_batch, gauss_newton_batch
+from model.levenberg_marquardt import cholesky_solve
+from model.warm_start import valid_seed
 
 
 def compute_distance_with_clock(x, anchor):
@@ -45,50 +47,193 @@ def compute_residual_with_clock(x, anchors, tdoa_measurement, reference_index):
     predicted = np.array(predicted)
     return tdoa_measurement - predicted
 
-def estimate_positions_least_squares_with_clock(tdoa_measurements, reference_index=0, max_iter=100, tol=1e-4):
-    estimated_positions = []
-    dim = ANCHORS.shape[1]  # 2 or 3
-    std = TDOA_NOISE_STD
-
-    for tdoa in tdoa_measurements:
-        # Samples with NaN need to be excluded from the corresponding anchor.
-        if np.any(np.isnan(tdoa)):
-            valid_idx = ~np.isnan(tdoa)
-            reduced_tdoa = tdoa[valid_idx]
-            reduced_anchors = np.delete(ANCHORS, reference_index, axis=0)[valid_idx]
-            anchors_used = np.insert(reduced_anchors, reference_index, ANCHORS[reference_index], axis=0)
-        else:
-            reduced_tdoa = tdoa
-            anchors_used = ANCHORS
-
-        if anchors_used.shape[0] < dim + 1:
-            estimated_positions.append(np.full((dim,), np.nan))
-            continue
-
-        # Initial estimate: centre of space + initial clock deviation set to 0
-        x_est = np.zeros(dim + 1)
-        x_est[:-1] = np.mean(anchors_used, axis=0)
-        x_est[-1] = 0.0
-
-        # Construct covariance weight matrix Wa (diagonal, assuming homoskedasticity）
-        N = len(reduced_tdoa)
-        Wa = np.eye(N) / (std ** 2)
-
-        for _ in range(max_iter):
-            delta_z = compute_residual_with_clock(x_est, anchors_used, reduced_tdoa, reference_index)
-            H = compute_jacobian_with_clock(x_est, anchors_used, reference_index)
-
-            try:
-                HtW = H.T @ Wa
-                delta_x = np.linalg.pinv(HtW @ H) @ HtW @ delta_z
-            except np.linalg.LinAlgError:
-                delta_x = np.zeros_like(x_est)
-
-            x_new = x_est + delta_x
-            if np.linalg.norm(delta_x) < tol:
-                break
-            x_est = x_new
-
-        estimated_positions.append(x_est[:-1])  # Only retain the spatial coordinates portion
-
-    return np.array(estimated_positions)
+def estimate_positions_least_squares_with_clock(tdoa_measurements, reference_index=0, max_iter=100, tol=1e-4,
+                                                backend=None, scenario=None):
+    """
+    Gauss-Newton over [position, cΔt_R] with the diagonal weight Wa = I/σ² (homoskedastic).
+    NaN measurements drop their anchor from that epoch. The iterations run in `model.kernels`
+    (`backend`: None/"auto", "numpy" or "numba"), in float64; the result is cast to scenario.dtype.
+    """
+    scenario = resolve_scenario(scenario)
+    tdoa_measurements = np.atleast_2d(np.asarray(tdoa_measurements, dtype=float))
+    estimated_positions, stats = solve_clock_gn(
+        tdoa_measurements, scenario.anchors, reference_index, max_iter, tol,
+        1.0 / scenario.tdoa_noise_std ** 2, backend=backend
+    )
+
+    count("least_squares_with_clock.epochs", tdoa_measurements.shape[0])
+    count("least_squares_with_clock.iterations", int(stats[0]))
+    count("least_squares_with_clock.not_converged", int(stats[2]))
+    return estimated_positions.astype(scenario.dtype, copy=False)
+
+#   sliding-window joint solver: positions of K epochs + one clock bias (and drift) per window
+
+def window_starts(num_epochs, window):
+    """First epoch of the window that owns every epoch: the one centred on it, clipped to the data."""
+    num_windows = max(num_epochs - window + 1, 1)
+    return np.clip(np.arange(num_epochs) - window // 2, 0, num_windows - 1)
+
+def fit_clock_windows(times, sigma, target, window, drift):
+    """
+    Weighted least-squares fit of the clock bias b(t) = b0 + drift·(t - t_w) in every window of
+    `window` consecutive epochs (one window per start epoch, sliding by one).
+    Epoch n enters with weight sigma[n] and value target[n]. Returns b0 and drift of each window,
+    shape (num_windows,), evaluated at the window centre t_w.
+    """
+    window = min(window, times.shape[0])
+    view = lambda v: np.lib.stride_tricks.sliding_window_view(v, window)
+    w, y = view(sigma), view(target)
+    s0 = w.sum(axis=1)
+    m0 = (w * y).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if not drift:
+            return np.where(s0 > 0, m0 / s0, 0.0), np.zeros_like(s0)
+        tau = view(times) - view(times)[:, [window // 2]]
+        s1 = (w * tau).sum(axis=1)
+        s2 = (w * tau ** 2).sum(axis=1)
+        m1 = (w * tau * y).sum(axis=1)
+        det = s0 * s2 - s1 ** 2
+        # A window whose epochs all share one time (or weight) has no drift information
+        flat = ~(det > 1e-12 * np.maximum(s0 * s2, 1e-300))
+        b0 = np.where(flat, np.where(s0 > 0, m0 / s0, 0.0), (s2 * m0 - s1 * m1) / det)
+        slope = np.where(flat, 0.0, (s0 * m1 - s1 * m0) / det)
+    return b0, slope
+
+def window_gn_batch(x_est, tdoa, valid_mask, anchors, reference_index, upper_bounds, times, window, drift, weight,
+                    max_iter=50, tol=1e-4, bias=None):
+    """
+    Gauss-Newton for the windowed clock model, every epoch at once.
+
+    The unknowns of a window are the positions of its epochs and its clock parameters
+    [b0, drift]; the stacked Jacobian is block-sparse (one dim-column block per epoch plus the
+    shared clock columns), so it is never formed. Each epoch's block HᵀWH is factorised and the
+    epoch is reduced to its Schur complement onto the bias,
+    σ = 1ᵀW1 - 1ᵀWH (HᵀWH)⁻¹ HᵀW1 and ρ = 1ᵀWδz - 1ᵀWH (HᵀWH)⁻¹ HᵀWδz, so solving a window's clock
+    parameters is a weighted line fit of σ, b + ρ/σ over its epochs (`fit_clock_windows`).
+    The windows slide by one epoch and share the per-epoch factorisations, and each epoch takes
+    the bias (and its position step) of the window centred on it.
+
+    Only epochs that moved by at least `tol` are linearised again; the others keep their
+    factorisation, and their position follows later bias changes through it, so an iteration
+    costs one block per moving epoch whatever `window` is. A position step that would leave the
+    room grown by one room size on every side is not taken (as in `levenberg_marquardt_batch`),
+    and epochs outside it do not inform the clock fit. Rows of `x_est` that are NaN are not solved.
+
+    Returns (x_est, bias at every epoch, stats) with stats = [linearisations, diverged (always 0),
+    not_converged].
+    """
+    x_est = np.array(x_est, dtype=float)
+    N, dim = x_est.shape
+    bias = np.zeros(N) if bias is None else np.array(bias, dtype=float)
+    solvable = ~np.any(np.isnan(x_est), axis=1)
+    x_est[~solvable] = anchors.mean(axis=0)
+    w = weight * (valid_mask & solvable[:, np.newaxis])
+    owner = window_starts(N, window)
+    centre = times[np.minimum(owner + min(window, N) // 2, N - 1)]
+    ridge = 1e-12 * np.eye(dim)
+    stats = np.zeros(3, dtype=np.int64)
+
+    # Linearisation of every epoch: point, bias, (HᵀWH)⁻¹HᵀW1, (HᵀWH)⁻¹HᵀWδz, σ and b + ρ/σ
+    x_lin, bias_lin = x_est.copy(), bias.copy()
+    A_inv_a, A_inv_g = np.zeros((N, dim)), np.zeros((N, dim))
+    sigma, target = np.zeros(N), bias.copy()
+    active = np.flatnonzero(solvable)
+
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        stats[0] += active.size
+        x_act, w_act = x_est[active], w[active]
+        H = compute_jacobian_batch(x_act, anchors, reference_index, valid_mask[active])
+        delta_z = np.where(valid_mask[active], compute_residual_batch(x_act, anchors, tdoa[active], reference_index)
+                           - bias[active, np.newaxis], 0.0)
+
+        # Per-epoch blocks and their Schur complement onto the shared bias
+        A = np.einsum('nk,nki,nkj->nij', w_act, H, H) + ridge
+        a = np.einsum('nk,nki->ni', w_act, H)
+        A_inv_a[active] = cholesky_solve(A, a)
+        A_inv_g[active] = cholesky_solve(A, np.einsum('nk,nki,nk->ni', w_act, H, delta_z))
+        inside = valid_seed(x_act, upper_bounds, margin=1.0)
+        s = np.where(inside, np.maximum(w_act.sum(axis=1) - np.einsum('ni,ni->n', a, A_inv_a[active]), 0.0), 0.0)
+        rho = np.einsum('nk,nk->n', w_act, delta_z) - np.einsum('ni,ni->n', a, A_inv_g[active])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            target[active] = np.where(s > 0, bias[active] + rho / s, bias[active])
+        sigma[active] = s
+        x_lin[active], bias_lin[active] = x_act, bias[active]
+
+        # Clock parameters of every window, each epoch reading the bias of the window it owns
+        b0, slope = fit_clock_windows(times, sigma, target, window, drift)
+        new_bias = b0[owner] + slope[owner] * (times - centre)
+
+        # Joint solution of every epoch's linearisation given the new bias
+        x_new = x_lin + A_inv_g - A_inv_a * (new_bias - bias_lin)[:, np.newaxis]
+        leaving = valid_seed(x_est, upper_bounds, margin=1.0) & ~valid_seed(x_new, upper_bounds, margin=1.0)
+        x_new[leaving] = x_est[leaving]
+        step = np.maximum(np.linalg.norm(x_new - x_est, axis=1), np.abs(new_bias - bias))
+        x_est, bias = x_new, new_bias
+        active = np.flatnonzero(solvable & (step >= tol))
+
+    stats[2] = active.size
+    x_est[~solvable] = np.nan
+    return x_est, bias, stats
+
+def estimate_positions_clock_window(tdoa_measurements, reference_index=0, window=10, drift=True, dt=1.0,
+                                    max_iter=50, tol=1e-4, state=None, return_state=False, scenario=None):
+    """
+    Sliding-window joint solver for the clock-bias model: the positions of `window` consecutive
+    epochs are solved together with one reference clock bias cΔt_R = b0 + drift·t shared by the
+    window (`drift=False` keeps it constant), instead of one bias per epoch as in
+    `estimate_positions_least_squares_with_clock`. The window slides by one epoch and each epoch's
+    fix comes from the window centred on it (see `window_gn_batch`), so a fix uses window // 2
+    epochs of look-ahead. `dt` is the time (s) from the previous epoch to each epoch, a scalar or
+    (N,) for irregular epochs; W = I/σ².
+
+    Sharing the bias leaves dim unknowns per epoch instead of dim + 1, so an epoch needs only dim
+    valid measurements (fewer are NaN) and four anchors in 2D are enough to fix a position.
+    Pass the `(tdoa, positions, bias, times)` of the last window - 1 epochs returned with
+    `return_state=True` back in as `state` to continue on the next block of epochs.
+    """
+    scenario = resolve_scenario(scenario)
+    anchors = scenario.anchors
+    dim = anchors.shape[1]
+    tdoa_measurements = np.atleast_2d(np.asarray(tdoa_measurements, dtype=float))
+    N = tdoa_measurements.shape[0]
+    if N == 0:
+        estimated_positions = np.empty((0, dim), dtype=scenario.dtype)
+        return (estimated_positions, state) if return_state else estimated_positions
+    tail_tdoa, tail_x, tail_bias, tail_times = (np.empty((0, tdoa_measurements.shape[1])), np.empty((0, dim)),
+                                                np.empty(0), np.empty(0)) if state is None else state
+    T = tail_tdoa.shape[0]
+    steps = np.cumsum(np.broadcast_to(np.asarray(dt, dtype=float), (N,)))
+    times = np.concatenate([tail_times, (tail_times[-1] if T else -steps[0]) + steps])
+    tdoa_all = np.concatenate([tail_tdoa, tdoa_measurements])
+    valid_mask = ~np.isnan(tdoa_all)
+    tdoa = np.where(valid_mask, tdoa_all, 0.0)
+    num_valid = valid_mask.sum(axis=1)
+
+    # Start point: the previous fix for carried epochs; new epochs start from the mean of the
+    # anchors they observe, moved by a few Gauss-Newton steps that hold the bias at its last value
+    # (a joint step from that far away overshoots along the hyperbolas)
+    other_anchors = np.delete(anchors, reference_index, axis=0)
+    x_est = (anchors[reference_index] + valid_mask.astype(float) @ other_anchors) / (num_valid + 1)[:, np.newaxis]
+    x_est[num_valid < dim] = np.nan
+    bias = np.concatenate([tail_bias, np.full(N, tail_bias[-1] if T else 0.0)])
+    seed, _ = gauss_newton_batch(x_est[T:], tdoa[T:] - bias[T:, np.newaxis], valid_mask[T:], anchors,
+                                 reference_index, max_iter=10, tol=1e-2)
+    usable = valid_seed(seed, scenario.upper_bounds, margin=1.0)
+    x_est[T:][usable] = seed[usable]
+    x_est[:T] = np.where(np.isnan(tail_x), x_est[:T], tail_x)
+
+    x_est, bias, stats = window_gn_batch(
+        x_est, tdoa, valid_mask, anchors, reference_index, scenario.upper_bounds, times, window,
+        drift, 1.0 / scenario.tdoa_noise_std ** 2, max_iter, tol, bias
+    )
+
+    count("clock_window.epochs", N)
+    count("clock_window.iterations", int(stats[0]))
+    count("clock_window.not_converged", int(stats[2]))
+    estimated_positions = x_est[T:].astype(scenario.dtype, copy=False)
+    if not return_state:
+        return estimated_positions
+    keep = slice(max(T + N - (window - 1), 0), T + N)
+    return estimated_positions, (tdoa_all[keep], x_est[keep], bias[keep], times[keep])
@@ -0,0 +1,160 @@
+import numpy as np
+from config import resolve_scenario
+from profiling import count, enabled
+from model.least_squares import compute_jacobian_batch, compute_residual_batch
+from model.warm_start import seed_positions, valid_seed
+
+#   damped Gauss-Newton (Levenberg-Marquardt)
+
+def cholesky_solve(A, b):
+    """
+    Solve A x = b for a batch of small symmetric positive definite systems.
+    A: (N, d, d), b: (N, d). The triangular solves loop over d, not over N.
+    """
+    L = np.linalg.cholesky(A)
+    d = b.shape[1]
+    y = np.empty_like(b)
+    for i in range(d):
+        y[:, i] = (b[:, i] - np.einsum('nj,nj->n', L[:, i, :i], y[:, :i])) / L[:, i, i]
+    x = np.empty_like(b)
+    for i in reversed(range(d)):
+        x[:, i] = (y[:, i] - np.einsum('nj,nj->n', L[:, i + 1:, i], x[:, i + 1:])) / L[:, i, i]
+    return x
+
+def levenberg_marquardt_batch(x_est, tdoa, weights, anchors, reference_index, upper_bounds, max_iter=50,
+                              ftol=1e-4, xtol=1e-4, damping=1e-3):
+    """
+    Levenberg-Marquardt iterations for every epoch at once, starting from `x_est`.
+
+    Each step solves (HᵀWH + λ·diag(HᵀWH)) δx = HᵀWδz by Cholesky, with W = diag(weights[n]);
+    a zero weight removes a measurement, so `weights` carries both 1/σ² and the NaN mask.
+    A step is only accepted when it lowers the weighted cost and stays inside the room grown
+    by one room size on every side (the cost keeps falling along a hyperbola's asymptote, so
+    this acts as the trust region); λ shrinks after good steps and grows after rejected ones
+    (Nielsen's rule). An epoch stops when an accepted step reduces the cost by less than `ftol`
+    (relative) or moves it by less than `xtol`. Rows of `x_est` that are NaN are not iterated.
+    Positions, δz and H are in the dtype of `tdoa` (pass `anchors` in the same dtype); the
+    cost and the normal equations are accumulated and solved in float64.
+
+    Returns (x_est, cost, iterations, converged, rejected steps).
+    """
+    x_est = np.array(x_est, dtype=tdoa.dtype)
+    N, dim = x_est.shape
+    iterations = np.zeros(N, dtype=np.int64)
+    converged = np.zeros(N, dtype=bool)
+    lam = np.full(N, float(damping))
+    nu = np.full(N, 2.0)
+    active = np.flatnonzero(~np.any(np.isnan(x_est), axis=1))
+    cost = np.full(N, np.nan)
+    cost[active] = np.einsum('nk,nk->n', weights[active],
+                             compute_residual_batch(x_est[active], anchors, tdoa[active], reference_index) ** 2,
+                             dtype=np.float64)
+    rejected = 0
+
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        iterations[active] += 1
+        x_act = x_est[active]
+        w_act = weights[active]
+
+        H = compute_jacobian_batch(x_act, anchors, reference_index)
+        delta_z = compute_residual_batch(x_act, anchors, tdoa[active], reference_index)
+        HtWH = np.einsum('nk,nki,nkj->nij', w_act, H, H, dtype=np.float64)
+        HtWz = np.einsum('nk,nki,nk->ni', w_act, H, delta_z, dtype=np.float64)
+
+        # Damped normal equations; the small ridge keeps degenerate epochs positive definite
+        diag = np.einsum('nii->ni', HtWH)
+        damped = HtWH.copy()
+        damped[:, np.arange(dim), np.arange(dim)] += lam[active, np.newaxis] * diag + 1e-12 * (1.0 + diag)
+        delta_x = cholesky_solve(damped, HtWz)
+
+        x_new = (x_act + delta_x).astype(x_est.dtype, copy=False)
+        new_cost = np.einsum('nk,nk->n', w_act,
+                             compute_residual_batch(x_new, anchors, tdoa[active], reference_index) ** 2,
+                             dtype=np.float64)
+        old_cost = cost[active]
+        predicted = np.einsum('ni,ni->n', delta_x, lam[active, np.newaxis] * diag * delta_x + HtWz)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rho = (old_cost - new_cost) / predicted
+        accept = (new_cost < old_cost) & (rho > 0) & valid_seed(x_new, upper_bounds, margin=1.0)
+        rejected += np.count_nonzero(~accept)
+
+        # Nielsen's damping update
+        acc = active[accept]
+        x_est[acc] = x_new[accept]
+        cost[acc] = new_cost[accept]
+        lam[acc] *= np.maximum(1.0 / 3.0, 1.0 - (2.0 * rho[accept] - 1.0) ** 3)
+        nu[acc] = 2.0
+        rej = active[~accept]
+        lam[rej] *= nu[rej]
+        nu[rej] *= 2.0
+
+        # Early exit on small relative cost reduction or step; a stalled epoch is at a minimum, and
+        # so is one whose rejected step is already below xtol (the cost is at its rounding floor)
+        step = np.linalg.norm(delta_x, axis=1)
+        small = accept & (((old_cost - new_cost) <= ftol * np.maximum(old_cost, 1e-300)) | (step <= xtol))
+        stalled = ~accept & ((lam[active] > 1e12) | (step <= xtol))
+        done = small | stalled
+        converged[active[done]] = True
+        active = active[~done]
+
+    return x_est, cost, iterations, converged, rejected
+
+def estimate_positions_lm(tdoa_measurements, reference_index=0, max_iter=50, ftol=1e-4, xtol=1e-4,
+                          damping=1e-3, init="mean", return_diagnostics=False, scenario=None):
+    """
+    Levenberg-Marquardt TDOA solver over all epochs at once (see `levenberg_marquardt_batch`),
+    with W = I/σ². Accepted steps always lower the cost, so epochs never run away and are not
+    dropped as NaN. Missing measurements (NaN) are masked out, and `init` selects the start
+    point as in `estimate_positions_least_squares`.
+
+    With `return_diagnostics=True` also returns a dict of per-epoch arrays:
+        iterations (N,), residual_norm (N,) = ||δz|| at the fix, converged (N,),
+        covariance (N, dim, dim) = (HᵀWH)⁻¹ at the fix.
+    Positions are computed and returned in scenario.dtype; the diagnostics are float64.
+    """
+    scenario = resolve_scenario(scenario)
+    anchors = scenario.anchors.astype(scenario.dtype)
+    weight = 1.0 / scenario.tdoa_noise_std ** 2
+    tdoa_measurements = np.atleast_2d(np.asarray(tdoa_measurements, dtype=scenario.dtype))
+    N = tdoa_measurements.shape[0]
+    dim = anchors.shape[1]
+    other_anchors = np.delete(anchors, reference_index, axis=0)
+
+    valid_mask = ~np.isnan(tdoa_measurements)
+    tdoa = np.where(valid_mask, tdoa_measurements, 0.0)
+    num_valid = valid_mask.sum(axis=1)
+
+    # Start point: mean of the reference and every anchor still observed (or a warm start)
+    x_est = (anchors[reference_index] + valid_mask.astype(float) @ other_anchors) / (num_valid + 1)[:, np.newaxis]
+    solvable = num_valid + 1 >= dim + 1
+    x_est[~solvable] = np.nan
+    x_est, _ = seed_positions(tdoa_measurements, init, x_est, scenario.upper_bounds, reference_index, scenario)
+
+    x_est, cost, iterations, converged, rejected = levenberg_marquardt_batch(
+        x_est, tdoa, weight * valid_mask, anchors, reference_index, scenario.upper_bounds,
+        max_iter, ftol, xtol, damping
+    )
+
+    if enabled():
+        count("lm.epochs", N)
+        count("lm.iterations", int(iterations.sum()))
+        count("lm.rejected_steps", rejected)
+        count("lm.not_converged", int(np.count_nonzero(solvable & ~converged)))
+
+    if not return_diagnostics:
+        return x_est
+
+    residual_norm = np.sqrt(cost / weight)
+    covariance = np.full((N, dim, dim), np.nan)
+    fixed = np.flatnonzero(solvable)
+    if fixed.size > 0:
+        H = compute_jacobian_batch(x_est[fixed], anchors, reference_index, valid_mask[fixed])
+        covariance[fixed] = np.linalg.pinv(weight * np.einsum('nki,nkj->nij', H, H, dtype=np.float64))
+    return x_est, {
+        "iterations": iterations,
+        "residual_norm": residual_norm,
+        "converged": converged,
+        "covariance": covariance,
+    }
@@ -0,0 +1,115 @@
+import hashlib
+from collections import OrderedDict
+import numpy as np
+
+from config import resolve_scenario
+from model import load_model
+from profiling import count
+from streaming import accepts_state
+
+_NAN_CODE = np.iinfo(np.int64).min
+
+
+def quantize_tdoa(tdoa_measurements, resolution):
+    """TDOA rows rounded to multiples of `resolution`, as int64 codes (NaN gets its own code)."""
+    codes = np.round(tdoa_measurements / resolution)
+    codes[np.isnan(codes)] = _NAN_CODE
+    return np.ascontiguousarray(codes.astype(np.int64))
+
+
+class MemoizedEstimator:
+    """
+    Memoising wrapper around an estimator from `model.load_model`, for tags that report the
+    same TDOA vector again and again (parked assets).
+
+    Every row is quantised to `resolution` (metres of path difference) and keyed together with a
+    hash of the anchor geometry, σ, the precision and the keyword arguments of the call; rows
+    whose key is cached return the cached fix, and only the distinct uncached rows of a batch are
+    passed to the estimator, in one call. The fixes live in a slot array indexed through an LRU dict of
+    keys, so a batch of hits is one gather; at most `maxsize` fixes are kept.
+    `hits` and `misses` count rows; a repeat of a row solved earlier in the same batch is a hit.
+
+    Stateful estimators (the trackers) are rejected: their output depends on the whole track.
+    """
+
+    def __init__(self, estimate_positions, resolution=0.01, maxsize=100_000):
+        if accepts_state(estimate_positions):
+            raise ValueError("Stateful estimators (trackers) cannot be memoised")
+        if resolution <= 0:
+            raise ValueError("resolution must be positive")
+        self.estimate_positions = estimate_positions
+        self.resolution = resolution
+        self.maxsize = maxsize
+        self.slots = OrderedDict()  # key -> row of `fixes`, least recently used first
+        self.fixes = np.empty((0, 3))
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.slots)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def geometry_key(self, scenario, kwargs):
+        digest = hashlib.sha1(scenario.anchors.tobytes())
+        digest.update(repr((scenario.space, scenario.tdoa_noise_std, scenario.precision, sorted(kwargs.items()))).encode())
+        return digest.digest()[:8]
+
+    def clear(self):
+        self.slots.clear()
+
+    def store(self, keys, fixes):
+        """Insert new keys, evicting the least recently used ones beyond `maxsize`; returns their slots."""
+        slots = np.empty(len(keys), dtype=np.int64)
+        for i, key in enumerate(keys):
+            if len(self.slots) < self.maxsize:
+                slot = len(self.slots)
+                if slot >= self.fixes.shape[0]:
+                    grown = np.empty((min(max(2 * slot, 1024), self.maxsize), 3))
+                    grown[:slot] = self.fixes[:slot]
+                    self.fixes = grown
+            else:
+                _, slot = self.slots.popitem(last=False)
+            self.slots[key] = slot
+            slots[i] = slot
+        self.fixes[slots, :fixes.shape[1]] = fixes
+        return slots
+
+    def __call__(self, tdoa_measurements, scenario=None, **kwargs):
+        scenario = resolve_scenario(scenario)
+        tdoa_measurements = np.atleast_2d(np.asarray(tdoa_measurements, dtype=float))
+        N, K = tdoa_measurements.shape
+        if N == 0:
+            return self.estimate_positions(tdoa_measurements, scenario=scenario, **kwargs)
+
+        # Distinct quantised rows of the batch, each looked up once
+        codes = quantize_tdoa(tdoa_measurements, self.resolution)
+        unique, first, inverse = np.unique(codes.view(np.dtype((np.void, 8 * K))).ravel(),
+                                           return_index=True, return_inverse=True)
+        geometry = self.geometry_key(scenario, kwargs)
+        buffer = unique.tobytes()
+        keys = [geometry + buffer[j:j + 8 * K] for j in range(0, len(buffer), 8 * K)]
+
+        slots = np.array([self.slots.get(key, -1) for key in keys], dtype=np.int64)
+        missing = np.flatnonzero(slots < 0)
+        for i in np.flatnonzero(slots >= 0):
+            self.slots.move_to_end(keys[i])
+        fixes = np.empty((len(keys), scenario.dim))
+        fixes[slots >= 0] = self.fixes[slots[slots >= 0], :scenario.dim]
+        if missing.size:
+            fixes[missing] = self.estimate_positions(tdoa_measurements[first[missing]], scenario=scenario, **kwargs)
+            self.store([keys[i] for i in missing], fixes[missing])
+
+        self.hits += N - missing.size
+        self.misses += missing.size
+        count("memo.hits", N - missing.size)
+        count("memo.misses", missing.size)
+        return fixes[inverse.ravel()].astype(scenario.dtype, copy=False)
+
+
+def load_memoized_model(model_name, config, resolution=0.01, maxsize=100_000):
+    """Same contract as `model.load_model`, but the returned callable memoises fixes (see `MemoizedEstimator`)."""
+    return MemoizedEstimator(load_model(model_name, config), resolution, maxsize)
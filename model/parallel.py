@@ -0,0 +1,176 @@
+import inspect
+import weakref
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from config import resolve_scenario
+from model import load_model
+from streaming import accepts_state
+
+
+# Worker side: shared-memory segments stay attached across shards and calls
+_attached = {}
+
+
+def _attach(*names):
+    """
+    The segments `names` (the parent's current ones), attached once per worker. Segments the
+    parent has replaced are closed here, before any view of the current call exists.
+    """
+    for name in [name for name in _attached if name not in names]:
+        _attached.pop(name).close()
+    for name in names:
+        if name not in _attached:
+            _attached[name] = shared_memory.SharedMemory(name=name)
+    return [_attached[name] for name in names]
+
+
+def _run_shard(model_name, config, scenario, in_spec, out_spec, start, stop, seed_seq):
+    """Worker: estimate rows [start, stop) of the shared input into the shared output."""
+    in_shm, out_shm = _attach(in_spec[0], out_spec[0])
+    tdoa = np.ndarray(in_spec[1], dtype=scenario.dtype, buffer=in_shm.buf)
+    out = np.ndarray(out_spec[1], dtype=scenario.dtype, buffer=out_shm.buf)
+
+    estimate_positions = load_model(model_name, config)
+    # Stochastic models draw from the global RNG or take an explicit seed
+    np.random.seed(seed_seq.generate_state(1)[0])
+    params = inspect.signature(estimate_positions).parameters
+    kwargs = {}
+    if "seed" in params:
+        kwargs["seed"] = seed_seq
+    if "scenario" in params:
+        kwargs["scenario"] = scenario
+
+    try:
+        out[start:stop] = estimate_positions(tdoa[start:stop], **kwargs)
+    finally:
+        del tdoa, out  # no view may outlive the call: the next one may close these segments
+    return start, stop
+
+
+def shard_bounds(num_rows, num_shards):
+    """Contiguous, ordered [start, stop) row ranges of near-equal size."""
+    edges = np.linspace(0, num_rows, num_shards + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+def _release(executor, segments):
+    """Shut the pool down and free the shared segments (once, from `close` or at exit)."""
+    if executor[0] is not None:
+        executor[0].shutdown()
+    for shm in segments.values():
+        shm.close()
+        shm.unlink()
+    segments.clear()
+
+
+class ParallelEstimator:
+    """
+    Run a registered model over shards of the TDOA matrix in a process pool.
+    Input and output live in shared memory, so workers neither pickle nor copy the arrays;
+    every shard writes its rows in place, which keeps the output in input order.
+
+    The pool is started on the first call and the shared segments are kept (and only replaced
+    by larger ones), so calling it once per stream chunk costs no process startup after the
+    first chunk. `close()` (or leaving a `with` block) shuts the pool down; otherwise that
+    happens when the estimator is garbage collected or at exit.
+
+    Parameters:
+        model_name, config: as for `model.load_model`
+        scenario: config.Scenario shipped to every worker (default: from the command line)
+        workers: number of processes
+        shard_size: rows per shard (default: one shard per worker)
+        seed: root seed (None: fresh entropy); every call spawns one stream per shard from it,
+              in order, so a run is reproducible for a given seed, call sequence and shard layout
+
+    Trackers (ekf, particle_filter_tracking, ...) are refused: a shard boundary would restart
+    their track, and the state could not be carried from call to call.
+    """
+
+    def __init__(self, model_name, config, scenario=None, workers=2, shard_size=None, seed=None):
+        if accepts_state(load_model(model_name, config)):  # also fails fast on unknown models
+            raise ValueError(f"Stateful model '{model_name}' (a tracker) cannot be sharded across processes")
+        self.model_name = model_name
+        self.config = config
+        self.scenario = scenario
+        self.workers = workers
+        self.shard_size = shard_size
+        self.seed_seq = np.random.SeedSequence(seed)
+        self._executor = [None]
+        self._segments = {}
+        self._finalizer = weakref.finalize(self, _release, self._executor, self._segments)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._finalizer()
+
+    def _segment(self, role, nbytes):
+        """The shared segment for `role` ('in' or 'out'), replaced when smaller than `nbytes`."""
+        shm = self._segments.get(role)
+        if shm is None or shm.size < nbytes:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+            shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 2 * (shm.size if shm else 0), 1))
+            self._segments[role] = shm
+        return shm
+
+    def __call__(self, tdoa_measurements, scenario=None):
+        """
+        tdoa_measurements: ndarray, shape=(N, M-1)
+        Returns ndarray, shape=(N, dim), in scenario.dtype (the shared buffers use it too).
+        """
+        scenario = resolve_scenario(self.scenario if scenario is None else scenario)
+        dim = scenario.dim
+        tdoa_measurements = np.atleast_2d(np.asarray(tdoa_measurements, dtype=scenario.dtype))
+        N = tdoa_measurements.shape[0]
+        if N == 0:
+            return np.empty((0, dim), dtype=scenario.dtype)
+        num_shards = self.workers if self.shard_size is None else -(-N // self.shard_size)
+        bounds = shard_bounds(N, num_shards)
+        seeds = self.seed_seq.spawn(len(bounds))
+
+        in_shm = self._segment("in", tdoa_measurements.nbytes)
+        out_shm = self._segment("out", N * dim * scenario.dtype.itemsize)
+        shared_in = np.ndarray(tdoa_measurements.shape, dtype=scenario.dtype, buffer=in_shm.buf)
+        shared_in[:] = tdoa_measurements
+        shared_out = np.ndarray((N, dim), dtype=scenario.dtype, buffer=out_shm.buf)
+        shared_out[:] = np.nan
+
+        if self._executor[0] is None:
+            self._executor[0] = ProcessPoolExecutor(max_workers=self.workers)
+        in_spec = (in_shm.name, tdoa_measurements.shape)
+        out_spec = (out_shm.name, (N, dim))
+        futures = [
+            self._executor[0].submit(_run_shard, self.model_name, self.config, scenario, in_spec, out_spec,
+                                     start, stop, seed_seq)
+            for (start, stop), seed_seq in zip(bounds, seeds)
+        ]
+        for future in futures:
+            future.result()
+
+        result = shared_out.copy()
+        del shared_in, shared_out
+        return result
+
+
+def estimate_positions_parallel(tdoa_measurements, model_name, config, scenario=None, workers=2,
+                                shard_size=None, seed=None):
+    """One-off `ParallelEstimator` call: starts a pool, runs every shard and shuts the pool down."""
+    with ParallelEstimator(model_name, config, scenario, workers, shard_size, seed) as estimator:
+        return estimator(tdoa_measurements)
+
+
+def load_parallel_model(model_name, config, scenario=None, workers=2, shard_size=None, seed=None):
+    """
+    Same contract as `model.load_model`, but the returned callable (a `ParallelEstimator`) runs
+    sharded across one process pool kept for all its calls.
+    """
+    return ParallelEstimator(model_name, config, scenario=scenario, workers=workers, shard_size=shard_size,
+                             seed=seed)
@@ -1,24 +1,27 @@
 import numpy as np
-from config import ANCHORS, SPACE_X, SPACE_Y, SPACE_Z
+from config import resolve_scenario
+from profiling import count
 
-def estimate_positions_pf(tdoa_measurements, reference_index=0, num_particles=500, iterations=5):
+def estimate_positions_pf(tdoa_measurements, reference_index=0, num_particles=500, iterations=5, scenario=None):
     """
     Particle filtering is used for TDOA localisation and is suitable for dealing with noisy or non-linear scenes. 
     Monte Carlo sampling is used for position estimation.
     """
-    anchors = ANCHORS
+    scenario = resolve_scenario(scenario)
+    anchors = scenario.anchors
+    SPACE_X, SPACE_Y, SPACE_Z = scenario.space
     ref_anchor = anchors[reference_index]
     estimated_positions = []
     other_anchors = np.delete(anchors, reference_index, axis=0)
 
     for tdoa in tdoa_measurements:
         if np.any(np.isnan(tdoa)):
-            estimated_positions.append(np.array([np.nan, np.nan]))
+            estimated_positions.append(np.full((anchors.shape[1],), np.nan))
             continue
 
         # Initialising the particle swarm
         # particles = np.random.uniform([0, 0], [SPACE_X, SPACE_Y], size=(num_particles, 2))
-        dim = ANCHORS.shape[1]
+        dim = anchors.shape[1]
 
         if dim == 2:
             particles = np.random.uniform([0, 0], [SPACE_X, SPACE_Y], size=(num_particles, 2))
@@ -40,6 +43,7 @@ def estimate_positions_pf(tdoa_measurements, reference_index=0, num_particles=50
 
             if np.all(weights == 0) or np.isnan(weights).any():
                 weights = np.ones(num_particles) / num_particles  # equal weight
+                count("particle_filter.weight_collapse")
             else:
                 weights /= np.sum(weights)
 
@@ -50,4 +54,140 @@ def estimate_positions_pf(tdoa_measurements, reference_index=0, num_particles=50
 
         mean_est = np.mean(particles, axis=0)
         estimated_positions.append(mean_est)
-    return np.array(estimated_positions)
+    return np.array(estimated_positions, dtype=scenario.dtype)
+
+#   recursive (tracking) particle filter
+
+def init_particles(num_tags, num_particles, rng, upper_bounds):
+    """
+    Uniform particle clouds over the room [0, upper_bounds] for `num_tags` tags.
+    Returns particles (tags, particles, dim) and uniform weights (tags, particles).
+    """
+    upper_bounds = np.asarray(upper_bounds, dtype=float)
+    particles = rng.uniform(0.0, upper_bounds, size=(num_tags, num_particles, upper_bounds.shape[0]))
+    weights = np.full((num_tags, num_particles), 1.0 / num_particles)
+    return particles, weights
+
+def effective_sample_size(weights):
+    """ESS = 1 / sum(w^2) per tag, for normalised weights of shape (tags, particles)."""
+    return 1.0 / np.sum(weights ** 2, axis=-1)
+
+def systematic_resample(weights, rng):
+    """
+    Systematic resampling for every row of `weights` (tags, particles) at once:
+    one uniform offset per tag and P evenly spaced positions on the cumulative weights.
+    Returns the particle indices, shape (tags, particles).
+    """
+    T, P = weights.shape
+    positions = (rng.random((T, 1)) + np.arange(P)) / P
+    cumulative = np.cumsum(weights, axis=1)
+    cumulative[:, -1] = 1.0
+    # Offset each tag by its row index so a single searchsorted covers the whole batch
+    offsets = np.arange(T)[:, np.newaxis]
+    flat = np.searchsorted((cumulative + offsets).ravel(), (positions + offsets).ravel())
+    return np.minimum(flat.reshape(T, P) - offsets * P, P - 1)
+
+def pf_step(particles, weights, tdoa, rng, anchors, measurement_std, reference_index=0,
+            motion_std=0.5, ess_threshold=0.5):
+    """
+    One predict / update / resample cycle for a batch of tags.
+
+    Parameters:
+        particles: ndarray, shape=(tags, particles, dim)
+        weights: ndarray, shape=(tags, particles), normalised
+        tdoa: ndarray, shape=(tags, M-1), NaN entries are ignored
+        anchors: ndarray, shape=(M, dim)
+        measurement_std: TDOA noise std (m) used in the likelihood
+        motion_std: std (m) of the random-walk motion model between epochs, scalar or (tags,)
+        ess_threshold: resample a tag when ESS < ess_threshold * particles
+    Returns:
+        particles, weights, estimates (tags, dim)
+    """
+    T, P, _ = particles.shape
+
+    # Predict: random-walk motion model
+    particles = particles + rng.normal(0.0, np.reshape(motion_std, (-1, 1, 1)), size=particles.shape)
+
+    # Update: Gaussian TDOA likelihood over the anchors that were observed
+    distances = np.linalg.norm(particles[:, :, np.newaxis, :] - anchors[np.newaxis, np.newaxis, :, :], axis=3)
+    tdoa_particles = np.delete(distances - distances[:, :, [reference_index]], reference_index, axis=2)
+    diff = tdoa_particles - tdoa[:, np.newaxis, :]
+    diff = np.where(np.isnan(diff), 0.0, diff)
+    log_likelihood = -0.5 * np.sum(diff ** 2, axis=2) / measurement_std ** 2
+
+    log_weights = np.log(np.maximum(weights, 1e-300)) + log_likelihood
+    log_weights -= np.max(log_weights, axis=1, keepdims=True)
+    weights = np.exp(log_weights)
+    weights /= np.sum(weights, axis=1, keepdims=True)
+
+    estimates = np.einsum('tp,tpd->td', weights, particles)
+
+    # Adaptive resampling: only the degenerate tags are resampled
+    degenerate = np.flatnonzero(effective_sample_size(weights) < ess_threshold * P)
+    count("particle_filter_tracking.steps", T)
+    if degenerate.size > 0:
+        count("particle_filter_tracking.resamples", degenerate.size)
+        indices = systematic_resample(weights[degenerate], rng)
+        particles[degenerate] = np.take_along_axis(particles[degenerate], indices[:, :, np.newaxis], axis=1)
+        weights[degenerate] = 1.0 / P
+
+    return particles, weights, estimates
+
+def estimate_positions_pf_tracking(tdoa_measurements, reference_index=0, num_particles=500,
+                                   motion_std=0.5, ess_threshold=0.5, seed=None, dt=1.0,
+                                   state=None, return_state=False, scenario=None):
+    """
+    Sequential particle filter: rows are consecutive epochs and the particle cloud is carried
+    from one epoch to the next instead of being re-drawn over the whole room.
+
+    tdoa_measurements: (N, M-1) for a single tag, or (N, tags, M-1) to track many tags at once.
+    Returns (N, dim) or (N, tags, dim) respectively. Epochs with missing values still
+    produce a fix from the motion model and the anchors that remain.
+    dt: time (s) from the previous epoch to each epoch: a scalar, (N,), or (N, tags) per tag;
+    the random walk moves by motion_std·√dt.
+    Pass the `(particles, weights, rng)` returned with `return_state=True` back in as `state`
+    to continue tracking on the next block of epochs; for a tag stack `state` is a list with one
+    such state per tag (None for a new track), and the tags share the generator of the first
+    carried state. The particle cloud stays float64 (the weights underflow in float32); only the
+    fixes are in scenario.dtype.
+    """
+    scenario = resolve_scenario(scenario)
+    tdoa_measurements = np.asarray(tdoa_measurements, dtype=float)
+    single_tag = tdoa_measurements.ndim == 2
+    if single_tag:
+        tdoa_measurements = tdoa_measurements[:, np.newaxis, :]
+        state = [state]
+    N, T, _ = tdoa_measurements.shape
+    dt = np.asarray(dt, dtype=float)
+    step_std = motion_std * np.sqrt(np.broadcast_to(dt[:, np.newaxis] if dt.ndim == 1 else dt, (N, T)))
+
+    states = [None] * T if state is None else list(state)
+    carried = [s for s in states if s is not None]
+    rng = carried[0][2] if carried else np.random.default_rng(seed)
+    # A fresh track starts from a uniform cloud, so its first epoch is not diffused further
+    fresh = np.array([s is None for s in states], dtype=bool)
+    particles = np.empty((T, num_particles if not carried else carried[0][0].shape[1], scenario.dim))
+    weights = np.empty(particles.shape[:2])
+    if fresh.any():
+        particles[fresh], weights[fresh] = init_particles(int(fresh.sum()), particles.shape[1], rng,
+                                                          scenario.upper_bounds)
+    for t in np.flatnonzero(~fresh):
+        particles[t], weights[t] = states[t][0][0], states[t][1][0]
+    estimated_positions = np.empty((N, T, scenario.dim), dtype=scenario.dtype)
+
+    for n in range(N):
+        particles, weights, estimated_positions[n] = pf_step(
+            particles, weights, tdoa_measurements[n], rng, scenario.anchors, scenario.tdoa_noise_std,
+            reference_index=reference_index,
+            motion_std=np.where(fresh, 0.0, step_std[n]) if n == 0 else step_std[n], ess_threshold=ess_threshold,
+        )
+
+    states = [(particles[t:t + 1], weights[t:t + 1], rng) for t in range(T)]
+    if single_tag:
+        estimated_positions, states = estimated_positions[:, 0, :], states[0]
+    if return_state:
+        return estimated_positions, states
+    return estimated_positions
+
+
+estimate_positions_pf_tracking.tag_stacks = True
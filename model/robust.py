@@ -0,0 +1,164 @@
+import itertools
+import numpy as np
+from config import resolve_scenario
+from profiling import count, enabled
+from model.least_squares import compute_residual_batch
+from model.levenberg_marquardt import estimate_positions_lm, levenberg_marquardt_batch
+from model.warm_start import valid_seed
+
+#   outlier-resistant solvers that need no problem_mask
+
+ROBUST_LOSSES = {
+    # name: (weight function of the standardised residual u, default tuning constant)
+    "huber": (lambda u, c: np.minimum(1.0, c / np.maximum(np.abs(u), 1e-12)), 1.345),
+    "tukey": (lambda u, c: np.where(np.abs(u) < c, (1.0 - (u / c) ** 2) ** 2, 0.0), 4.685),
+}
+
+
+def irls_batch(x_est, tdoa, valid_mask, anchors, reference_index, upper_bounds, sigma, loss, tuning=None,
+               max_iter=10, inner_iter=5, tol=1e-4):
+    """
+    Iteratively reweighted least squares for every epoch at once, starting from `x_est`:
+    alternates between `loss` weights of the residuals standardised by `sigma` and a few
+    weighted Levenberg-Marquardt iterations. An epoch whose weights would leave fewer than
+    dim measurements keeps uniform weights. Returns (x_est, LM iterations, epochs still moving).
+    """
+    weight_fn, default_tuning = ROBUST_LOSSES[loss]
+    tuning = default_tuning if tuning is None else tuning
+    dim = anchors.shape[1]
+    x_est = np.array(x_est, dtype=tdoa.dtype)
+    active = np.flatnonzero(~np.any(np.isnan(x_est), axis=1))
+    iterations = 0
+
+    for _ in range(max_iter):
+        if active.size == 0:
+            break
+        x_act = x_est[active]
+        mask_act = valid_mask[active]
+        delta_z = compute_residual_batch(x_act, anchors, tdoa[active], reference_index, mask_act)
+        w = weight_fn(delta_z / sigma, tuning) * mask_act
+        too_few = np.count_nonzero(w > 0, axis=1) < dim
+        w[too_few] = mask_act[too_few]
+
+        x_new, _, inner, _, _ = levenberg_marquardt_batch(
+            x_act, tdoa[active], w / sigma ** 2, anchors, reference_index, upper_bounds, inner_iter
+        )
+        iterations += int(inner.sum())
+        x_est[active] = x_new
+        active = active[np.linalg.norm(x_new - x_act, axis=1) > tol]
+
+    return x_est, iterations, active.size
+
+
+def estimate_positions_irls(tdoa_measurements, reference_index=0, loss="huber", tuning=None, max_iter=10,
+                            inner_iter=5, tol=1e-4, init="mean", scenario=None):
+    """
+    M-estimator by iteratively reweighted least squares (see `irls_batch`), over all epochs at once.
+    Biased (NLOS) measurements are down-weighted by Huber or Tukey weights of the residuals
+    standardised by scenario.tdoa_noise_std, without a problem_mask. Starts from the
+    Levenberg-Marquardt fix (`init` as in `estimate_positions_least_squares`); Tukey's
+    redescending weights need a start near the answer, so "tukey" starts from the Huber fix.
+    Runs and returns in scenario.dtype, like the Levenberg-Marquardt solver.
+    """
+    if loss not in ROBUST_LOSSES:
+        raise ValueError(f"Unknown loss '{loss}', expected one of {tuple(ROBUST_LOSSES)}")
+    scenario = resolve_scenario(scenario)
+    tdoa_measurements = np.atleast_2d(np.asarray(tdoa_measurements, dtype=scenario.dtype))
+    valid_mask = ~np.isnan(tdoa_measurements)
+    tdoa = np.where(valid_mask, tdoa_measurements, 0.0)
+    anchors = scenario.anchors.astype(scenario.dtype)
+    solve = lambda x, stage_loss, stage_tuning: irls_batch(
+        x, tdoa, valid_mask, anchors, reference_index, scenario.upper_bounds,
+        scenario.tdoa_noise_std, stage_loss, stage_tuning, max_iter, inner_iter, tol
+    )
+
+    x_est = estimate_positions_lm(tdoa_measurements, reference_index, init=init, scenario=scenario)
+    iterations = 0
+    if loss == "tukey":
+        x_est, iterations, _ = solve(x_est, "huber", None)
+    x_est, stage_iterations, not_converged = solve(x_est, loss, tuning)
+
+    count("irls.epochs", tdoa_measurements.shape[0])
+    count("irls.iterations", iterations + stage_iterations)
+    count("irls.not_converged", not_converged)
+    return x_est
+
+
+def candidate_subsets(num_measurements, subset_size):
+    """Boolean (S, num_measurements) mask of every subset of `subset_size` measurements."""
+    subsets = np.array(list(itertools.combinations(range(num_measurements), subset_size)))
+    mask = np.zeros((len(subsets), num_measurements), dtype=bool)
+    mask[np.arange(len(subsets))[:, np.newaxis], subsets] = True
+    return mask
+
+
+def estimate_positions_ransac(tdoa_measurements, reference_index=0, subset_size=None, threshold=None,
+                              subset_iter=10, max_iter=20, room_margin=0.1, return_inliers=False, scenario=None):
+    """
+    Exhaustive RANSAC over measurement subsets, for every epoch at once.
+
+    Every subset of `subset_size` TDOA values (default: the minimal dim) is solved by
+    Levenberg-Marquardt in one batch of N * S problems, and all candidates are scored together by the MSAC cost
+    Σ min(r², threshold²) over the epoch's valid measurements (threshold default: 2.5σ);
+    candidates outside the room (grown by `room_margin` room sizes) are discarded.
+    The best candidate's inliers (|r| < threshold) are then refined by Levenberg-Marquardt.
+    The cost per epoch is bounded by S = C(M-1, subset_size) candidates and the iteration limits.
+
+    With `return_inliers=True` also returns the (N, M-1) inlier mask: a measured stand-in for
+    the simulator's problem_mask. Runs and returns in scenario.dtype.
+    """
+    scenario = resolve_scenario(scenario)
+    anchors = scenario.anchors.astype(scenario.dtype)
+    dim = anchors.shape[1]
+    subset_size = dim if subset_size is None else subset_size
+    threshold = 2.5 * scenario.tdoa_noise_std if threshold is None else threshold
+    tdoa_measurements = np.atleast_2d(np.asarray(tdoa_measurements, dtype=scenario.dtype))
+    N, K = tdoa_measurements.shape
+    other_anchors = np.delete(anchors, reference_index, axis=0)
+    valid_mask = ~np.isnan(tdoa_measurements)
+    tdoa = np.where(valid_mask, tdoa_measurements, 0.0)
+
+    # Candidate problems: epoch n solved on subset s, flattened to N * S rows
+    subsets = candidate_subsets(K, subset_size)
+    S = subsets.shape[0]
+    candidate_mask = (valid_mask[:, np.newaxis, :] & subsets[np.newaxis, :, :]).reshape(N * S, K)
+    usable = candidate_mask.sum(axis=1) == subset_size
+    x0 = (anchors[reference_index] + candidate_mask.astype(float) @ other_anchors) / (subset_size + 1)
+    x0[~usable] = np.nan
+    tdoa_rep = np.repeat(tdoa, S, axis=0)
+    valid_rep = np.repeat(valid_mask, S, axis=0)
+    weight = 1.0 / scenario.tdoa_noise_std ** 2
+    candidates, _, _, _, _ = levenberg_marquardt_batch(
+        x0, tdoa_rep, weight * candidate_mask, anchors, reference_index, scenario.upper_bounds, subset_iter
+    )
+
+    # Score every candidate on all valid measurements of its epoch
+    residual = compute_residual_batch(candidates, anchors, tdoa_rep, reference_index, valid_rep)
+    msac = np.sum(np.minimum(residual ** 2, threshold ** 2), axis=1)
+    # Candidates outside the room are the wrong intersection of the subset's hyperbolas
+    plausible = np.isfinite(msac) & valid_seed(candidates, scenario.upper_bounds, margin=room_margin)
+    msac = np.where(plausible, msac, np.inf).reshape(N, S)
+    best = np.argmin(msac, axis=1)
+    rows = np.arange(N) * S + best
+    solvable = np.isfinite(msac[np.arange(N), best])
+
+    # Refine on the consensus set of the best candidate, then once more on the consensus set
+    # of the refined fix (local optimisation), which picks up inliers the minimal fit missed
+    inliers = valid_mask & (np.abs(residual[rows]) < threshold)
+    inliers[~solvable] = False
+    x_est = candidates[rows]
+    for _ in range(2):
+        x_est[inliers.sum(axis=1) < dim] = np.nan
+        x_est, _, _, _, _ = levenberg_marquardt_batch(
+            x_est, tdoa, weight * inliers, anchors, reference_index, scenario.upper_bounds, max_iter
+        )
+        refined = np.abs(compute_residual_batch(x_est, anchors, tdoa, reference_index, valid_mask)) < threshold
+        inliers = np.where(np.isnan(x_est[:, :1]), inliers, valid_mask & refined)
+
+    count("ransac.epochs", N)
+    if enabled():
+        count("ransac.candidates", int(np.count_nonzero(usable)))
+        count("ransac.outliers", int(np.count_nonzero(valid_mask & ~inliers)))
+    if return_inliers:
+        return x_est, inliers
+    return x_est
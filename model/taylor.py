@@ -1,59 +1,52 @@
 import numpy as np
-from config import ANCHORS, SPACE_X, SPACE_Y, SPACE_Z
-
-def estimate_positions_taylor(tdoa_measurements, reference_index=0, max_iter=20, tol=1e-4):
-    estimated_positions = []
-    dim = ANCHORS.shape[1]
-    anchors = ANCHORS
-    ref_anchor = anchors[reference_index]
-    other_anchors = np.delete(anchors, reference_index, axis=0)
-
-    upper_bounds = np.array([SPACE_X, SPACE_Y] + ([SPACE_Z] if dim == 3 else []))
-
-    for tdoa in tdoa_measurements:
-        if np.any(np.isnan(tdoa)):
-            estimated_positions.append(np.full((dim,), np.nan))
-            continue
-
-        # Initial point: centre of target range + random perturbation
-        x = np.mean(anchors, axis=0) + np.random.normal(0, 0.5, size=dim)
-
-        for _ in range(max_iter):
-            dists = np.linalg.norm(other_anchors - x, axis=1)
-            d0 = np.linalg.norm(ref_anchor - x)
-
-            if d0 < 1e-6 or np.any(dists < 1e-6):
-                x[:] = np.nan
-                break
-
-            H = []
-            delta = []
-            for i in range(len(tdoa)):
-                ai = other_anchors[i]
-                ri = dists[i]
-                gi = (x - ai) / ri - (x - ref_anchor) / d0
-                H.append(gi)
-                delta.append(tdoa[i] - (ri - d0))
-
-            H = np.vstack(H)
-            delta = np.array(delta)
-
-            try:
-                dx = np.linalg.lstsq(H, delta, rcond=None)[0]
-            except:
-                dx = np.zeros_like(x)
-
-            # Update Location
-            x_new = x + dx
-
-            # Diffuse protection: direct abort if far from space boundary
-            if np.any(np.abs(x_new) > 10 * upper_bounds):
-                x[:] = np.nan
-                break
-
-            if np.linalg.norm(dx) < tol:
-                break
-            x = x_new
-
-        estimated_positions.append(x)
-    return np.array(estimated_positions)
+from config import resolve_scenario
+from profiling import count, enabled
+from model.kernels import solve_taylor
+from model.warm_start import seed_positions, solve_sequential
+
+def estimate_positions_taylor(tdoa_measurements, reference_index=0, max_iter=20, tol=1e-4, init="mean",
+                              backend=None, scenario=None):
+    """
+    Taylor-series TDOA solver. Epochs with a missing measurement are NaN; the iterations for
+    the rest run in `model.kernels` (`backend`: None/"auto", "numpy" or "numba").
+
+    init: start point of each epoch (see `model.warm_start.seed_positions`): the anchor "mean"
+    plus random perturbation, a "chan" or "fang" closed-form fix, or the "previous" epoch's fix
+    (see `model.warm_start.solve_sequential`). Unusable seeds fall back to the perturbed anchor mean.
+    Returns scenario.dtype; the numpy backend also iterates in it.
+    """
+    scenario = resolve_scenario(scenario)
+    anchors = scenario.anchors
+    dim = anchors.shape[1]
+    upper_bounds = scenario.upper_bounds
+    tdoa_measurements = np.atleast_2d(np.asarray(tdoa_measurements, dtype=scenario.dtype))
+    estimated_positions = np.full((tdoa_measurements.shape[0], dim), np.nan, dtype=scenario.dtype)
+    complete = ~np.any(np.isnan(tdoa_measurements), axis=1)
+    tdoa = tdoa_measurements[complete]
+
+    # Initial point: centre of target range + random perturbation
+    x0 = np.mean(anchors, axis=0) + np.random.normal(0, 0.5, size=(tdoa.shape[0], dim))
+    x0, seeded = seed_positions(tdoa, init, x0, upper_bounds, reference_index, scenario)
+
+    # Diffuse protection: direct abort if far from space boundary
+    if init == "previous":
+        estimated_positions[complete], stats, num_seeded = solve_sequential(
+            lambda rows, x_start: solve_taylor(tdoa[rows], anchors, reference_index, x_start, max_iter, tol,
+                                               upper_bounds, backend=backend),
+            x0, upper_bounds,
+            lambda rows, x_start: seed_positions(tdoa[rows], "chan", x_start, upper_bounds, reference_index,
+                                                 scenario)[0]
+        )
+        count("taylor.seeded_previous", num_seeded)
+    else:
+        estimated_positions[complete], stats = solve_taylor(
+            tdoa, anchors, reference_index, x0, max_iter, tol, upper_bounds, backend=backend
+        )
+        if enabled():
+            count("taylor.seeded_closed_form", int(seeded.sum()))
+
+    count("taylor.epochs", tdoa_measurements.shape[0])
+    count("taylor.iterations", int(stats[0]))
+    count("taylor.diverged", int(stats[1]))
+    count("taylor.not_converged", int(stats[2]))
+    return estimated_positions
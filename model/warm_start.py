@@ -0,0 +1,88 @@
+from functools import partial
+import numpy as np
+from model.chan import estimate_positions_chan
+from model.fang import estimate_positions_fang
+from model.fingerprint import estimate_positions_fingerprint
+
+#   start points for the iterative solvers (least_squares, taylor)
+
+INIT_MODES = ("mean", "chan", "fang", "fingerprint", "previous")
+
+SEED_SOLVERS = {
+    "chan": estimate_positions_chan,
+    "fang": estimate_positions_fang,
+    # The unrefined grid point: refining it costs more than the iterations it saves
+    "fingerprint": partial(estimate_positions_fingerprint, refine_levels=None),
+}
+
+
+def valid_seed(x, upper_bounds, margin=0.0):
+    """Rows of `x` that are finite and lie inside the room (grown by `margin` room sizes on every side)."""
+    x = np.atleast_2d(x)
+    upper_bounds = np.asarray(upper_bounds, dtype=float)
+    inside = (x >= -margin * upper_bounds) & (x <= (1 + margin) * upper_bounds)
+    return np.all(np.isfinite(x) & inside, axis=1)
+
+
+def seed_positions(tdoa_measurements, init, x0, upper_bounds, reference_index=0, scenario=None):
+    """
+    Start points for a batch of epochs.
+
+    init:
+        "mean"     - keep the solver's default start points `x0`
+        "chan"     - the Chan closed-form fix of the same epoch
+        "fang"     - the Fang closed-form fix of the same epoch
+        "fingerprint" - the nearest grid fingerprint of the same epoch (model.fingerprint)
+        "previous" - left to `solve_sequential`, which starts every epoch from the previous
+                     fix and gives Chan seeds only to the epochs that have none
+    Seeds that are not `valid_seed` fall back to `x0`, and rows of `x0` that are NaN (epochs
+    the solver cannot fix) are left alone.
+    Returns (x0, seeded) where `seeded` marks the rows that took a seed.
+    """
+    if init not in INIT_MODES:
+        raise ValueError(f"Unknown init '{init}', expected one of {INIT_MODES}")
+    x0 = np.array(x0, dtype=float)
+    if init in ("mean", "previous"):
+        return x0, np.zeros(x0.shape[0], dtype=bool)
+
+    seed = SEED_SOLVERS.get(init, estimate_positions_chan)(
+        tdoa_measurements, reference_index, scenario=scenario
+    )
+    seeded = valid_seed(seed, upper_bounds) & ~np.any(np.isnan(x0), axis=1)
+    x0[seeded] = seed[seeded]
+    return x0, seeded
+
+
+def solve_sequential(solve, x0, upper_bounds, reseed=None, block=32):
+    """
+    Previous-fix warm start: every epoch starts from the fix of the epoch before it.
+    The batch is cut into blocks of `block` consecutive epochs that are walked in lockstep, so
+    step j solves the j-th epoch of every block in one batched `solve` call (`block` calls in all,
+    whatever the batch size). The first epoch of a block, and an epoch after a failed fix, start
+    from `reseed(rows, x0[rows])` (e.g. Chan seeds, computed for those rows only) or their row of
+    `x0`. Rows of `x0` that are NaN stay NaN.
+
+    solve(rows, x0_rows) -> (positions, stats) solves the epochs with indices `rows`.
+    Returns (positions, stats summed over the calls, number of epochs seeded from a previous fix).
+    """
+    N = x0.shape[0]
+    positions = np.full_like(x0, np.nan)
+    stats = np.zeros(3, dtype=np.int64)
+    num_seeded = 0
+    solvable = ~np.any(np.isnan(x0), axis=1)
+    for j in range(min(block, N)):
+        rows = np.arange(j, N, block)
+        rows = rows[solvable[rows]]
+        if rows.size == 0:
+            continue
+        start = x0[rows].copy()
+        previous = np.zeros(rows.size, dtype=bool)
+        if j > 0:
+            previous = valid_seed(positions[rows - 1], upper_bounds)
+            start[previous] = positions[rows - 1][previous]
+            num_seeded += int(previous.sum())
+        if reseed is not None and not previous.all():
+            start[~previous] = reseed(rows[~previous], start[~previous])
+        positions[rows], row_stats = solve(rows, start)
+        stats += row_stats
+    return positions, stats, num_seeded
@@ -0,0 +1,110 @@
+"""
+Optional timing and counter instrumentation.
+
+Profiling is off unless `enable_profiling()` is called (main.py does this for --profile).
+While it is off, `stage()` returns a shared no-op context manager and `count()` returns
+immediately, so instrumented code pays one global lookup per call; counters whose value
+needs a pass over the data are computed only `if enabled()`.
+
+The report written by `Profiler.write` is a Chrome trace-event JSON file (open it in
+chrome://tracing, Perfetto or speedscope for a flame graph) with two extra keys:
+"stages" (total seconds and calls per stage path) and "counters".
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager, nullcontext
+
+_profiler = None
+_NULL_CONTEXT = nullcontext()
+
+
+class Profiler:
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events = []
+        self.counters = {}
+        self.stack = []
+
+    @contextmanager
+    def stage(self, name):
+        self.stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.events.append((";".join(self.stack), name, start - self.origin, end - start))
+            self.stack.pop()
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def stage_totals(self):
+        totals = {}
+        for path, _, _, duration in self.events:
+            entry = totals.setdefault(path, {"seconds": 0.0, "calls": 0})
+            entry["seconds"] += duration
+            entry["calls"] += 1
+        return totals
+
+    def report(self):
+        pid = os.getpid()
+        trace = [{"name": name, "cat": "stage", "ph": "X", "ts": start * 1e6, "dur": duration * 1e6,
+                  "pid": pid, "tid": 0}
+                 for _, name, start, duration in self.events]
+        return {
+            "traceEvents": trace,
+            "displayTimeUnit": "ms",
+            "stages": self.stage_totals(),
+            "counters": self.counters,
+        }
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        return path
+
+    def summary(self):
+        lines = [f"{'stage':<48}{'calls':>7}{'seconds':>11}"]
+        for path, entry in self.stage_totals().items():
+            lines.append(f"{path:<48}{entry['calls']:>7}{entry['seconds']:>11.4f}")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:<48}{value:>18}")
+        return "\n".join(lines)
+
+
+def enable_profiling():
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+
+def disable_profiling():
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler
+
+
+def get_profiler():
+    return _profiler
+
+
+def stage(name):
+    """Time the enclosed block as `name`, nested under the enclosing stages."""
+    if _profiler is None:
+        return _NULL_CONTEXT
+    return _profiler.stage(name)
+
+
+def enabled():
+    """True while profiling is on; guard counters whose value costs a pass over the data."""
+    return _profiler is not None
+
+
+def count(name, value=1):
+    """Add `value` to counter `name`."""
+    if _profiler is None:
+        return
+    _profiler.count(name, value)
@@ -0,0 +1,184 @@
+"""
+Replay client for `server.py`: streams a stored dataset or a simulated scenario as TDOA reports
+at a fixed rate and measures end-to-end latency, throughput and accuracy.
+
+    python server.py --model least_squares &
+    python replay.py --tags 8 --epochs 500 --rate 500 1000 2000 4000
+    python replay.py --dataset runs/lab_nlos --rate 0
+
+Every `--rate` (reports/sec, 0 = as fast as possible) is one run against the same data. A rate
+is sustained when the server answers every report at that rate with p99 latency within
+`--latency_budget_ms`; the highest such rate is reported as the maximum sustainable rate.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+import numpy as np
+
+from config import Scenario, load_yaml_config
+from dataset import open_dataset
+from datagenerator import generate_simulated_data
+from sites import load_site_registry
+
+
+def simulated_reports(num_tags, epochs, scenario, enable_nlos=False, enable_multipath=False,
+                      enable_blockage=False, trajectory_type='line', epoch_interval=0.1):
+    """
+    One `generate_simulated_data` trajectory of `epochs` points per tag, interleaved by time.
+    Returns (report dicts, true positions (num_reports, dim)) in send order.
+    """
+    scenario = Scenario(scenario.anchors, scenario.space, epochs, scenario.tdoa_noise_std, scenario.nlos_params,
+                        scenario.multipath_params, scenario.blockage_prob)
+    runs = [generate_simulated_data(enable_nlos, enable_multipath, enable_blockage, trajectory_type, scenario)
+            for _ in range(num_tags)]
+    reports, truth = [], []
+    for k in range(epochs):
+        for tag, (targets, tdoa, problem_mask) in enumerate(runs):
+            reports.append(report(f"tag{tag}", k * epoch_interval, tdoa[k], problem_mask[k]))
+            truth.append(targets[k])
+    return reports, np.array(truth)
+
+
+def dataset_reports(path, num_tags=1, epoch_interval=0.1):
+    """The epochs of a stored dataset, dealt round-robin to `num_tags` tags. Returns (reports, truth, scenario)."""
+    dataset = open_dataset(path)
+    true_positions, tdoa, problem_mask = dataset.epochs()
+    reports = [report(f"tag{n % num_tags}", (n // num_tags) * epoch_interval, tdoa[n], problem_mask[n])
+               for n in range(tdoa.shape[0])]
+    return reports, np.asarray(true_positions), dataset.scenario
+
+
+def report(tag, t, tdoa, problem_mask):
+    return {"tag": tag, "t": float(t), "tdoa": [None if np.isnan(v) else float(v) for v in tdoa],
+            "mask": [int(m) for m in problem_mask]}
+
+
+async def replay(reports, truth, host="127.0.0.1", port=9000, rate=0.0, transport="tcp", timeout=10.0):
+    """
+    Send `reports` at `rate` reports/sec (0 = flood) and collect the replies.
+    Returns a dict of latency percentiles (ms), offered and achieved rates (reports/sec),
+    the number of replies lost and the RMSE of the returned fixes against `truth`.
+    """
+    loop = asyncio.get_running_loop()
+    index = {(r["tag"], r["t"]): n for n, r in enumerate(reports)}
+    latency = np.full(len(reports), np.nan)
+    positions = np.full(truth.shape, np.nan)
+    done = loop.create_future()
+    received = 0
+
+    def on_reply(line):
+        nonlocal received
+        now = time.perf_counter()
+        result = json.loads(line)
+        n = index.get((result.get("tag"), result.get("t")))
+        if n is None:
+            return
+        latency[n] = now - result["sent"]
+        if result.get("position") is not None:
+            positions[n] = result["position"]
+        received += 1
+        if received == len(reports) and not done.done():
+            done.set_result(None)
+
+    if transport == "udp":
+        class Client(asyncio.DatagramProtocol):
+            def datagram_received(self, data, addr):
+                for line in data.decode().splitlines():
+                    on_reply(line)
+        sock, _ = await loop.create_datagram_endpoint(Client, remote_addr=(host, port))
+        send = lambda payload: sock.sendto(payload)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+
+        async def read_replies():
+            while not done.done():
+                line = await reader.readline()
+                if not line:
+                    break
+                on_reply(line)
+        reader_task = asyncio.ensure_future(read_replies())
+        send = writer.write
+
+    start = time.perf_counter()
+    for n, r in enumerate(reports):
+        if rate > 0:
+            delay = start + n / rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        send((json.dumps(dict(r, sent=time.perf_counter())) + "\n").encode())
+        if transport == "tcp" and n % 64 == 63:
+            await writer.drain()
+    send_time = time.perf_counter() - start
+
+    try:
+        await asyncio.wait_for(done, timeout)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - start
+    if transport == "udp":
+        sock.close()
+    else:
+        reader_task.cancel()
+        writer.close()
+
+    answered = ~np.isnan(latency)
+    fixed = ~np.any(np.isnan(positions), axis=1)
+    p50, p95, p99 = (np.percentile(latency[answered], [50, 95, 99]) * 1e3 if answered.any() else [np.nan] * 3)
+    return {
+        "offered": len(reports) / send_time,
+        "achieved": received / elapsed,
+        "lost": len(reports) - received,
+        "p50": p50, "p95": p95, "p99": p99,
+        "rmse": np.sqrt(np.mean(np.sum((positions[fixed] - truth[fixed]) ** 2, axis=1))) if fixed.any() else np.nan,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay TDOA reports against server.py")
+    parser.add_argument('--cfg', default=os.path.join(os.path.dirname(__file__), 'configs', 'model.yaml'))
+    parser.add_argument('--sites', default=os.path.join(os.path.dirname(__file__), 'configs', 'sites.yaml'))
+    parser.add_argument('--site', default='lab', help='Site to simulate (ignored with --dataset)')
+    parser.add_argument('--dataset', default=None, help='Replay a directory written by --save_dataset instead')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--transport', choices=['tcp', 'udp'], default='tcp')
+    parser.add_argument('--tags', type=int, default=8)
+    parser.add_argument('--epochs', type=int, default=500, help='Simulated epochs per tag')
+    parser.add_argument('--trajectory', default='line')
+    parser.add_argument('--nlos', action='store_true')
+    parser.add_argument('--multipath', action='store_true')
+    parser.add_argument('--blockage', action='store_true')
+    parser.add_argument('--rate', type=float, nargs='+', default=[0.0], help='Reports/sec per run, 0 = flood')
+    parser.add_argument('--latency_budget_ms', type=float, default=50.0)
+    parser.add_argument('--timeout', type=float, default=10.0, help='Seconds to wait for outstanding replies')
+    args = parser.parse_args()
+
+    if args.dataset:
+        reports, truth, _ = dataset_reports(args.dataset, args.tags)
+    else:
+        config = load_yaml_config(args.cfg)
+        scenario = load_site_registry(args.sites, config['defaults']).scenario(args.site)
+        reports, truth = simulated_reports(args.tags, args.epochs, scenario, args.nlos, args.multipath,
+                                           args.blockage, args.trajectory)
+    print(f"==> Replaying {len(reports)} reports to {args.transport}://{args.host}:{args.port}")
+    print(f"{'rate':>8} {'offered':>9} {'achieved':>9} {'lost':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rmse':>7}")
+
+    sustained = None
+    for rate in args.rate:
+        stats = asyncio.run(replay(reports, truth, args.host, args.port, rate, args.transport, args.timeout))
+        print(f"{rate:>8.0f} {stats['offered']:>9.0f} {stats['achieved']:>9.0f} {stats['lost']:>6d} "
+              f"{stats['p50']:>8.2f} {stats['p95']:>8.2f} {stats['p99']:>8.2f} {stats['rmse']:>7.3f}")
+        if stats['lost'] == 0 and stats['p99'] <= args.latency_budget_ms:
+            sustained = max(sustained or 0.0, stats['achieved'])
+    if sustained is not None:
+        print(f"==> Maximum sustainable rate: {sustained:.0f} reports/sec "
+              f"(p99 <= {args.latency_budget_ms:.0f} ms, no loss)")
+    else:
+        print(f"==> No rate sustained within p99 <= {args.latency_budget_ms:.0f} ms without loss")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Asyncio ingestion service: TDOA reports in, positions out, over TCP or UDP.
+
+    python server.py --model least_squares --site lab --transport tcp --port 9000
+
+Every report is one JSON object, newline-delimited on TCP and one or more lines per datagram on UDP:
+    {"tag": "t1", "t": 12.5, "tdoa": [1.2, null, -0.4], "mask": [0, 3, 0], "sent": 1234.5}
+`mask` (the interference class per TDOA, as in `preprocess_tdoa`) is optional, and `sent`
+is echoed back untouched so clients can measure latency. Each reply is
+    {"tag": "t1", "t": 12.5, "position": [x, y] | null, "accuracy": 0.9, "sent": 1234.5, "batch": 37}
+where `accuracy` is the expected RMSE (CRLB, metres) at the fix from the site's `gdop.coverage_map`;
+fixes worse than `--max_accuracy` are returned as null.
+
+Reports are micro-batched: a batch is closed when it reaches `--max_batch` reports or
+`--max_delay_ms` after its first report, then preprocessed and solved by a
+`tracking.MultiTagTracker` in a worker thread while the next batch is collected.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+from config import load_yaml_config
+from gdop import coverage_map
+from dataprocess import preprocess_tdoa
+from model import load_model
+from model.memo import MemoizedEstimator
+from profiling import count, enabled, stage
+from sites import load_site_registry
+from tracking import MultiTagTracker
+
+
+def solve_reports(reports, tracker, process=True, strategy="adaptive", coverage=None, max_accuracy=np.inf):
+    """
+    Preprocess and solve one micro-batch of report dicts; returns one reply dict per report.
+    With a `gdop.CoverageMap`, every fix carries its expected accuracy and fixes whose
+    expected accuracy exceeds `max_accuracy` are dropped.
+    """
+    tdoa = np.array([report["tdoa"] for report in reports], dtype=float)
+    if process:
+        problem_mask = np.array([report.get("mask") or [0] * tdoa.shape[1] for report in reports], dtype=np.int8)
+        with stage("preprocess"):
+            tdoa = preprocess_tdoa(tdoa, problem_mask, strategy=strategy)
+    with stage("estimate"):
+        positions, _ = tracker.solve([report["tag"] for report in reports],
+                                     [report["t"] for report in reports], tdoa)
+    valid = ~np.any(np.isnan(positions), axis=1)
+    accuracy = np.full(len(reports), np.nan)
+    if coverage is not None:
+        accuracy = coverage.expected_accuracy(positions)
+        gated = valid & ~(accuracy <= max_accuracy)
+        if enabled():
+            count("server.gated", int(np.count_nonzero(gated)))
+        valid &= ~gated
+    return [
+        {"tag": report["tag"], "t": report["t"], "position": position.tolist() if ok else None,
+         "accuracy": float(acc) if ok and np.isfinite(acc) else None,
+         "sent": report.get("sent"), "batch": len(reports)}
+        for report, position, ok, acc in zip(reports, positions, valid, accuracy)
+    ]
+
+
+class MicroBatcher:
+    """
+    Collects `(report, reply)` pairs and hands them to `solve` in batches of at most
+    `max_batch`, waiting at most `max_delay` seconds after the first report of a batch.
+    `solve` runs in `executor`; `reply(result)` is called for every report with its result.
+    A failing `solve` answers the batch with errors, and a failing `reply` (e.g. a closed
+    socket) is counted in `reply_errors`; neither stops the batcher.
+    """
+
+    def __init__(self, solve, max_batch=256, max_delay=0.005, executor=None):
+        self.solve = solve
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.executor = executor or ThreadPoolExecutor(max_workers=1)
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.reports = 0
+        self.reply_errors = 0
+
+    def submit(self, report, reply):
+        self.queue.put_nowait((report, reply))
+
+    async def next_batch(self):
+        batch = [await self.queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_delay
+        while len(batch) < self.max_batch:
+            while not self.queue.empty() and len(batch) < self.max_batch:
+                batch.append(self.queue.get_nowait())
+            timeout = deadline - asyncio.get_running_loop().time()
+            if len(batch) >= self.max_batch or timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self.next_batch()
+            try:
+                results = await loop.run_in_executor(self.executor, self.solve, [report for report, _ in batch])
+            except Exception as e:
+                results = [{"error": str(e), "sent": report.get("sent")} for report, _ in batch]
+            self.batches += 1
+            self.reports += len(batch)
+            count("server.batches")
+            count("server.reports", len(batch))
+            for (_, reply), result in zip(batch, results):
+                try:
+                    reply(result)
+                except Exception:
+                    self.reply_errors += 1
+                    count("server.reply_errors")
+
+
+def parse_reports(data):
+    """Report dicts from newline-delimited JSON text; malformed lines are counted and dropped."""
+    reports = []
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            reports.append(json.loads(line))
+        except ValueError:
+            count("server.malformed")
+    return reports
+
+
+class ReportDatagramProtocol(asyncio.DatagramProtocol):
+    def __init__(self, batcher):
+        self.batcher = batcher
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        for report in parse_reports(data.decode()):
+            self.batcher.submit(report, lambda result, addr=addr: self.transport.sendto(
+                (json.dumps(result) + "\n").encode(), addr))
+
+
+async def start_server(batcher, host="127.0.0.1", port=9000, transport="tcp"):
+    """Start listening; returns (server, batcher task, bound port). Close the server and cancel the task to stop."""
+    loop = asyncio.get_running_loop()
+    task = asyncio.ensure_future(batcher.run())
+
+    if transport == "udp":
+        server, _ = await loop.create_datagram_endpoint(lambda: ReportDatagramProtocol(batcher),
+                                                        local_addr=(host, port))
+        return server, task, server.get_extra_info("sockname")[1]
+
+    async def handle(reader, writer):
+        def reply(result):
+            if not writer.is_closing():  # the client may leave before its last batch is solved
+                writer.write((json.dumps(result) + "\n").encode())
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            for report in parse_reports(line.decode()):
+                batcher.submit(report, reply)
+        writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    return server, task, server.sockets[0].getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TDOA positioning service")
+    parser.add_argument('--cfg', default=os.path.join(os.path.dirname(__file__), 'configs', 'model.yaml'))
+    parser.add_argument('--sites', default=os.path.join(os.path.dirname(__file__), 'configs', 'sites.yaml'))
+    parser.add_argument('--site', default='lab', help='Site whose anchor layout the reports refer to')
+    parser.add_argument('--model', default='least_squares')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--transport', choices=['tcp', 'udp'], default='tcp')
+    parser.add_argument('--max_batch', type=int, default=256, help='Close a batch at this many reports')
+    parser.add_argument('--max_delay_ms', type=float, default=5.0, help='Close a batch this long after its first report')
+    parser.add_argument('--process', type=lambda x: x.lower() == 'true', default=True)
+    parser.add_argument('--idle_timeout', type=float, default=30.0, help='Forget tags silent for this long')
+    parser.add_argument('--memo_resolution', type=float, default=0.0,
+                        help='Memoise fixes of TDOA rows quantised to this resolution (0 = off)')
+    parser.add_argument('--max_accuracy', type=float, default=np.inf,
+                        help='Drop fixes whose expected accuracy (CRLB, metres) is worse than this')
+    args = parser.parse_args()
+
+    config = load_yaml_config(args.cfg)
+    scenario = load_site_registry(args.sites, config['defaults']).scenario(args.site)
+    estimate_positions = load_model(args.model, config)
+    if args.memo_resolution > 0:
+        estimate_positions = MemoizedEstimator(estimate_positions, args.memo_resolution)
+    tracker = MultiTagTracker(estimate_positions, scenario=scenario, idle_timeout=args.idle_timeout)
+    coverage = coverage_map(scenario)
+    batcher = MicroBatcher(lambda reports: solve_reports(reports, tracker, args.process, coverage=coverage,
+                                                         max_accuracy=args.max_accuracy),
+                           max_batch=args.max_batch, max_delay=args.max_delay_ms / 1e3)
+
+    async def serve():
+        server, task, port = await start_server(batcher, args.host, args.port, args.transport)
+        print(f"==> Serving {args.model} for site '{args.site}' on {args.transport}://{args.host}:{port}", flush=True)
+        start = time.perf_counter()
+        try:
+            await task
+        finally:
+            server.close()
+            elapsed = time.perf_counter() - start
+            print(f"==> {batcher.reports} reports in {batcher.batches} batches ({batcher.reports / elapsed:.0f}/s)")
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
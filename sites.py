@@ -0,0 +1,81 @@
+"""
+Registry of anchor layouts for multi-room deployments.
+
+Sites are described in a YAML file (see configs/sites.yaml); each one holds its own anchor
+list of any length, and may override the simulation defaults of model.yaml. A site's
+`config.Scenario`, together with the solver artifacts the models cache on it, is built on
+first use and kept in an LRU cache, so switching between rooms does not rebuild geometry.
+"""
+
+from collections import OrderedDict
+import numpy as np
+from config import load_yaml_config, scenario_from_defaults
+
+SCENARIO_KEYS = (
+    'space_x', 'space_y', 'space_z', 'num_targets', 'tdoa_noise_std', 'nlos_bias_mean', 'nlos_bias_std',
+    'multipath_delay_mean', 'multipath_delay_std', 'blockage_drop_prob', 'precision',
+)
+
+
+class SiteRegistry:
+    """
+    Site ID -> anchor layout, with at most `maxsize` built scenarios alive at a time.
+
+    Parameters:
+        sites: dict, site ID -> {'anchors': [[x, y(, z)], ...], optional overrides of `defaults`}
+        defaults: dict, the `defaults` block of model.yaml
+        maxsize: number of sites whose scenario and solver caches are kept
+    """
+
+    def __init__(self, sites, defaults, maxsize=32):
+        self.sites = {}
+        for site_id, spec in sites.items():
+            anchors = np.asarray(spec['anchors'], dtype=float)
+            if anchors.ndim != 2 or anchors.shape[1] not in (2, 3) or anchors.shape[0] < anchors.shape[1] + 1:
+                raise ValueError(f"Site '{site_id}' needs at least dim + 1 anchors of dimension 2 or 3")
+            unknown = set(spec) - set(SCENARIO_KEYS) - {'anchors'}
+            if unknown:
+                raise ValueError(f"Site '{site_id}' has unknown keys: {sorted(unknown)}")
+            self.sites[site_id] = spec
+        self.defaults = defaults
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._scenarios = OrderedDict()
+
+    def __contains__(self, site_id):
+        return site_id in self.sites
+
+    def __len__(self):
+        return len(self.sites)
+
+    def scenario(self, site_id):
+        """The (cached) scenario of a site; evicts the least recently used site when full."""
+        if site_id in self._scenarios:
+            self.hits += 1
+            self._scenarios.move_to_end(site_id)
+            return self._scenarios[site_id]
+        if site_id not in self.sites:
+            raise KeyError(f"Unknown site '{site_id}'")
+
+        self.misses += 1
+        spec = self.sites[site_id]
+        defaults = dict(self.defaults)
+        defaults.update({k: v for k, v in spec.items() if k != 'anchors'})
+        scenario = scenario_from_defaults(defaults, spec['anchors'])
+        self._scenarios[site_id] = scenario
+        if len(self._scenarios) > self.maxsize:
+            self._scenarios.popitem(last=False)
+        return scenario
+
+    def estimate(self, site_id, estimate_positions, tdoa_measurements, **kwargs):
+        """Run an estimator from `model.load_model` against the geometry of `site_id`."""
+        return estimate_positions(tdoa_measurements, scenario=self.scenario(site_id), **kwargs)
+
+
+def load_site_registry(sites_file, defaults, maxsize=32):
+    """Build a `SiteRegistry` from a YAML file with a top-level `sites` mapping."""
+    sites_config = load_yaml_config(sites_file)
+    if 'sites' not in sites_config:
+        raise ValueError(f"YAML file '{sites_file}' has no 'sites' section")
+    return SiteRegistry(sites_config['sites'], defaults, maxsize=maxsize)
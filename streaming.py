@@ -0,0 +1,102 @@
+"""
+Chunked streaming pipeline: source -> preprocess -> estimate -> streaming evaluation.
+Every stage is a generator over fixed-size chunks and reuses the batch functions on each
+chunk, so an unbounded stream runs in memory bounded by the chunk size.
+
+A chunk is a dict with the keys 'true_positions', 'tdoa', 'problem_mask' and, after the
+estimate stage, 'estimated_positions'.
+"""
+
+import inspect
+import numpy as np
+from config import resolve_scenario
+from datagenerator import TrajectoryStream, compute_distances, simulate_tdoa_measurements
+from dataprocess import preprocess_tdoa
+from evaluation import StreamingEvaluator
+from profiling import stage
+
+def simulated_source(chunk_size, num_epochs=None, enable_nlos=False, enable_multipath=False,
+                     enable_blockage=False, trajectory_type='line', scenario=None):
+    """
+    Yield simulated chunks of `chunk_size` epochs, simulated like `generate_simulated_data`, along
+    one continuous trajectory (`datagenerator.TrajectoryStream`), so trackers carrying state see
+    no jump between chunks. With `num_epochs` the trajectory spans the same 10 s as the batch
+    one and the last chunk is cut to the epochs left; with None it runs forever.
+    """
+    scenario = resolve_scenario(scenario)
+    dt = None if num_epochs is None else 10.0 / max(num_epochs - 1, 1)
+    trajectory = TrajectoryStream(trajectory_type, dt, dimension=scenario.dim, scenario=scenario)
+    produced = 0
+    while num_epochs is None or produced < num_epochs:
+        size = chunk_size if num_epochs is None else min(chunk_size, num_epochs - produced)
+        with stage("generate"):
+            true_positions = trajectory.next(size)
+            distances = compute_distances(true_positions, scenario.anchors)
+            tdoa, problem_mask = simulate_tdoa_measurements(
+                distances, enable_nlos, enable_multipath, enable_blockage, scenario=scenario
+            )
+        yield {"true_positions": true_positions.astype(scenario.dtype, copy=False), "tdoa": tdoa, "problem_mask": problem_mask}
+        produced += size
+
+def array_source(true_positions, tdoa_measurements, problem_mask, chunk_size):
+    """Yield fixed-size chunks (views, no copy) of already available arrays."""
+    for start in range(0, tdoa_measurements.shape[0], chunk_size):
+        stop = start + chunk_size
+        yield {
+            "true_positions": true_positions[start:stop],
+            "tdoa": tdoa_measurements[start:stop],
+            "problem_mask": problem_mask[start:stop],
+        }
+
+def preprocess_stage(chunks, strategy="adaptive"):
+    """Apply `preprocess_tdoa` to every chunk."""
+    for chunk in chunks:
+        with stage("preprocess"):
+            chunk["tdoa"] = preprocess_tdoa(chunk["tdoa"], chunk["problem_mask"], strategy=strategy)
+        yield chunk
+
+def accepts_state(estimate_positions):
+    """True for estimators (the trackers) that take `state`/`return_state` to continue a track."""
+    params = inspect.signature(estimate_positions).parameters
+    return "state" in params and "return_state" in params
+
+def estimate_stage(chunks, estimate_positions, **kwargs):
+    """
+    Run an estimator returned by `model.load_model` on every chunk. Estimators that take
+    `state`/`return_state` (the trackers) have their state carried from chunk to chunk.
+    """
+    stateful = accepts_state(estimate_positions)
+    state = None
+    for chunk in chunks:
+        with stage("estimate"):
+            if stateful:
+                chunk["estimated_positions"], state = estimate_positions(
+                    chunk["tdoa"], state=state, return_state=True, **kwargs
+                )
+            else:
+                chunk["estimated_positions"] = estimate_positions(chunk["tdoa"], **kwargs)
+        yield chunk
+
+def metrics_stage(chunks, evaluator=None, name="estimate"):
+    """
+    Feed every chunk to a `StreamingEvaluator` (per interference class, from the chunk's
+    problem_mask) under the model name `name`; yields each chunk together with the evaluator.
+    """
+    evaluator = StreamingEvaluator() if evaluator is None else evaluator
+    for chunk in chunks:
+        with stage("evaluate"):
+            evaluator.update({name: chunk["estimated_positions"]}, chunk["true_positions"], chunk["problem_mask"])
+        yield chunk, evaluator
+
+def run_stream(source, estimate_positions, process=True, strategy="adaptive", name="estimate", **kwargs):
+    """
+    Drain a source through the whole pipeline and return the final `StreamingEvaluator` report
+    ({name: {class: stats}}, as `evaluation.evaluate_report`) and the number of epochs processed.
+    Only one chunk is alive at a time; `kwargs` (e.g. `scenario`) go to the estimator.
+    """
+    chunks = preprocess_stage(source, strategy) if process else source
+    evaluator = StreamingEvaluator()
+    for _ in metrics_stage(estimate_stage(chunks, estimate_positions, **kwargs), evaluator, name):
+        pass
+    report = evaluator.result()
+    return report, (report[name]["all"]["count"] if report else 0)
@@ -0,0 +1,77 @@
+import numpy as np
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Scenario
+from model.least_squares import compute_jacobian_batch, compute_residual_batch
+from model.least_squares_with_clock import (estimate_positions_clock_window,
+                                            estimate_positions_least_squares_with_clock, window_gn_batch)
+
+ANCHORS = np.array([[0, 0], [0, 20], [20, 0], [20, 20]], dtype=float)
+
+
+def biased_track(num_epochs, dt, rng, noise=0.05):
+    """A smooth 2D track and its TDOA with a reference clock bias of 0.5 m drifting by 2 mm/s."""
+    t = np.arange(num_epochs) * dt
+    track = np.stack([2.0 + 0.1 * t, 10.0 + 5.0 * np.sin(t / 10.0)], axis=1)
+    dists = np.linalg.norm(track[:, np.newaxis, :] - ANCHORS[np.newaxis, :, :], axis=2)
+    tdoa = dists[:, 1:] - dists[:, [0]] + 0.5 + 0.002 * t[:, np.newaxis] + rng.normal(0, noise, (num_epochs, 3))
+    return track, tdoa
+
+
+# === Test 1: the Schur-complement step matches Gauss-Newton on the dense stacked Jacobian ===
+def test_matches_dense_joint_solve():
+    rng = np.random.default_rng(0)
+    track, tdoa = biased_track(8, 0.5, rng)
+    times = np.arange(8) * 0.5
+    x0 = track + rng.normal(0, 0.3, track.shape)
+    valid_mask = np.ones_like(tdoa, dtype=bool)
+
+    x_window, bias, stats = window_gn_batch(x0, tdoa, valid_mask, ANCHORS, 0, np.array([20.0, 20.0]),
+                                          times, 8, True, 1.0, tol=1e-10)
+
+    # Dense reference: one (8·3) x (8·2 + 2) Jacobian over all positions, b0 and the drift
+    x, clock = x0.copy(), np.zeros(2)
+    tau = times - times[4]
+    for _ in range(20):
+        H = compute_jacobian_batch(x, ANCHORS, 0)
+        J = np.zeros((24, 18))
+        for n in range(8):
+            J[3 * n:3 * n + 3, 2 * n:2 * n + 2] = H[n]
+            J[3 * n:3 * n + 3, 16:] = [1.0, tau[n]]
+        delta_z = compute_residual_batch(x, ANCHORS, tdoa, 0) - (clock[0] + clock[1] * tau)[:, np.newaxis]
+        step = np.linalg.solve(J.T @ J, J.T @ delta_z.ravel())
+        x += step[:16].reshape(8, 2)
+        clock += step[16:]
+
+    assert stats[2] == 0
+    np.testing.assert_allclose(x_window, x, atol=1e-8)
+    np.testing.assert_allclose(bias, clock[0] + clock[1] * tau, atol=1e-8)
+
+
+# === Test 2: four anchors in 2D: the window fixes what per-epoch bias cannot; chunks carry the window ===
+def test_window_accuracy_and_state():
+    rng = np.random.default_rng(1)
+    track, tdoa = biased_track(300, 0.5, rng)
+    tdoa[rng.random(tdoa.shape) < 0.05] = np.nan
+    scenario = Scenario(ANCHORS, tdoa_noise_std=0.05)
+
+    windowed = estimate_positions_clock_window(tdoa, window=10, dt=0.5, scenario=scenario)
+    single = estimate_positions_least_squares_with_clock(tdoa, scenario=scenario)
+    error = lambda fixes: np.nanpercentile(np.linalg.norm(fixes - track, axis=1), 95)
+    assert error(windowed) < 0.3
+    assert error(windowed) < error(single) / 4
+
+    state, chunks = None, []
+    for start in range(0, 300, 60):
+        fixes, state = estimate_positions_clock_window(tdoa[start:start + 60], window=10, dt=0.5, state=state,
+                                                       return_state=True, scenario=scenario)
+        chunks.append(fixes)
+    chunked = np.concatenate(chunks)
+    assert state[0].shape == (9, 3)
+    # Epochs more than window // 2 before a chunk end saw the same windows as the whole batch
+    settled = np.ones(300, dtype=bool)
+    for end in range(60, 300, 60):
+        settled[end - 5:end] = False
+    np.testing.assert_allclose(chunked[settled], windowed[settled], atol=1e-3)
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Scenario
+from model.closed_form import anchor_difference_matrix, solve_linear_batch
+
+
+ANCHORS_3D = np.array([
+    [0, 0, 1],
+    [0, 20, 4],
+    [20, 0, 3],
+    [20, 20, 2],
+    [10, 10, 5],
+], dtype=float)
+
+
+# === Test 1: batched solve matches per-row lstsq, including NaN subsets ===
+def test_solve_linear_batch_matches_rowwise_lstsq():
+    rng = np.random.default_rng(0)
+    A = anchor_difference_matrix(ANCHORS_3D)
+    b = rng.normal(size=(100, A.shape[0]))
+    b[rng.random(b.shape) < 0.15] = np.nan
+
+    x = solve_linear_batch(A, b)
+
+    assert x.shape == (100, 3)
+    for row, x_row in zip(b, x):
+        valid = ~np.isnan(row)
+        if np.linalg.matrix_rank(A[valid]) < 3:
+            assert np.all(np.isnan(x_row))
+        else:
+            expected = np.linalg.lstsq(A[valid], row[valid], rcond=None)[0]
+            assert np.allclose(x_row, expected)
+
+
+# === Test 2: Chan keeps the per-row result on complete epochs and solves blocked ones ===
+def test_chan_matches_rowwise_and_fills_blocked_rows():
+    from model.chan import estimate_positions_chan
+    anchors = ANCHORS_3D[:, :2]
+
+    rng = np.random.default_rng(1)
+    points = rng.uniform(0, 20, size=(50, 2))
+    dists = np.linalg.norm(points[:, None, :] - anchors[None, :, :], axis=2)
+    tdoa = (dists - dists[:, [0]])[:, 1:]
+    tdoa[::5, 1] = np.nan
+
+    estimated = estimate_positions_chan(tdoa, scenario=Scenario(anchors))
+
+    A = anchors[1:] - anchors[0]
+    for row, x_row in zip(tdoa, estimated):
+        valid = ~np.isnan(row)
+        b = 0.5 * (np.sum(anchors[1:] ** 2, axis=1) - np.dot(anchors[0], anchors[0]) - row ** 2)
+        expected = np.linalg.lstsq(A[valid], b[valid], rcond=None)[0]
+        assert np.allclose(x_row, expected)
+
+
+# === Test 3: Fang returns full 3D fixes ===
+def test_fang_supports_3d():
+    from model.fang import estimate_positions_fang
+
+    points = np.array([[5.0, 5.0, 2.0], [15.0, 8.0, 3.0]])
+    dists = np.linalg.norm(points[:, None, :] - ANCHORS_3D[None, :, :], axis=2)
+    tdoa = (dists - dists[:, [0]])[:, 1:]
+
+    estimated = estimate_positions_fang(tdoa, scenario=Scenario(ANCHORS_3D))
+    assert estimated.shape == (2, 3)
+    assert np.all(np.isfinite(estimated))
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Scenario
+from datagenerator import generate_trajectory, generate_monte_carlo, write_monte_carlo
+
+SCENARIO_3D = Scenario(np.array([[0, 0, 1], [0, 20, 4], [20, 0, 3], [20, 20, 2]]))
+
+
+# === Test 1: batched deterministic trajectories equal the single-run generator ===
+@pytest.mark.parametrize("trajectory_type", ["line", "circle", "sinusoid"])
+def test_batch_trajectories_match_single(trajectory_type):
+    positions, _, _ = generate_monte_carlo(3, 40, trajectory_types=trajectory_type, speeds=1.0,
+                                           seed=0, scenario=SCENARIO_3D)
+    expected = generate_trajectory(40, trajectory_type, dimension=3, scenario=SCENARIO_3D)
+    assert positions.shape == (3, 40, 3)
+    assert np.allclose(positions, expected)
+
+
+# === Test 2: per-run interference rates and compact masks ===
+def test_per_run_rates():
+    _, tdoa, problem_mask = generate_monte_carlo(2, 2000, trajectory_types=['random', 'line'],
+                                                 blockage_rates=[0.0, 0.5], seed=1, scenario=SCENARIO_3D)
+    assert problem_mask.dtype == np.int8
+    assert not np.isnan(tdoa[0]).any()
+    assert 0.45 < np.isnan(tdoa[1]).mean() < 0.55
+
+
+# === Test 3: chunked writing is reproducible and readable with mmap ===
+def test_write_monte_carlo_chunks(tmp_path):
+    kwargs = dict(num_points=20, chunk_runs=4, trajectory_types='random', nlos_rates=0.2, seed=5,
+                  scenario=SCENARIO_3D)
+    write_monte_carlo(tmp_path / 'a', 10, **kwargs)
+    write_monte_carlo(tmp_path / 'b', 10, **kwargs)
+
+    first = np.load(tmp_path / 'a' / 'tdoa.npy', mmap_mode='r')
+    second = np.load(tmp_path / 'b' / 'tdoa.npy', mmap_mode='r')
+    assert first.shape == (10, 20, 3)
+    assert np.array_equal(first, second)
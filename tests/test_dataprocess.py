@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from dataprocess import preprocess_tdoa
+
+
+def _reference_adaptive(tdoa_measurements, problem_mask):
+    tdoa = tdoa_measurements.copy()
+    tdoa[problem_mask == 1] = np.nan
+    for i in range(tdoa.shape[0]):
+        valid = tdoa[i][(problem_mask[i] == 0) & ~np.isnan(tdoa[i])]
+        tdoa[i][problem_mask[i] == 2] = np.median(valid) if valid.size > 0 else np.nan
+    for i in range(tdoa.shape[0]):
+        valid = tdoa[i][(problem_mask[i] == 0) & ~np.isnan(tdoa[i])]
+        if valid.size >= tdoa.shape[1] // 2 and valid.size > 0:
+            tdoa[i][problem_mask[i] == 3] = np.mean(valid)
+        else:
+            tdoa[i][problem_mask[i] == 3] = np.nan
+    return tdoa
+
+
+# === Test 1: vectorised adaptive strategy matches the per-row loop ===
+@pytest.mark.parametrize("num_anchors", [3, 4, 7])
+def test_adaptive_matches_rowwise(num_anchors):
+    rng = np.random.default_rng(num_anchors)
+    tdoa = rng.normal(0, 5, size=(500, num_anchors))
+    problem_mask = rng.choice(4, size=tdoa.shape, p=[0.55, 0.15, 0.15, 0.15])
+    tdoa[problem_mask == 3] = np.nan
+
+    expected = _reference_adaptive(tdoa, problem_mask)
+    processed = preprocess_tdoa(tdoa, problem_mask, strategy="adaptive")
+
+    assert np.allclose(processed, expected, equal_nan=True)
+
+
+# === Test 2: in-place mode reuses the input buffer ===
+def test_adaptive_inplace():
+    tdoa = np.array([[1.0, 2.0, 3.0], [np.nan, 4.0, 6.0]])
+    problem_mask = np.array([[0, 2, 1], [3, 0, 0]])
+
+    processed = preprocess_tdoa(tdoa, problem_mask, inplace=True)
+
+    assert processed is tdoa
+    assert np.allclose(processed, [[1.0, 1.0, np.nan], [5.0, 4.0, 6.0]], equal_nan=True)
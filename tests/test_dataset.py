@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Scenario
+from dataset import open_dataset, write_dataset
+from datagenerator import generate_simulated_data
+
+SCENARIO = Scenario(np.array([[0, 0], [0, 20], [20, 0], [20, 20]]), tdoa_noise_std=0.5, num_targets=25)
+
+
+# === Test 1: round trip keeps values, geometry and the int8 mask ===
+def test_dataset_round_trip(tmp_path):
+    np.random.seed(0)
+    true_positions, tdoa, problem_mask = generate_simulated_data(enable_blockage=True, scenario=SCENARIO)
+    write_dataset(tmp_path / 'ds', true_positions, tdoa, problem_mask, SCENARIO)
+
+    dataset = open_dataset(tmp_path / 'ds')
+    assert len(dataset) == 25
+    assert dataset.problem_mask.dtype == np.int8
+    assert np.array_equal(dataset.tdoa, tdoa, equal_nan=True)
+    assert np.array_equal(dataset.scenario.anchors, SCENARIO.anchors)
+    assert dataset.scenario.tdoa_noise_std == 0.5
+
+
+# === Test 2: columns are memory-mapped and chunks are views of them ===
+def test_dataset_is_memory_mapped(tmp_path):
+    tdoa = np.arange(60, dtype=float).reshape(4, 5, 3)
+    write_dataset(tmp_path / 'ds', np.zeros((4, 5, 2)), tdoa, np.zeros((4, 5, 3), dtype=np.int8), SCENARIO)
+
+    dataset = open_dataset(tmp_path / 'ds')
+    assert isinstance(dataset.tdoa, np.memmap)
+    chunks = list(dataset.iter_chunks(8))
+    assert [c['tdoa'].shape[0] for c in chunks] == [8, 8, 4]
+    assert np.shares_memory(chunks[1]['tdoa'], dataset.tdoa)
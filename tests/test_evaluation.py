@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from evaluation import evaluate, evaluate_report, StreamingEvaluator, QuantileSketch
+
+
+def _data(n=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    targets = rng.uniform(0, 20, size=(n, 2))
+    predictions = {"a": targets + rng.normal(0, 1, size=(n, 2)), "b": targets + rng.normal(0, 0.2, size=(n, 2))}
+    predictions["a"][::10] = np.nan
+    problem_mask = rng.choice(4, size=(n, 3), p=[0.7, 0.1, 0.1, 0.1]).astype(np.int8)
+    return predictions, targets, problem_mask
+
+
+# === Test 1: the 'all' class agrees with evaluate() and counts failures ===
+def test_report_matches_evaluate():
+    predictions, targets, problem_mask = _data()
+    report = evaluate_report(predictions, targets, problem_mask)
+    metrics, _, _ = evaluate(predictions["a"], targets)
+
+    assert np.isclose(report["a"]["all"]["RMSE"], metrics["RMSE"])
+    assert np.isclose(report["a"]["all"]["MAE"], metrics["MAE"])
+    assert np.isclose(report["a"]["all"]["failure_rate"], 0.1)
+    assert report["b"]["clean"]["count"] == np.sum(~np.any(problem_mask > 0, axis=1))
+
+
+# === Test 2: chunked accumulation reproduces the one-pass report ===
+def test_streaming_matches_batch():
+    predictions, targets, problem_mask = _data()
+    report = evaluate_report(predictions, targets, problem_mask)
+
+    evaluator = StreamingEvaluator(relative_accuracy=0.01)
+    for start in range(0, targets.shape[0], 3000):
+        chunk = slice(start, start + 3000)
+        evaluator.update({k: v[chunk] for k, v in predictions.items()}, targets[chunk], problem_mask[chunk])
+    streamed = evaluator.result()
+
+    for name in predictions:
+        for class_name, stats in report[name].items():
+            s = streamed[name][class_name]
+            assert s["count"] == stats["count"]
+            assert np.isclose(s["RMSE"], stats["RMSE"])
+            assert np.isclose(s["std"], stats["std"])
+            assert abs(s["CEP95"] - stats["CEP95"]) <= 0.03 * stats["CEP95"]
+
+
+def test_quantile_sketch_relative_error():
+    values = np.random.default_rng(1).lognormal(0, 1, size=50000)
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    sketch.update(values)
+    for q in (0.1, 0.5, 0.9, 0.99):
+        exact = np.quantile(values, q)
+        assert abs(sketch.quantile(q) - exact) <= 0.02 * exact
+
+    # Small streams report the nearest-rank value, so the tail is not rounded down
+    few = np.arange(1.0, 11.0)
+    sketch = QuantileSketch(relative_accuracy=0.01)
+    sketch.update(few)
+    for q, nearest in ((0.5, 5.0), (0.95, 10.0), (0.99, 10.0)):
+        assert abs(sketch.quantile(q) - nearest) <= 0.01 * nearest
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import profiling
+from config import Scenario
+from model.fingerprint import estimate_positions_fingerprint, fingerprint_index
+from model.least_squares import estimate_positions_least_squares
+
+
+# === Test 1: noiseless fixes are as accurate as the finest grid, with and without missing measurements ===
+@pytest.mark.parametrize("anchors, space", [
+    (np.array([[0, 0], [0, 20], [20, 0], [20, 20]]), (20, 20, 5)),
+    (np.array([[0, 0, 2.8], [0, 8, 0.3], [12, 0, 0.3], [12, 8, 2.8], [6, 0, 2.8]]), (12, 8, 3)),
+])
+def test_noiseless_fixes(anchors, space):
+    scenario = Scenario(anchors, space=space)
+    dim = anchors.shape[1]
+    rng = np.random.default_rng(0)
+    true_positions = rng.uniform(0.5, 1, size=(200, dim)) * scenario.upper_bounds * 0.9
+    distances = np.linalg.norm(true_positions[:, np.newaxis, :] - anchors[np.newaxis, :, :], axis=2)
+    tdoa = distances[:, 1:] - distances[:, [0]]
+    tdoa[:50, -1] = np.nan   # a second NaN pattern, served by its own KD-tree
+    tdoa[50, :] = np.nan     # unsolvable
+
+    estimated = estimate_positions_fingerprint(tdoa, resolution=0.5, refine_levels=4, scenario=scenario)
+
+    assert np.all(np.isnan(estimated[50]))
+    errors = np.linalg.norm(np.delete(estimated - true_positions, 50, axis=0), axis=1)
+    assert np.max(errors) < 0.1
+    index = fingerprint_index(scenario, 0.5)
+    assert len(index.trees) == 2
+    assert index.nbytes > index.fingerprints.nbytes
+
+    # Empty and fully blocked batches come back as NaN of the right shape
+    assert estimate_positions_fingerprint(np.empty((0, len(anchors) - 1)), scenario=scenario).shape == (0, dim)
+    blocked = estimate_positions_fingerprint(np.full((3, len(anchors) - 1), np.nan), scenario=scenario)
+    assert blocked.shape == (3, dim) and np.all(np.isnan(blocked))
+
+
+# === Test 2: as a seed, the nearest fingerprint saves Gauss-Newton iterations ===
+def test_fingerprint_seed():
+    scenario = Scenario(np.array([[0, 0], [0, 20], [20, 0], [20, 20]]), tdoa_noise_std=0.05)
+    rng = np.random.default_rng(1)
+    true_positions = rng.uniform(1, 19, size=(300, 2))
+    distances = np.linalg.norm(true_positions[:, np.newaxis, :] - scenario.anchors[np.newaxis, :, :], axis=2)
+    tdoa = distances[:, 1:] - distances[:, [0]] + rng.normal(0, 0.05, size=(300, 3))
+
+    iterations, fixes = {}, {}
+    for init in ("mean", "fingerprint"):
+        profiler = profiling.enable_profiling()
+        fixes[init] = estimate_positions_least_squares(tdoa, init=init, scenario=scenario)
+        profiling.disable_profiling()
+        iterations[init] = profiler.counters["least_squares.iterations"]
+
+    np.testing.assert_allclose(fixes["fingerprint"], fixes["mean"], atol=1e-3)
+    assert iterations["fingerprint"] < iterations["mean"]
@@ -0,0 +1,45 @@
+import numpy as np
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Scenario
+from gdop import compute_gdop, coverage_map
+from model.levenberg_marquardt import estimate_positions_lm
+
+
+# === Test 1: interpolated lookup matches the direct GDOP and the CRLB matches the solver's spread ===
+def test_lookup_matches_direct():
+    scenario = Scenario(np.array([[0, 0], [0, 20], [20, 0], [20, 20], [10, 0]]), tdoa_noise_std=0.1)
+    coverage = coverage_map(scenario, resolution=0.25, cache_dir=None)
+
+    rng = np.random.default_rng(0)
+    points = rng.uniform(2, 18, size=(500, 2))
+    direct = compute_gdop(points, scenario.anchors)
+    assert np.allclose(coverage.gdop_at(points), direct, rtol=0.02)
+    assert np.allclose(coverage.gdop_at(np.array([[5.0, 7.5]])), compute_gdop([[5.0, 7.5]], scenario.anchors))
+    assert np.isnan(coverage.gdop_at(np.array([[np.nan, 1.0]])))[0]
+
+    # The efficient LM estimator attains the bound at small noise
+    truth = np.array([6.0, 13.0])
+    distances = np.linalg.norm(truth - scenario.anchors, axis=1)
+    tdoa = distances[1:] - distances[0] + rng.normal(0, 0.1, size=(2000, 4))
+    errors = estimate_positions_lm(tdoa, scenario=scenario) - truth
+    empirical = np.sqrt(np.mean(np.sum(errors ** 2, axis=1)))
+    assert np.isclose(empirical, coverage.expected_accuracy(truth)[0], rtol=0.1)
+
+
+# === Test 2: the grid is written once per geometry and reloaded from disk ===
+def test_disk_cache(tmp_path):
+    anchors = np.array([[0, 0], [0, 20], [20, 0], [20, 20]])
+    first = coverage_map(Scenario(anchors), resolution=0.5, cache_dir=tmp_path)
+    assert len(os.listdir(tmp_path)) == 1
+
+    # A fresh scenario with the same geometry but another σ loads the file and rescales
+    reloaded = coverage_map(Scenario(anchors, tdoa_noise_std=0.5), resolution=0.5, cache_dir=tmp_path)
+    assert len(os.listdir(tmp_path)) == 1
+    assert np.array_equal(reloaded.gdop, first.gdop)
+    assert np.isclose(reloaded.expected_accuracy([[10, 10]])[0], 0.5 * first.expected_accuracy([[10, 10]])[0])
+
+    coverage_map(Scenario(anchors + 1.0), resolution=0.5, cache_dir=tmp_path)
+    assert len(os.listdir(tmp_path)) == 2
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Scenario
+from model.kalman import estimate_positions_ekf
+
+
+# === Test 1: EKF follows a straight-line track and bridges a full dropout ===
+def test_ekf_tracks_through_dropout():
+    anchors = np.array([[0, 0], [0, 20], [20, 0], [20, 20]], dtype=float)
+
+    t = np.arange(30) * 0.5
+    track = np.stack([2.0 + 0.8 * t, np.full_like(t, 10.0)], axis=1)
+    dists = np.linalg.norm(track[:, None, :] - anchors[None, :, :], axis=2)
+    tdoa = (dists - dists[:, [0]])[:, 1:]
+    tdoa[12:15] = np.nan
+
+    estimated = estimate_positions_ekf(tdoa, dt=0.5, measurement_std=0.05, scenario=Scenario(anchors))
+
+    assert estimated.shape == track.shape
+    assert np.all(np.isfinite(estimated))
+    assert np.max(np.linalg.norm(estimated[15:] - track[15:], axis=1)) < 0.3
+
+
+# === Test 2: a diverged least-squares start is not used; a track that leaves the room is restarted ===
+def test_ekf_rejects_diverged_fixes():
+    anchors = np.array([[0, 0], [0, 20], [20, 0], [20, 20]], dtype=float)
+    t = np.arange(30) * 0.5
+    track = np.stack([2.0 + 0.5 * t, np.full_like(t, 8.0)], axis=1)
+    dists = np.linalg.norm(track[:, None, :] - anchors[None, :, :], axis=2)
+    tdoa = (dists - dists[:, [0]])[:, 1:]
+    tdoa[0] = [400.0, -400.0, 300.0]     # no point in the room fits this epoch
+    tdoa[15] = [900.0, 900.0, 900.0]     # an outlier that throws the filter out of the room
+
+    estimated = estimate_positions_ekf(tdoa, dt=0.5, measurement_std=0.05, scenario=Scenario(anchors))
+
+    assert np.all(np.isnan(estimated[[0, 15]]))   # waiting for a usable start
+    fixed = np.delete(estimated, [0, 15], axis=0)
+    assert np.all(np.isfinite(fixed))
+    assert np.all((fixed >= -2.0) & (fixed <= 22.0))
+    assert np.max(np.linalg.norm(estimated[17:] - track[17:], axis=1)) < 0.3
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from model import kernels
+
+
+def make_problem(num_epochs=100, seed=0):
+    rng = np.random.default_rng(seed)
+    anchors = np.array([[0.0, 0.0], [0.0, 20.0], [20.0, 0.0], [20.0, 20.0], [10.0, 25.0]])
+    true_positions = rng.uniform(2, 18, size=(num_epochs, 2))
+    distances = np.linalg.norm(true_positions[:, np.newaxis, :] - anchors[np.newaxis, :, :], axis=2)
+    tdoa = distances[:, 1:] - distances[:, [0]] + rng.normal(0, 0.1, size=(num_epochs, 4))
+    tdoa[rng.random(tdoa.shape) < 0.1] = np.nan
+    return anchors, tdoa, rng
+
+
+# === Test 1: the vectorised kernels and the per-epoch (JIT source) kernels agree ===
+def test_backends_match():
+    anchors, tdoa, rng = make_problem()
+    complete = ~np.isnan(tdoa).any(axis=1)
+    x0 = anchors.mean(axis=0) + rng.normal(0, 0.5, size=(np.count_nonzero(complete), 2))
+    bounds = np.array([20.0, 20.0])
+
+    reference = kernels.taylor_numpy(tdoa[complete], anchors, 0, x0, 20, 1e-4, bounds)
+    candidates = [kernels.taylor_loop(tdoa[complete], anchors, 0, x0, 20, 1e-4, bounds)]
+    if "numba" in kernels.available_backends():
+        candidates.append(kernels.solve_taylor(tdoa[complete], anchors, 0, x0, 20, 1e-4, bounds, backend="numba"))
+    for positions, stats in candidates:
+        np.testing.assert_allclose(positions, reference[0], atol=1e-8)
+        np.testing.assert_array_equal(stats, reference[1])
+
+    reference = kernels.clock_gn_numpy(tdoa, anchors, 0, 100, 1e-4, 1.0)
+    candidates = [kernels.clock_gn_loop(tdoa, anchors, 0, 100, 1e-4, 1.0)]
+    if "numba" in kernels.available_backends():
+        candidates.append(kernels.solve_clock_gn(tdoa, anchors, 0, 100, 1e-4, 1.0, backend="numba"))
+    for positions, stats in candidates:
+        np.testing.assert_allclose(positions, reference[0], atol=1e-8)
+        np.testing.assert_array_equal(stats, reference[1])
+
+
+# === Test 2: backend selection ===
+def test_select_backend(monkeypatch):
+    monkeypatch.delenv("TDOA_KERNEL_BACKEND", raising=False)
+    assert kernels.select_backend() == kernels.available_backends()[-1]
+    assert kernels.select_backend("numpy") == "numpy"
+    monkeypatch.setenv("TDOA_KERNEL_BACKEND", "numpy")
+    assert kernels.select_backend() == "numpy"
+    with pytest.raises(ValueError):
+        kernels.select_backend("cuda")
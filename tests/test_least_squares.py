@@ -4,7 +4,8 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from model.least_squares import compute_distance, compute_residual
+from config import Scenario
+from model.least_squares import compute_distance, compute_jacobian, compute_residual, estimate_positions_least_squares
 
 
 def pytest_target_matches(request, name):
@@ -39,3 +40,43 @@ def test_compute_residual_zero_when_position_matches():
     residual = compute_residual(true_position, anchors, tdoa, reference_index)
     assert residual.shape == tdoa.shape
     assert np.allclose(residual, 0, atol=1e-6), f"Expected near-zero residual, got {residual}"
+
+
+# === Test 3: batched solver matches the per-epoch Gauss-Newton loop ===
+def _reference_least_squares(tdoa_measurements, anchors, reference_index=0, max_iter=100, tol=1e-4):
+    dim = anchors.shape[1]
+    estimated_positions = []
+    for tdoa in tdoa_measurements:
+        valid_idx = ~np.isnan(tdoa)
+        reduced_anchors = np.delete(anchors, reference_index, axis=0)[valid_idx]
+        anchors_used = np.insert(reduced_anchors, reference_index, anchors[reference_index], axis=0)
+        if anchors_used.shape[0] < dim + 1:
+            estimated_positions.append(np.full((dim,), np.nan))
+            continue
+        x_est = np.mean(anchors_used, axis=0)
+        for _ in range(max_iter):
+            delta_z = compute_residual(x_est, anchors_used, tdoa[valid_idx], reference_index)
+            H = compute_jacobian(x_est, anchors_used, reference_index)
+            x_new = x_est + np.linalg.pinv(H.T @ H) @ H.T @ delta_z
+            if np.linalg.norm(x_new - x_est) <= tol:
+                break
+            x_est = x_new
+        estimated_positions.append(x_est)
+    return np.array(estimated_positions)
+
+
+def test_batched_least_squares_matches_reference():
+    anchors = np.array([[0.0, 0.0], [0.0, 20.0], [20.0, 0.0], [20.0, 20.0], [10.0, 25.0]])
+
+    rng = np.random.default_rng(0)
+    points = rng.uniform(0, 20, size=(200, 2))
+    dists = np.linalg.norm(points[:, None, :] - anchors[None, :, :], axis=2)
+    tdoa = (dists - dists[:, [0]])[:, 1:] + rng.normal(0, 0.1, size=(200, 4))
+    tdoa[rng.random(tdoa.shape) < 0.2] = np.nan
+
+    expected = _reference_least_squares(tdoa, anchors)
+    estimated = estimate_positions_least_squares(tdoa, scenario=Scenario(anchors))
+
+    assert estimated.shape == expected.shape
+    assert np.array_equal(np.isnan(estimated), np.isnan(expected))
+    assert np.allclose(estimated, expected, atol=1e-8, equal_nan=True)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Scenario
+from model.levenberg_marquardt import cholesky_solve, estimate_positions_lm
+
+
+def make_tdoa(scenario, true_positions, noise_std, bias=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    distances = np.linalg.norm(true_positions[:, np.newaxis, :] - scenario.anchors[np.newaxis, :, :], axis=2)
+    tdoa = distances[:, 1:] - distances[:, [0]]
+    return tdoa + rng.normal(0, noise_std, size=tdoa.shape) + bias * rng.random(tdoa.shape)
+
+
+# === Test 1: batched Cholesky solve agrees with np.linalg.solve ===
+def test_cholesky_solve():
+    rng = np.random.default_rng(0)
+    B = rng.normal(size=(50, 3, 3))
+    A = B @ B.transpose(0, 2, 1) + 0.1 * np.eye(3)
+    b = rng.normal(size=(50, 3))
+    np.testing.assert_allclose(cholesky_solve(A, b), np.linalg.solve(A, b[:, :, np.newaxis])[..., 0], atol=1e-10)
+
+
+# === Test 2: exact fixes and diagnostics on noise-free data ===
+def test_lm_noise_free_with_diagnostics():
+    scenario = Scenario(np.array([[0, 0], [0, 20], [20, 0], [20, 20]]), tdoa_noise_std=0.5)
+    true_positions = np.random.default_rng(1).uniform(2, 18, size=(40, 2))
+    tdoa = make_tdoa(scenario, true_positions, noise_std=0.0)
+    tdoa[0, :2] = np.nan  # only one TDOA left: unsolvable in 2D
+
+    estimated, diagnostics = estimate_positions_lm(tdoa, return_diagnostics=True, scenario=scenario)
+
+    assert np.all(np.isnan(estimated[0]))
+    np.testing.assert_allclose(estimated[1:], true_positions[1:], atol=1e-3)
+    assert diagnostics["converged"][1:].all()
+    assert diagnostics["iterations"][1:].max() <= 20
+    assert diagnostics["residual_norm"][1:].max() < 1e-3
+    covariance = diagnostics["covariance"][1:]
+    np.testing.assert_allclose(covariance, covariance.transpose(0, 2, 1))
+    assert np.all(np.linalg.eigvalsh(covariance) > 0)
+
+
+# === Test 3: under NLOS bias every solvable epoch still gets a fix inside the search region ===
+def test_lm_keeps_fixes_under_nlos():
+    scenario = Scenario(np.array([[0, 0, 0], [0, 20, 5], [20, 0, 5], [20, 20, 0], [10, 10, 5]]))
+    true_positions = np.random.default_rng(2).uniform([1, 1, 0.5], [19, 19, 4.5], size=(200, 3))
+    tdoa = make_tdoa(scenario, true_positions, noise_std=1.0, bias=3.0)
+
+    estimated = estimate_positions_lm(tdoa, scenario=scenario)
+
+    assert not np.isnan(estimated).any()
+    assert np.all(np.abs(estimated) <= 2 * scenario.upper_bounds)
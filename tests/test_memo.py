@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Scenario
+from model.kalman import estimate_positions_ekf
+from model.least_squares import estimate_positions_least_squares
+from model.memo import MemoizedEstimator
+
+
+class CountingEstimator:
+    """least_squares, recording how many rows it was asked to solve."""
+
+    def __init__(self):
+        self.rows = 0
+
+    def __call__(self, tdoa_measurements, scenario=None):
+        self.rows += tdoa_measurements.shape[0]
+        return estimate_positions_least_squares(tdoa_measurements, scenario=scenario)
+
+
+# === Test 1: repeated rows are served from the cache, per geometry ===
+def test_hits_skip_the_solver():
+    scenario = Scenario(np.array([[0, 0], [0, 20], [20, 0], [20, 20]]))
+    truth = np.array([[5.0, 6.0], [14.0, 9.0]])
+    distances = np.linalg.norm(truth[:, np.newaxis, :] - scenario.anchors[np.newaxis, :, :], axis=2)
+    parked = distances[:, 1:] - distances[:, [0]]
+    tdoa = np.repeat(parked, 50, axis=0) + np.random.default_rng(0).uniform(-1e-4, 1e-4, size=(100, 3))
+    tdoa[-1] = [np.nan, 1.0, 2.0]  # NaN rows are keyed like any other row
+
+    solver = CountingEstimator()
+    memo = MemoizedEstimator(solver, resolution=0.01)
+    first = memo(tdoa, scenario=scenario)
+    second = memo(tdoa[::-1], scenario=scenario)
+
+    assert solver.rows <= 2 * 2 ** 3 + 1  # at most one solve per quantisation cell touched
+    np.testing.assert_allclose(first[:50], np.broadcast_to(truth[0], (50, 2)), atol=0.01)
+    np.testing.assert_array_equal(second, first[::-1])
+    assert memo.hits + memo.misses == 200
+    assert memo.misses == solver.rows
+
+    # Another anchor layout never sees those fixes
+    solved = solver.rows
+    memo(tdoa, scenario=Scenario(scenario.anchors + 1.0))
+    assert solver.rows == 2 * solved
+
+
+# === Test 2: LRU eviction keeps at most maxsize fixes; trackers are rejected ===
+def test_lru_eviction():
+    scenario = Scenario(np.array([[0, 0], [0, 20], [20, 0], [20, 20]]))
+    tdoa = np.random.default_rng(1).uniform(-5, 5, size=(30, 3))
+    memo = MemoizedEstimator(estimate_positions_least_squares, resolution=0.01, maxsize=20)
+
+    fixes = np.concatenate([memo(tdoa[:10], scenario=scenario), memo(tdoa[10:], scenario=scenario)])
+    assert len(memo) == 20
+    np.testing.assert_array_equal(memo(tdoa[-20:], scenario=scenario), fixes[-20:])
+    assert memo.misses == 30 and memo.hits == 20
+
+    memo(tdoa[:5], scenario=scenario)  # evicts the five least recently used
+    assert len(memo) == 20 and memo.misses == 35
+    with pytest.raises(ValueError):
+        MemoizedEstimator(estimate_positions_ekf)
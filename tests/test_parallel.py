@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import load_yaml_config, Scenario
+from model import load_model
+from model.parallel import estimate_positions_parallel, load_parallel_model, shard_bounds
+
+CONFIG = load_yaml_config(os.path.join(os.path.dirname(__file__), '..', 'configs', 'model.yaml'))
+SCENARIO = Scenario(np.array([[0, 0], [0, 20], [20, 0], [20, 20]]))
+
+
+def _tdoa(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(0, 5, size=(n, 3))
+
+
+# === Test 1: shards cover every row once, in order ===
+def test_shard_bounds_cover_rows():
+    bounds = shard_bounds(10, 4)
+    assert bounds[0][0] == 0 and bounds[-1][1] == 10
+    assert all(a[1] == b[0] for a, b in zip(bounds, bounds[1:]))
+
+
+# === Test 2: sharded deterministic model equals the serial run ===
+def test_parallel_matches_serial():
+    tdoa = _tdoa(101)
+    serial = load_model("least_squares", CONFIG)(tdoa, scenario=SCENARIO)
+    parallel = estimate_positions_parallel(tdoa, "least_squares", CONFIG, scenario=SCENARIO, workers=3)
+    assert np.allclose(parallel, serial, equal_nan=True)
+
+
+# === Test 3: stochastic models are reproducible for a fixed seed ===
+def test_parallel_seeded_reproducible():
+    tdoa = _tdoa(40, seed=1)
+    kwargs = dict(model_name="particle_filter", config=CONFIG, scenario=SCENARIO, workers=2, shard_size=10, seed=7)
+    first = estimate_positions_parallel(tdoa, **kwargs)
+    second = estimate_positions_parallel(tdoa, **kwargs)
+    assert np.array_equal(first, second, equal_nan=True)
+
+    # Trackers would restart at every shard and chunk boundary
+    with pytest.raises(ValueError):
+        load_parallel_model("ekf", CONFIG, scenario=SCENARIO, workers=2)
+
+
+# === Test 4: a loaded parallel model keeps one pool across calls; seeded call sequences repeat ===
+def test_parallel_model_reuses_pool():
+    tdoa = _tdoa(60, seed=2)
+    runs = []
+    for _ in range(2):
+        with load_parallel_model("particle_filter", CONFIG, scenario=SCENARIO, workers=2, seed=3) as estimator:
+            chunks = [estimator(tdoa[start:start + 20]) for start in (0, 20, 40)]
+            executor = estimator._executor[0]
+            chunks.append(estimator(tdoa))  # larger input: the shared segments are replaced
+            assert estimator._executor[0] is executor
+        runs.append(np.concatenate(chunks))
+    assert np.array_equal(runs[0], runs[1], equal_nan=True)
+    assert not np.array_equal(runs[0][:20], runs[0][20:40], equal_nan=True)  # every call draws fresh streams
+
+    # Workers drop the segments the parent replaced (here the input alone, then both) while still using the others
+    eight = Scenario(np.array([[0, 0], [0, 20], [20, 0], [20, 20], [10, 0], [10, 20], [0, 10], [20, 10]]))
+    with load_parallel_model("least_squares", CONFIG, scenario=SCENARIO, workers=2) as estimator:
+        for scenario, n in [(SCENARIO, 200), (eight, 200), (eight, 5000), (SCENARIO, 30), (eight, 20000)]:
+            tdoa = _tdoa(n)[:, :1].repeat(scenario.anchors.shape[0] - 1, axis=1)
+            serial = load_model("least_squares", CONFIG)(tdoa, scenario=scenario)
+            assert np.allclose(estimator(tdoa, scenario=scenario), serial, equal_nan=True)
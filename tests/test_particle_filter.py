@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Scenario
+from model.particle_filter import systematic_resample, estimate_positions_pf_tracking
+
+
+# === Test 1: systematic resampling keeps every particle with weight >= 1/P ===
+def test_systematic_resample_counts():
+    rng = np.random.default_rng(0)
+    weights = np.array([[0.5, 0.25, 0.25, 0.0], [0.0, 0.0, 1.0, 0.0]])
+    indices = systematic_resample(weights, rng)
+
+    assert indices.shape == (2, 4)
+    assert np.bincount(indices[0], minlength=4).tolist() == [2, 1, 1, 0]
+    assert np.all(indices[1] == 2)
+
+
+# === Test 2: the carried particle cloud tracks several tags at once ===
+def test_tracking_converges_on_static_tags():
+    anchors = np.array([[0, 0], [0, 20], [20, 0], [20, 20]], dtype=float)
+
+    tags = np.array([[5.0, 5.0], [12.0, 15.0], [16.0, 4.0]])
+    dists = np.linalg.norm(tags[:, None, :] - anchors[None, :, :], axis=2)
+    tdoa = np.repeat(((dists - dists[:, [0]])[:, 1:])[None], 15, axis=0)
+    tdoa[5, 1, :] = np.nan  # full dropout for one tag
+
+    estimated = estimate_positions_pf_tracking(tdoa, num_particles=400, motion_std=0.1, seed=0,
+                                               scenario=Scenario(anchors))
+
+    assert estimated.shape == (15, 3, 2)
+    assert np.all(np.isfinite(estimated))
+    assert np.all(np.linalg.norm(estimated[-1] - tags, axis=1) < 0.5)
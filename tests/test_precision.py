@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import profiling
+from config import Scenario
+from datagenerator import generate_monte_carlo
+from dataprocess import preprocess_tdoa
+from dataset import open_dataset, write_dataset
+from model.least_squares import estimate_positions_least_squares
+from model.levenberg_marquardt import estimate_positions_lm
+from model.robust import estimate_positions_irls
+from model.taylor import estimate_positions_taylor
+from model.chan import estimate_positions_chan
+
+ANCHORS = np.array([[0, 0], [0, 20], [20, 0], [20, 20]])
+
+
+def simulate(precision):
+    scenario = Scenario(ANCHORS, tdoa_noise_std=0.1, precision=precision)
+    true_positions, tdoa, problem_mask = generate_monte_carlo(
+        20, 50, trajectory_types='random', blockage_rates=0.1, seed=0, scenario=scenario
+    )
+    return scenario, true_positions.reshape(-1, 2), tdoa.reshape(-1, 3), problem_mask.reshape(-1, 3)
+
+
+# === Test 1: float32 flows from the generator through preprocessing and storage to the fixes ===
+@pytest.mark.parametrize("estimate_positions", [
+    estimate_positions_least_squares, estimate_positions_lm, estimate_positions_irls,
+    estimate_positions_taylor, estimate_positions_chan,
+])
+def test_float32_pipeline(estimate_positions, tmp_path):
+    scenario64, true_positions64, tdoa64, _ = simulate('float64')
+    scenario, true_positions, tdoa, problem_mask = simulate('float32')
+    assert tdoa.dtype == true_positions.dtype == np.float32 and problem_mask.dtype == np.int8
+    np.testing.assert_array_equal(tdoa, tdoa64.astype(np.float32))  # same draws at either precision
+
+    processed = preprocess_tdoa(tdoa, problem_mask)
+    assert processed.dtype == np.float32
+    write_dataset(tmp_path / 'ds', true_positions, processed, problem_mask, scenario)
+    dataset = open_dataset(tmp_path / 'ds')
+    assert dataset.tdoa.dtype == np.float32 and dataset.scenario.precision == 'float32'
+
+    np.random.seed(0)
+    fixes64 = estimate_positions(preprocess_tdoa(tdoa64, problem_mask), scenario=scenario64)
+    np.random.seed(0)
+    fixes = estimate_positions(dataset.tdoa, scenario=dataset.scenario)
+    assert fixes.dtype == np.float32
+    np.testing.assert_array_equal(np.isnan(fixes), np.isnan(fixes64))
+    shift = np.linalg.norm(fixes - fixes64, axis=1)
+    assert np.nanpercentile(shift, 99) < 1e-3
+
+
+# === Test 2: float32 rounding does not cost Levenberg-Marquardt extra iterations; bad precisions are rejected ===
+def test_float32_convergence():
+    iterations = {}
+    for precision in ('float64', 'float32'):
+        scenario, _, tdoa, _ = simulate(precision)
+        profiler = profiling.enable_profiling()
+        estimate_positions_lm(tdoa, scenario=scenario)
+        profiling.disable_profiling()
+        iterations[precision] = profiler.counters["lm.iterations"]
+
+    assert iterations['float32'] <= 1.1 * iterations['float64']
+    with pytest.raises(ValueError):
+        Scenario(ANCHORS, precision='float16')
@@ -0,0 +1,44 @@
+import json
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import profiling
+from config import Scenario
+from model.least_squares import estimate_positions_least_squares
+
+
+@pytest.fixture
+def profiler():
+    yield profiling.enable_profiling()
+    profiling.disable_profiling()
+
+
+# === Test 1: nested stages and estimator counters end up in the report ===
+def test_stages_and_counters(profiler, tmp_path):
+    scenario = Scenario(np.array([[0, 0], [0, 20], [20, 0], [20, 20]]))
+    tdoa = np.array([[1.0, -2.0, 0.5], [np.nan, np.nan, 1.0]])
+
+    with profiling.stage("outer"):
+        with profiling.stage("estimate"):
+            estimate_positions_least_squares(tdoa, scenario=scenario)
+
+    report = json.loads(open(profiler.write(tmp_path / "profile.json")).read())
+    assert set(report["stages"]) == {"outer", "outer;estimate"}
+    assert report["stages"]["outer"]["seconds"] >= report["stages"]["outer;estimate"]["seconds"]
+    assert {event["name"] for event in report["traceEvents"]} == {"outer", "estimate"}
+    assert profiling.enabled()
+    assert report["counters"]["least_squares.epochs"] == 2
+    assert report["counters"]["least_squares.unsolvable"] == 1
+    assert report["counters"]["least_squares.iterations"] > 0
+
+
+# === Test 2: disabled profiling records nothing ===
+def test_disabled_is_noop():
+    assert profiling.get_profiler() is None
+    assert not profiling.enabled()
+    with profiling.stage("ignored"):
+        profiling.count("ignored")
+    assert profiling.get_profiler() is None
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Scenario
+from evaluation import rmse
+from model.levenberg_marquardt import estimate_positions_lm
+from model.robust import candidate_subsets, estimate_positions_irls, estimate_positions_ransac
+
+
+@pytest.fixture
+def nlos_problem():
+    """Six anchors, small noise and one strongly biased measurement per epoch."""
+    scenario = Scenario(np.array([[0, 0], [10, 0], [20, 5], [20, 20], [5, 20], [0, 12]]), tdoa_noise_std=0.1)
+    rng = np.random.default_rng(0)
+    true_positions = rng.uniform(2, 18, size=(300, 2))
+    distances = np.linalg.norm(true_positions[:, np.newaxis, :] - scenario.anchors[np.newaxis, :, :], axis=2)
+    tdoa = distances[:, 1:] - distances[:, [0]] + rng.normal(0, 0.1, size=(300, 5))
+    biased = rng.integers(0, 5, size=300)
+    tdoa[np.arange(300), biased] += rng.uniform(3, 8, size=300)
+    return scenario, true_positions, tdoa, biased
+
+
+# === Test 1: RANSAC finds the biased measurement and recovers the clean accuracy ===
+def test_ransac_rejects_nlos(nlos_problem):
+    scenario, true_positions, tdoa, biased = nlos_problem
+
+    estimated, inliers = estimate_positions_ransac(tdoa, return_inliers=True, scenario=scenario)
+
+    assert candidate_subsets(5, 2).shape == (10, 5)
+    assert np.mean(~inliers[np.arange(300), biased]) > 0.95
+    assert rmse(estimated, true_positions) < 0.3
+    assert rmse(estimated, true_positions) < 0.5 * rmse(estimate_positions_lm(tdoa, scenario=scenario),
+                                                          true_positions)
+
+
+# === Test 2: IRLS down-weights the outliers (typical error, not the wrong-basin tail) ===
+@pytest.mark.parametrize("loss", ["huber", "tukey"])
+def test_irls_beats_least_squares(nlos_problem, loss):
+    scenario, true_positions, tdoa, _ = nlos_problem
+
+    estimated = estimate_positions_irls(tdoa, loss=loss, scenario=scenario)
+    baseline = estimate_positions_lm(tdoa, scenario=scenario)
+
+    assert not np.isnan(estimated).any()
+    median_error = np.median(np.linalg.norm(estimated - true_positions, axis=1))
+    assert median_error < 0.2 * np.median(np.linalg.norm(baseline - true_positions, axis=1))
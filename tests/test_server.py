@@ -0,0 +1,89 @@
+import asyncio
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Scenario
+from gdop import coverage_map
+from model.least_squares import estimate_positions_least_squares
+from replay import replay, simulated_reports
+from server import MicroBatcher, solve_reports, start_server
+from tracking import MultiTagTracker
+
+
+async def serve_and_replay(transport, reports, truth, scenario, rate):
+    tracker = MultiTagTracker(estimate_positions_least_squares, scenario=scenario)
+    batcher = MicroBatcher(lambda batch: solve_reports(batch, tracker), max_batch=32, max_delay=0.002)
+    server, task, port = await start_server(batcher, port=0, transport=transport)
+    try:
+        return await replay(reports, truth, port=port, rate=rate, transport=transport, timeout=5.0), batcher
+    finally:
+        server.close()
+        task.cancel()
+
+
+# === Test 1: every report is answered with an accurate fix, over TCP and UDP ===
+@pytest.mark.parametrize("transport", ["tcp", "udp"])
+def test_replay_round_trip(transport):
+    np.random.seed(0)
+    scenario = Scenario(np.array([[0, 0], [0, 20], [20, 0], [20, 20]]), tdoa_noise_std=0.05)
+    reports, truth = simulated_reports(3, 20, scenario)
+
+    stats, batcher = asyncio.run(serve_and_replay(transport, reports, truth, scenario, rate=2000))
+
+    assert stats["lost"] == 0
+    assert stats["rmse"] < 0.5
+    assert batcher.reports == len(reports)
+    assert batcher.batches < len(reports)  # reports were micro-batched
+    assert stats["p50"] <= stats["p99"]
+
+
+# === Test 2: a batch's replies follow report order, with None for unsolvable reports ===
+def test_solve_reports_order():
+    scenario = Scenario(np.array([[0, 0], [0, 20], [20, 0], [20, 20]]), tdoa_noise_std=0.05)
+    tracker = MultiTagTracker(estimate_positions_least_squares, scenario=scenario)
+    reports = [
+        {"tag": "b", "t": 1.0, "tdoa": [0.0, 0.0, 0.0], "sent": 1},
+        {"tag": "a", "t": 0.0, "tdoa": [None, None, None], "sent": 2},
+        {"tag": "b", "t": 0.0, "tdoa": [0.0, 0.0, 0.0], "mask": [0, 0, 0], "sent": 3},
+    ]
+
+    replies = solve_reports(reports, tracker)
+
+    assert [(r["tag"], r["t"], r["sent"]) for r in replies] == [("b", 1.0, 1), ("a", 0.0, 2), ("b", 0.0, 3)]
+    assert replies[1]["position"] is None
+    assert np.allclose(replies[0]["position"], [10, 10], atol=0.1)
+    assert all(r["batch"] == 3 for r in replies)
+
+    # With a coverage map every fix carries its expected accuracy, and the gate drops fixes
+    coverage = coverage_map(scenario, resolution=0.5, cache_dir=None)
+    replies = solve_reports(reports, MultiTagTracker(estimate_positions_least_squares, scenario=scenario),
+                            coverage=coverage)
+    assert np.isclose(replies[0]["accuracy"], coverage.expected_accuracy([[10, 10]])[0], rtol=0.05)
+    assert replies[1]["accuracy"] is None
+    replies = solve_reports(reports, MultiTagTracker(estimate_positions_least_squares, scenario=scenario),
+                            coverage=coverage, max_accuracy=0.01)
+    assert all(r["position"] is None for r in replies)
+
+
+# === Test 3: a reply that raises is counted and does not stop the batcher ===
+def test_failing_reply_keeps_serving():
+    async def run():
+        batcher = MicroBatcher(lambda batch: [report["n"] for report in batch], max_batch=2, max_delay=0.001)
+        task = asyncio.ensure_future(batcher.run())
+        answered = []
+
+        def broken(result):
+            raise OSError("socket closed")
+
+        for n in range(4):
+            batcher.submit({"n": n}, broken if n == 1 else answered.append)
+            await asyncio.sleep(0.01)
+        task.cancel()
+        return batcher, answered
+
+    batcher, answered = asyncio.run(run())
+    assert answered == [0, 2, 3]
+    assert batcher.reply_errors == 1
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import load_yaml_config
+from model.chan import estimate_positions_chan
+from sites import SiteRegistry, load_site_registry
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+DEFAULTS = load_yaml_config(os.path.join(ROOT, 'configs', 'model.yaml'))['defaults']
+
+
+# === Test 1: the shipped sites file loads with per-site overrides ===
+def test_load_sites_yaml():
+    registry = load_site_registry(os.path.join(ROOT, 'configs', 'sites.yaml'), DEFAULTS)
+    office = registry.scenario('office_3d')
+    assert office.dim == 3
+    assert office.tdoa_noise_std == 0.3
+    assert registry.scenario('warehouse').anchors.shape == (6, 2)
+
+
+# === Test 2: solver artifacts are reused per site and dropped on LRU eviction ===
+def test_site_cache_reuse_and_eviction():
+    sites = {
+        'a': {'anchors': [[0, 0], [0, 10], [10, 0], [10, 10]]},
+        'b': {'anchors': [[0, 0], [0, 20], [20, 0], [20, 20], [10, 25]]},
+    }
+    registry = SiteRegistry(sites, DEFAULTS, maxsize=1)
+    tdoa = np.array([[1.0, -1.0, 0.5]])
+
+    registry.estimate('a', estimate_positions_chan, tdoa)
+    cached = registry.scenario('a').cache[('closed_form', 0)]
+    registry.estimate('a', estimate_positions_chan, tdoa)
+    assert registry.scenario('a').cache[('closed_form', 0)] is cached
+
+    registry.estimate('b', estimate_positions_chan, np.zeros((1, 4)))
+    assert ('closed_form', 0) not in registry.scenario('a').cache
+    assert registry.misses == 3
+
+
+def test_site_rejects_too_few_anchors():
+    with pytest.raises(ValueError):
+        SiteRegistry({'x': {'anchors': [[0, 0], [1, 1]]}}, DEFAULTS)
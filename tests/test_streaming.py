@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Scenario
+from evaluation import evaluate
+from model.least_squares import estimate_positions_least_squares
+from datagenerator import generate_trajectory
+from streaming import array_source, run_stream, simulated_source
+
+
+# === Test 1: chunked metrics equal the batch metrics ===
+def test_stream_metrics_match_batch():
+    rng = np.random.default_rng(0)
+    true_positions = rng.uniform(0, 20, size=(103, 2))
+    tdoa = rng.normal(0, 3, size=(103, 3))
+    problem_mask = np.zeros(tdoa.shape, dtype=int)
+
+    scenario = Scenario(np.array([[0, 0], [0, 20], [20, 0], [20, 20]]))
+
+    batch_metrics, _, _ = evaluate(estimate_positions_least_squares(tdoa, scenario=scenario), true_positions)
+    source = array_source(true_positions, tdoa, problem_mask, chunk_size=10)
+    report, num_epochs = run_stream(source, estimate_positions_least_squares, process=False, name="ls",
+                                    scenario=scenario)
+
+    assert num_epochs == 103
+    assert np.isclose(report["ls"]["all"]["RMSE"], batch_metrics["RMSE"])
+    assert np.isclose(report["ls"]["all"]["MAE"], batch_metrics["MAE"])
+
+
+# === Test 2: the simulated stream is one continuous trajectory cut into chunks ===
+@pytest.mark.parametrize("trajectory_type", ["line", "circle", "sinusoid", "random"])
+def test_simulated_source_is_continuous(trajectory_type):
+    np.random.seed(0)
+    scenario = Scenario(np.array([[0, 0], [0, 20], [20, 0], [20, 20]]), num_targets=250)
+    chunks = list(simulated_source(60, 250, trajectory_type=trajectory_type, scenario=scenario))
+    assert [len(chunk["tdoa"]) for chunk in chunks] == [60, 60, 60, 60, 10]
+
+    path = np.concatenate([chunk["true_positions"] for chunk in chunks])
+    steps = np.linalg.norm(np.diff(path, axis=0), axis=1)
+    assert np.max(steps) < 5 * np.median(steps) + 1e-9   # no jump back at the chunk boundaries
+    if trajectory_type != "random":
+        np.testing.assert_allclose(path, generate_trajectory(250, trajectory_type, scenario=scenario), atol=1e-9)
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import profiling
+from config import Scenario
+from model.kalman import estimate_positions_ekf
+from model.particle_filter import estimate_positions_pf_tracking
+from model.least_squares import estimate_positions_least_squares
+from tracking import MultiTagTracker, TagStore
+
+
+def make_records(scenario, tag_ids, num_epochs, seed=0):
+    """Interleaved records of tags moving on parallel lines, plus the true positions per tag."""
+    rng = np.random.default_rng(seed)
+    records, truth = [], {}
+    for k, tag_id in enumerate(tag_ids):
+        t = np.arange(num_epochs, dtype=float)
+        truth[tag_id] = np.stack([2 + 0.5 * t, np.full_like(t, 3 + 2 * k)], axis=1)
+        distances = np.linalg.norm(truth[tag_id][:, np.newaxis, :] - scenario.anchors[np.newaxis, :, :], axis=2)
+        tdoa = distances[:, 1:] - distances[:, [0]] + rng.normal(0, 0.05, size=(num_epochs, 3))
+        records += [(tag_id, t[n], tdoa[n]) for n in range(num_epochs)]
+    records.sort(key=lambda record: record[1])  # tags interleaved, arriving in time order
+    return records, truth
+
+
+# === Test 1: interleaved records come back grouped by tag, in time order ===
+@pytest.mark.parametrize("estimator", [estimate_positions_least_squares, estimate_positions_ekf])
+def test_tracker_groups_by_tag(estimator):
+    scenario = Scenario(np.array([[0, 0], [0, 20], [20, 0], [20, 20]]), tdoa_noise_std=0.05)
+    records, truth = make_records(scenario, ["a", "b", 7], num_epochs=20)
+    tracker = MultiTagTracker(estimator, scenario=scenario)
+
+    shuffled = np.random.default_rng(1).permutation(30)
+    fixes = tracker.update([records[i] for i in shuffled])
+    fixes_next = tracker.update(records[30:])
+
+    assert set(tracker.tags) == {"a", "b", 7}
+    for tag_id, positions in truth.items():
+        timestamps = np.concatenate([fixes[tag_id][0], fixes_next[tag_id][0]])
+        np.testing.assert_array_equal(timestamps, np.arange(20))
+        np.testing.assert_allclose(fixes_next[tag_id][1], positions[fixes_next[tag_id][0].astype(int)], atol=0.5)
+        np.testing.assert_allclose(tracker.last_fix(tag_id), positions[-1], atol=0.5)
+
+
+# === Test 2: idle tags are evicted and their slots reused; the store grows when full ===
+def test_tag_store_eviction():
+    store = TagStore(dim=2, capacity=2)
+    for tag_id, seen in [("a", 0.0), ("b", 5.0), ("c", 9.0)]:
+        slot = store.slot(tag_id)
+        store.last_seen[slot] = seen
+    assert store.capacity == 4 and len(store) == 3
+
+    assert store.evict_idle(now=10.0, idle_timeout=6.0) == ["a"]
+    assert "a" not in store and len(store) == 2
+    slot = store.slot("d")
+    assert slot == 0 and np.isnan(store.last_fix[slot]).all() and store.states[slot] is None
+
+
+# === Test 3: stateful tags are stacked into one call and stepped by their own report spacing, never backwards ===
+def test_stacked_tags_use_report_spacing():
+    scenario = Scenario(np.array([[0, 0], [0, 20], [20, 0], [20, 20]]), tdoa_noise_std=0.05)
+    records, _ = make_records(scenario, ["a", "b", "c"], num_epochs=12)
+    rng = np.random.default_rng(2)
+    # 10 Hz reports with jitter, a different clock per tag
+    records = [(tag_id, 0.1 * t + 0.02 * rng.random(), tdoa) for tag_id, t, tdoa in records]
+    tracker = MultiTagTracker(estimate_positions_ekf, scenario=scenario)
+
+    profiler = profiling.enable_profiling()
+    fixes = tracker.update(records[:18])
+    fixes_next = tracker.update(records[18:])
+    profiling.disable_profiling()
+    assert profiler.counters["tracking.stateful_calls"] == 2
+
+    for tag_id in ["a", "b", "c"]:
+        rows = [record for record in records if record[0] == tag_id]
+        times = np.array([record[1] for record in rows])
+        expected = estimate_positions_ekf(np.array([record[2] for record in rows]), dt=np.diff(times, prepend=times[0]),
+                                          scenario=scenario)
+        np.testing.assert_allclose(np.concatenate([fixes[tag_id][1], fixes_next[tag_id][1]]), expected, atol=1e-9)
+
+    # A late report, in a later update than a newer one, steps by zero instead of a negative dt
+    for estimator in (estimate_positions_pf_tracking, estimate_positions_ekf):
+        tracker = MultiTagTracker(estimator, scenario=scenario)
+        tdoa = records[0][2]
+        for t in (5.0, 3.0, 6.0, 7.0, 20.0):
+            timestamps, positions = tracker.update([("a", t, tdoa)])["a"]
+            assert np.all(np.isfinite(positions))
+        assert tracker.store.last_seen[tracker.store.slots["a"]] == 20.0
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import profiling
+from config import Scenario
+from model.least_squares import estimate_positions_least_squares
+from model.taylor import estimate_positions_taylor
+from model.warm_start import seed_positions, valid_seed
+
+
+def make_track(scenario, num_epochs=60):
+    t = np.linspace(0, 6, num_epochs)
+    true_positions = np.stack([4 + 2 * t, 10 + 3 * np.sin(t)], axis=1)
+    distances = np.linalg.norm(true_positions[:, np.newaxis, :] - scenario.anchors[np.newaxis, :, :], axis=2)
+    tdoa = distances[:, 1:] - distances[:, [0]] + np.random.default_rng(0).normal(0, 0.05, size=(num_epochs, 3))
+    return true_positions, tdoa
+
+
+# === Test 1: previous-fix seeding converges to the same fixes in fewer iterations ===
+@pytest.mark.parametrize("name, solver", [("least_squares", estimate_positions_least_squares),
+                                          ("taylor", estimate_positions_taylor)])
+def test_previous_fix_saves_iterations(name, solver):
+    scenario = Scenario(np.array([[0, 0], [0, 20], [20, 0], [20, 20]]))
+    _, tdoa = make_track(scenario)
+
+    iterations = {}
+    fixes = {}
+    for init in ("mean", "previous"):
+        profiler = profiling.enable_profiling()
+        np.random.seed(0)
+        fixes[init] = solver(tdoa, init=init, scenario=scenario)
+        profiling.disable_profiling()
+        iterations[init] = profiler.counters[f"{name}.iterations"]
+
+    np.testing.assert_allclose(fixes["previous"], fixes["mean"], atol=1e-3)
+    assert iterations["previous"] < iterations["mean"]
+
+
+# === Test 2: unusable closed-form seeds fall back to the default start points ===
+def test_invalid_seed_falls_back():
+    scenario = Scenario(np.array([[0, 0], [0, 20], [20, 0], [20, 20]]))
+    _, tdoa = make_track(scenario, num_epochs=3)
+    tdoa[1] = [500.0, -500.0, 500.0]  # no position inside the room explains this
+    x0 = np.full((3, 2), 10.0)
+    x0[2] = np.nan  # unsolvable epoch stays unseeded
+
+    seeded_x0, seeded = seed_positions(tdoa, "chan", x0, scenario.upper_bounds, scenario=scenario)
+
+    assert seeded.tolist() == [True, False, False]
+    assert valid_seed(seeded_x0[0], scenario.upper_bounds)[0]
+    np.testing.assert_array_equal(seeded_x0[1:], x0[1:])
+    with pytest.raises(ValueError):
+        seed_positions(tdoa, "oracle", x0, scenario.upper_bounds, scenario=scenario)
@@ -0,0 +1,203 @@
+"""
+Multi-tag tracking on top of any estimator returned by `model.load_model`.
+
+Epochs arrive as `(tag_id, timestamp, tdoa)` records with many tags interleaved. `MultiTagTracker`
+groups them by tag, solves them in batched estimator calls and keeps per-tag state in a
+`TagStore`: the last fix and last timestamp live in preallocated arrays indexed by slot, and
+the tracker state of stateful models (EKF, tracking particle filter) sits in a slot-indexed
+list. Tags that have been silent for longer than `idle_timeout` are evicted and their slots reused.
+"""
+
+import inspect
+import numpy as np
+from config import resolve_scenario
+from profiling import count
+from streaming import accepts_state
+
+
+def accepts_tag_stack(estimate_positions):
+    """
+    True for stateful estimators marked `tag_stacks` (EKF, tracking particle filter): they take
+    (N, tags, M-1) with a list of per-tag states and update every tag in one call.
+    """
+    return getattr(estimate_positions, "tag_stacks", False)
+
+
+class TagStore:
+    """Tag ID -> slot in fixed-width arrays that double in size when full."""
+
+    def __init__(self, dim, capacity=64):
+        self.dim = dim
+        self.slots = {}
+        self.free = list(range(capacity - 1, -1, -1))
+        self.tag_ids = np.full(capacity, None, dtype=object)
+        self.last_fix = np.full((capacity, dim), np.nan)
+        self.last_seen = np.full(capacity, -np.inf)
+        self.states = [None] * capacity
+
+    def __contains__(self, tag_id):
+        return tag_id in self.slots
+
+    def __len__(self):
+        return len(self.slots)
+
+    @property
+    def capacity(self):
+        return self.last_seen.shape[0]
+
+    def slot(self, tag_id):
+        """The slot of `tag_id`, allocated (and the arrays grown) on first sight."""
+        if tag_id in self.slots:
+            return self.slots[tag_id]
+        if not self.free:
+            old = self.capacity
+            self.tag_ids = np.concatenate([self.tag_ids, np.full(old, None, dtype=object)])
+            self.last_fix = np.concatenate([self.last_fix, np.full((old, self.dim), np.nan)])
+            self.last_seen = np.concatenate([self.last_seen, np.full(old, -np.inf)])
+            self.states.extend([None] * old)
+            self.free = list(range(2 * old - 1, old - 1, -1))
+        slot = self.free.pop()
+        self.slots[tag_id] = slot
+        self.tag_ids[slot] = tag_id
+        return slot
+
+    def evict_idle(self, now, idle_timeout):
+        """Drop every tag last seen before `now - idle_timeout`; returns the evicted tag IDs."""
+        idle = np.flatnonzero(self.last_seen < now - idle_timeout)
+        evicted = [self.tag_ids[slot] for slot in idle if self.tag_ids[slot] is not None]
+        for tag_id in evicted:
+            slot = self.slots.pop(tag_id)
+            self.tag_ids[slot] = None
+            self.last_fix[slot] = np.nan
+            self.last_seen[slot] = -np.inf
+            self.states[slot] = None
+            self.free.append(slot)
+        return evicted
+
+
+class MultiTagTracker:
+    """
+    Batched positioning of many tags with per-tag state.
+
+    Parameters:
+        estimate_positions: estimator from `model.load_model`
+        scenario: config.Scenario shared by every tag (default: from the command line)
+        idle_timeout: evict tags silent for longer than this (timestamp units)
+        capacity: initial number of tag slots
+        kwargs: passed to every estimator call
+    Stateless estimators are called once per `update` on all records. Stateful ones (taking
+    `state`/`return_state`) see each tag's records in timestamp order, with the tag's state
+    carried from call to call and, if they take `dt`, the time since the tag's previous report
+    (timestamps in seconds). Tags with the same number of records in an update are stacked into
+    one call when the estimator takes tag stacks (`accepts_tag_stack`), otherwise each tag gets
+    its own call.
+    """
+
+    def __init__(self, estimate_positions, scenario=None, idle_timeout=30.0, capacity=64, **kwargs):
+        self.estimate_positions = estimate_positions
+        self.scenario = resolve_scenario(scenario)
+        self.idle_timeout = idle_timeout
+        self.kwargs = kwargs
+        self.stateful = accepts_state(estimate_positions)
+        self.stacked = accepts_tag_stack(estimate_positions)
+        self.takes_dt = "dt" in inspect.signature(estimate_positions).parameters
+        self.store = TagStore(self.scenario.dim, capacity)
+
+    def update(self, records):
+        """
+        Solve a batch of `(tag_id, timestamp, tdoa)` records.
+        Returns {tag_id: (timestamps (n,), positions (n, dim))}, each tag's epochs in timestamp order.
+        """
+        records = list(records)
+        if not records:
+            return {}
+        tag_ids = [record[0] for record in records]
+        timestamps = np.array([record[1] for record in records], dtype=float)
+        positions, groups = self.solve(tag_ids, timestamps, np.array([record[2] for record in records], dtype=float))
+        return {tag_id: (timestamps[rows], positions[rows]) for tag_id, rows in groups.items()}
+
+    def solve(self, tag_ids, timestamps, tdoa):
+        """
+        Array form of `update`: `tag_ids` (n,), `timestamps` (n,), `tdoa` (n, M-1).
+        Returns (positions (n, dim) in record order, {tag_id: record indices in timestamp order}).
+        """
+        tag_ids = np.array(tag_ids, dtype=object)
+        timestamps = np.asarray(timestamps, dtype=float)
+        tdoa = np.atleast_2d(np.asarray(tdoa, dtype=float))
+        if tdoa.shape[0] == 0:
+            return np.empty((0, self.scenario.dim)), {}
+
+        # Group by tag, each group in timestamp order
+        tag_index = {}
+        codes = np.array([tag_index.setdefault(tag_id, len(tag_index)) for tag_id in tag_ids])
+        order = np.lexsort((timestamps, codes))
+        sorted_codes = codes[order]
+        bounds = np.r_[np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]), len(order)]
+
+        positions = np.empty((tdoa.shape[0], self.scenario.dim))
+        if self.stateful:
+            self.solve_stateful(tag_ids, timestamps, tdoa, order, bounds, positions)
+        else:
+            positions[order] = self.estimate_positions(tdoa[order], scenario=self.scenario, **self.kwargs)
+
+        groups = {}
+        for start, stop in zip(bounds[:-1], bounds[1:]):
+            rows = order[start:stop]
+            tag_id = tag_ids[rows[0]]
+            slot = self.store.slot(tag_id)
+            fixed = rows[~np.any(np.isnan(positions[rows]), axis=1)]
+            if fixed.size:
+                self.store.last_fix[slot] = positions[fixed[-1]]
+            self.store.last_seen[slot] = max(self.store.last_seen[slot], timestamps[rows[-1]])
+            groups[tag_id] = rows
+
+        evicted = self.store.evict_idle(timestamps.max(), self.idle_timeout)
+        count("tracking.records", tdoa.shape[0])
+        count("tracking.tags_evicted", len(evicted))
+        return positions, groups
+
+    def solve_stateful(self, tag_ids, timestamps, tdoa, order, bounds, positions):
+        """Run a stateful estimator over the tag groups `order[bounds[i]:bounds[i+1]]`, filling `positions`."""
+        slots = np.array([self.store.slot(tag_ids[order[start]]) for start in bounds[:-1]], dtype=np.int64)
+        sizes = np.diff(bounds)
+
+        # Time since the tag's previous report; unused where a track starts, so 0 for unseen tags.
+        # A late report (older than the last one seen, as UDP delivers) is applied without a step.
+        previous = np.r_[np.nan, timestamps[order][:-1]]
+        previous[bounds[:-1]] = self.store.last_seen[slots]
+        dt = timestamps[order] - previous
+        dt[~np.isfinite(dt)] = 0.0
+        np.maximum(dt, 0.0, out=dt)
+
+        if self.stacked:
+            groups = [np.flatnonzero(sizes == size) for size in np.unique(sizes)]
+        else:
+            groups = [np.array([g]) for g in range(len(slots))]
+        for group in groups:
+            # (records, tags) positions into `order`: the k-th record of every tag in the group
+            index = (bounds[group][np.newaxis, :] + np.arange(sizes[group[0]])[:, np.newaxis])
+            rows = order[index]
+            kwargs = dict(self.kwargs, dt=dt[index]) if self.takes_dt else self.kwargs
+            states = [self.store.states[slot] for slot in slots[group]]
+            if self.stacked:
+                positions[rows], states = self.estimate_positions(
+                    tdoa[rows], state=states, return_state=True, scenario=self.scenario, **kwargs
+                )
+            else:
+                if self.takes_dt:
+                    kwargs["dt"] = kwargs["dt"][:, 0]
+                positions[rows[:, 0]], state = self.estimate_positions(
+                    tdoa[rows[:, 0]], state=states[0], return_state=True, scenario=self.scenario, **kwargs
+                )
+                states = [state]
+            for slot, state in zip(slots[group], states):
+                self.store.states[slot] = state
+        count("tracking.stateful_calls", len(groups))
+
+    def last_fix(self, tag_id):
+        """Most recent valid fix of a tracked tag (NaN if it has none yet)."""
+        return self.store.last_fix[self.store.slots[tag_id]].copy()
+
+    @property
+    def tags(self):
+        return list(self.store.slots)
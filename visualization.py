@@ -1,9 +1,8 @@
+import numpy as np
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
 # from config import ANCHORS
-from config import get_anchors
-
-ANCHORS = get_anchors()
+from config import resolve_scenario
 
 # def plot_results(true_positions, estimated_positions, title="TDOA Positioning Results"):
 #     if true_positions.shape[1] == 2:
@@ -43,14 +42,15 @@ ANCHORS = get_anchors()
 #         plt.show()
 
 
-def plot_results(true_positions, estimated_positions, title="TDOA Positioning Results"):
+def plot_results(true_positions, estimated_positions, title="TDOA Positioning Results", scenario=None):
+    anchors = resolve_scenario(scenario).anchors
     if true_positions.shape[1] == 2:
         plt.figure(figsize=(8, 8))
         plt.plot(true_positions[:, 0], true_positions[:, 1], 'b-', label='True Trajectory')  # The ground truth
         plt.plot(estimated_positions[:, 0], estimated_positions[:, 1], 'r--', label='Estimated Trajectory')  # The predict trajectory (dotted line)
         plt.scatter(true_positions[:, 0], true_positions[:, 1], c='blue', label='True Positions', marker='o')
         plt.scatter(estimated_positions[:, 0], estimated_positions[:, 1], c='red', label='Estimated Positions', marker='x')
-        plt.scatter(ANCHORS[:, 0], ANCHORS[:, 1], c='green', label='Anchors', marker='^')
+        plt.scatter(anchors[:, 0], anchors[:, 1], c='green', label='Anchors', marker='^')
         for i in range(len(true_positions)):
             plt.plot([true_positions[i, 0], estimated_positions[i, 0]],
                      [true_positions[i, 1], estimated_positions[i, 1]], 'gray', linestyle='dotted', linewidth=0.5)
@@ -69,7 +69,7 @@ def plot_results(true_positions, estimated_positions, title="TDOA Positioning Re
         ax.plot(*estimated_positions.T, 'r--', label='Estimated Trajectory')  # The predict trajectory (dotted line)
         ax.scatter(*true_positions.T, c='blue', label='True Positions')
         ax.scatter(*estimated_positions.T, c='red', label='Estimated Positions')
-        ax.scatter(*ANCHORS.T, c='green', label='Anchors')
+        ax.scatter(*anchors.T, c='green', label='Anchors')
         for i in range(len(true_positions)):
             xs = [true_positions[i, 0], estimated_positions[i, 0]]
             ys = [true_positions[i, 1], estimated_positions[i, 1]]
@@ -81,4 +81,24 @@ def plot_results(true_positions, estimated_positions, title="TDOA Positioning Re
         ax.set_title(f"{title} (3D)")
         ax.legend()
         plt.tight_layout()
-        plt.show()
\ No newline at end of file
+        plt.show()
+
+
+def plot_coverage(coverage, title="CRLB coverage", scenario=None):
+    """Heat map of the expected accuracy σ·GDOP of a `gdop.CoverageMap` (3D: the slice at mid-height)."""
+    anchors = resolve_scenario(scenario).anchors
+    accuracy = coverage.tdoa_noise_std * coverage.gdop
+    if coverage.dim == 3:
+        accuracy = accuracy[:, :, accuracy.shape[2] // 2]
+        title = f"{title} (z = {coverage.axes[2][coverage.axes[2].size // 2]:.1f} m)"
+    x, y = coverage.axes[0], coverage.axes[1]
+    plt.figure(figsize=(8, 8))
+    plt.imshow(accuracy.T, origin='lower', extent=(x[0], x[-1], y[0], y[-1]), cmap='viridis',
+               vmax=np.percentile(accuracy[np.isfinite(accuracy)], 95))
+    plt.colorbar(label='CRLB (m)')
+    plt.scatter(anchors[:, 0], anchors[:, 1], c='red', label='Anchors', marker='^')
+    plt.legend()
+    plt.xlabel("X (m)")
+    plt.ylabel("Y (m)")
+    plt.title(title)
+    plt.show()